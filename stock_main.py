@@ -106,7 +106,7 @@ def analyze(stock_codes: List[str], period: str, interval: str, predict_days: in
 
             if analysis_type in ['all', 'predict']:
                 click.echo("\n🔮 执行预测分析...")
-                cli.lstm_predictor.train(stock_data)
+                cli.lstm_predictor.ensure_trained(stock_data)
                 predictions = cli.lstm_predictor.predict(stock_data, days_ahead=predict_days)
                 click.echo("✅ 预测分析完成")
 
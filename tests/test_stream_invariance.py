@@ -0,0 +1,35 @@
+"""流式回测的结果应与分块大小无关"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from trade.core.backtest_engine import BacktestEngine
+from trade.core.strategies.base import available_strategies, create_strategy
+
+
+def _daily_bars(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, n)))
+    return pd.DataFrame({'Open': close * (1 + rng.normal(0, 0.003, n)), 'High': close * 1.01,
+                         'Low': close * 0.99, 'Close': close, 'Volume': 1e6},
+                        index=pd.bdate_range('2010-01-04', periods=n))
+
+
+def _intraday_bars(n: int, seed: int) -> pd.DataFrame:
+    """交易日 9:30 起的30分钟K线，每天13根"""
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range('2021-01-04', periods=n // 13 + 1)
+    offsets = pd.Timedelta(hours=9, minutes=30) + pd.to_timedelta(np.arange(13) * 30, unit='min')
+    index = pd.DatetimeIndex([day + offset for day in days for offset in offsets])[:n]
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0001, 0.004, n)))
+    return pd.DataFrame({'Open': close, 'High': close * 1.002, 'Low': close * 0.998,
+                         'Close': close, 'Volume': 1e5}, index=index)
+
+
+@pytest.mark.parametrize('name', available_strategies())
+@pytest.mark.parametrize('bars', [_daily_bars(3000, 1), _intraday_bars(6000, 2)],
+                         ids=['daily', '30min'])
+def test_stream_invariant_to_chunk_size(name, bars):
+    metrics = BacktestEngine().check_stream_invariance(bars, create_strategy(name), 'TEST')
+    # 没有成交时比较没有意义
+    assert metrics['total_trades'] > 0
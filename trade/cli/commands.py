@@ -6,13 +6,17 @@ import os
 
 from trade.config.settings import Settings
 from trade.core.ai_analyzer import AIAnalyzer
+from trade.core.backtest_engine import BacktestEngine
 from trade.core.data_fetcher import DataFetcher
 from trade.core.financial_report_analyzer import FinancialReportAnalyzer
+from trade.core.global_predictor import GlobalLSTMPredictor
+from trade.core.inference import TFLitePredictor
 from trade.core.lstm_predictor import LSTMPredictor
+from trade.core.result_cache import BacktestResultCache
 from trade.core.sentiment_analyzer import SentimentAnalyzer
 from trade.core.turtle_strategy import TurtleStrategy
 from trade.models.entities import FinancialReportAnalysis
-from trade.utils.excel_writer import ExcelWriter
+from trade.utils.result_store import ResultStore
 from trade.utils.logger import Logger
 
 
@@ -22,17 +26,24 @@ class CLI:
         self.logger = Logger()
         # 初始化数据获取器
         self.data_fetcher = DataFetcher()
-        # 初始化LSTM预测器
+        # 初始化LSTM预测器，TensorFlow 和模型在首次预测时才加载
         self.lstm_predictor = LSTMPredictor()
+        # 跨股票共享的预测模型，首次预测时从模型库加载
+        self.global_predictor = GlobalLSTMPredictor()
+        # 基于导出的TFLite模型的轻量预测器
+        self.tflite_predictor = TFLitePredictor()
         # 初始化海龟策略分析器
         self.turtle_strategy = TurtleStrategy()
         # 初始化情绪分析器
         self.sentiment_analyzer = SentimentAnalyzer()
         # 初始化AI分析器
         self.ai_analyzer = AIAnalyzer()
-        # 初始化Excel写入器，用于将分析结果写入Excel文件
-        self.excel_writer = ExcelWriter(Path(Settings.DATA.output_dir))
+        # 初始化结果存储，分析结果按批次追加写入列式存储，Excel 报表按配置导出
+        self.result_store = ResultStore()
         self.financial_report_analyzer = FinancialReportAnalyzer()
+        # 初始化回测引擎和回测结果缓存
+        self.backtest_engine = BacktestEngine()
+        self.backtest_cache = BacktestResultCache()
 
     @click.group()
     def cli(self):
@@ -67,14 +78,14 @@ class CLI:
             # 获取股票数据
             stock_data = self.data_fetcher.fetch_stock_data(stock_code)
             
-            # 训练模型并预测
-            self.lstm_predictor.train(stock_data)
+            # 从模型库加载或训练模型并预测
+            self.lstm_predictor.ensure_trained(stock_data)
             predictions = self.lstm_predictor.predict(stock_data, days)
             
             # 输出到Excel
-            output_path = self.excel_writer.write_predictions(predictions)
+            rows = self.result_store.write_predictions(predictions)
             # 记录预测结果的日志
-            self.logger.info(f"预测结果已保存到: {output_path}")
+            self.logger.info(f"预测结果已保存: {rows} 条，批次 {self.result_store.run_id}")
             
         except Exception as e:
             # 记录预测失败的日志
@@ -88,9 +99,9 @@ class CLI:
             stock_data = self.data_fetcher.fetch_stock_data(stock_code)
             signals = self.turtle_strategy.analyze(stock_data)
             
-            output_path = self.excel_writer.write_trade_signals(signals)
+            rows = self.result_store.write_trade_signals(signals)
             # 记录海龟策略分析结果的日志
-            self.logger.info(f"海龟策略分析结果已保存到: {output_path}")
+            self.logger.info(f"海龟策略分析结果已保存: {rows} 条，批次 {self.result_store.run_id}")
             
         except Exception as e:
             # 记录海龟策略分析失败的日志
@@ -104,9 +115,9 @@ class CLI:
             stock_data = self.data_fetcher.fetch_stock_data(stock_code)
             sentiment = self.sentiment_analyzer.analyze(stock_data)
             
-            output_path = self.excel_writer.write_sentiment_analysis([sentiment])
+            self.result_store.write_sentiment_analysis([sentiment])
             # 记录情绪分析结果的日志
-            self.logger.info(f"情绪分析结果已保存到: {output_path}")
+            self.logger.info(f"情绪分析结果已保存，批次 {self.result_store.run_id}")
             
         except Exception as e:
             # 记录情绪分析失败的日志
@@ -122,48 +133,54 @@ class CLI:
             stock_data = self.data_fetcher.fetch_stock_data(stock_code)
             report = self.ai_analyzer.analyze(stock_data)
             
-            output_path = self.excel_writer.write_ai_reports([report])
+            self.result_store.write_ai_reports([report])
             # 记录AI分析报告的日志
-            self.logger.info(f"AI分析报告已保存到: {output_path}")
+            self.logger.info(f"AI分析报告已保存，批次 {self.result_store.run_id}")
             
         except Exception as e:
             # 记录AI分析失败的日志
             self.logger.error(f"AI分析失败: {str(e)}")
 
     @cli.command()
-    @click.argument('stock_code')
-    def full_analysis(self, stock_code: str):
+    @click.argument('stock_codes', nargs=-1)
+    def full_analysis(self, stock_codes: List[str]):
         """执行全面分析"""
         try:
-            # 获取股票数据
-            stock_data = self.data_fetcher.fetch_stock_data(stock_code)
-            
-            # LSTM预测
-            self.lstm_predictor.train(stock_data)
-            predictions = self.lstm_predictor.predict(stock_data)
-            
-            # 海龟策略分析
-            signals = self.turtle_strategy.analyze(stock_data)
-            
-            # 情绪分析
-            sentiment = self.sentiment_analyzer.analyze(stock_data)
-            
-            # AI分析
-            report = self.ai_analyzer.analyze(stock_data)
-            
-            # 保存所有结果
-            pred_path = self.excel_writer.write_predictions(predictions)
-            signal_path = self.excel_writer.write_trade_signals(signals)
-            sentiment_path = self.excel_writer.write_sentiment_analysis([sentiment])
-            report_path = self.excel_writer.write_ai_reports([report])
+            predictions, signals, sentiments, reports = [], [], [], []
+            for stock_code in stock_codes:
+                # 获取股票数据
+                stock_data = self.data_fetcher.fetch_stock_data(stock_code)
+
+                # LSTM预测
+                self.lstm_predictor.ensure_trained(stock_data)
+                predictions.extend(self.lstm_predictor.predict(stock_data))
+
+                # 海龟策略分析
+                signals.extend(self.turtle_strategy.analyze(stock_data))
+
+                # 情绪分析
+                sentiments.append(self.sentiment_analyzer.analyze(stock_data))
+
+                # AI分析
+                reports.append(self.ai_analyzer.analyze(stock_data))
+
+            # 全部股票分析完成后，每张结果表只写入一次
+            store = self.result_store
+            pred_rows = store.write_predictions(predictions)
+            signal_rows = store.write_trade_signals(signals)
+            sentiment_rows = store.write_sentiment_analysis(sentiments)
+            report_rows = store.write_ai_reports(reports)
+            # 报表在全部股票写入后导出一次
+            if Settings.OUTPUT.excel_reports and pred_rows + signal_rows + sentiment_rows + report_rows:
+                self.logger.info(f"Excel报表: {store.export_excel()}")
             
             # 记录分析完成的日志
             self.logger.info(f"""
-            分析完成，结果保存在以下文件：
-            - 预测结果：{pred_path}
-            - 交易信号：{signal_path}
-            - 情绪分析：{sentiment_path}
-            - AI分析报告：{report_path}
+            分析完成，结果已写入结果库（批次 {store.run_id}）：
+            - 预测结果：{pred_rows} 条
+            - 交易信号：{signal_rows} 条
+            - 情绪分析：{sentiment_rows} 条
+            - AI分析报告：{report_rows} 条
             """)
             
         except Exception as e:
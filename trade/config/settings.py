@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, Any
 import os
 
@@ -15,6 +15,18 @@ class DataConfig:
     output_dir: str = os.path.join(base_dir, "output")
     stock_list_file: str = os.path.join(base_dir, "config", "stock_list.txt")
     financial_reports_dir: str = os.path.join(data_dir, "financial_reports")
+    # 按 {代码}_{周期}_{间隔}_data.parquet 存放的本地K线库
+    parquet_dir: str = os.path.join(data_dir, "parquet")
+    # 回测结果缓存目录
+    backtest_cache_dir: str = os.path.join(output_dir, "backtest_cache")
+    # 选股器的全市场快照目录
+    screener_dir: str = os.path.join(data_dir, "screener")
+    # 全市场滚动协方差的状态文件
+    correlation_file: str = os.path.join(data_dir, "correlation", "state.npz")
+    # 训练好的预测模型（权重与元数据）
+    model_dir: str = os.path.join(data_dir, "models")
+    # 预测模型每轮训练的损失、学习率和耗时（JSONL）
+    training_metrics_file: str = os.path.join(output_dir, "training_metrics.jsonl")
 
 @dataclass
 class LSTMConfig:
@@ -24,6 +36,21 @@ class LSTMConfig:
     validation_split: float = 0.2
     lstm_units: int = 100
     dense_units: int = 50
+    # 模型库中已有模型、只有新K线时的微调轮数
+    finetune_epochs: int = 5
+    # 早停：验证损失连续若干轮不下降时停止训练并恢复最优权重，epochs 为最大轮数
+    early_stopping_patience: int = 5
+    # 学习率衰减：验证损失连续 lr_patience 轮不下降时学习率乘以 lr_factor，不低于 min_lr
+    lr_patience: int = 2
+    lr_factor: float = 0.5
+    min_lr: float = 1e-5
+    # Keras 训练输出：0 不输出，每轮的指标由训练回调写入日志和训练指标文件
+    verbose: int = 0
+    # 跨股票共享模型：股票嵌入维度、训练样本的打乱缓冲区大小，
+    # 以及训练时把股票编号替换为“未知股票”的比例（使模型也能预测训练时未见过的股票）
+    embedding_dim: int = 8
+    shuffle_buffer: int = 10000
+    symbol_dropout: float = 0.1
 
 @dataclass
 class TurtleConfig:
@@ -52,6 +79,259 @@ class TurtleConfig:
     # 用于确定止损位置和仓位规模，一般与短期突破周期保持一致
     atr_window: int = 20
 
+    # 使用的突破系统：1 为20日突破/10日离场，2 为55日突破/20日离场
+    system: int = 1
+
+    # 系统一/系统二的离场周期：收盘价跌破该周期最低价时平仓
+    short_exit_window: int = 10
+    long_exit_window: int = 20
+
+    # 系统一过滤规则：上一次突破若为盈利交易则跳过本次突破，
+    # 但长期突破（55日）始终入场，避免错过大趋势
+    skip_after_winner: bool = True
+
+    # 最大持仓单位数：价格每较上次入场上涨 pyramid_n 个N加仓一个单位
+    max_units: int = 4
+    pyramid_n: float = 0.5
+
+    # 止损距离：最近一次入场价下方 stop_n 个N，加仓后所有单位的止损随之上移
+    stop_n: float = 2.0
+
+    # 每点价值：价格变动1点对应的一手/一股盈亏金额，股票为1，期货为合约乘数
+    dollar_per_point: float = 1.0
+
+@dataclass
+class BacktestConfig:
+    """回测引擎配置类
+
+    包含交易费用、成交模型和A股交易规则相关的参数。
+    """
+
+    # 初始资金
+    initial_capital: float = 1000000
+
+    # 佣金费率 0.03%，最低佣金 5元
+    commission_rate: float = 0.0003
+    min_commission: float = 5
+
+    # 过户费 0.001%
+    transfer_fee_rate: float = 0.00001
+
+    # 印花税 0.05%，仅卖出收取
+    stamp_duty_rate: float = 0.0005
+
+    # 滑点（基点），买入价上浮、卖出价下浮
+    slippage_bps: float = 0.0
+
+    # 成交模型: close/next_open/vwap
+    fill_model: str = "next_open"
+
+    # 成交量参与率上限，0 表示不限制
+    participation_rate: float = 0.0
+
+    # 最小交易单位（A股一手为100股），0 表示不限制
+    lot_size: int = 100
+
+    # 是否启用 T+1 交收（当日买入次日才能卖出）
+    t_plus_one: bool = True
+
+    # 未完全成交订单的最长挂单K线数
+    order_ttl: int = 5
+
+    # 无风险年化利率，用于夏普/索提诺等指标
+    risk_free_rate: float = 0.03
+
+    # 每年的交易周期数（日线为252）
+    periods_per_year: int = 252
+
+@dataclass
+class RiskConfig:
+    """仓位与风险配置类
+
+    仓位规模方法决定每只股票满仓（目标仓位为1）时占权益的比例，
+    组合限制在全部股票上统一约束单位数和总敞口。回测和实时信号共用这套参数。
+    """
+
+    # 仓位规模方法: atr_unit（每单位承担固定比例的N风险）/ fixed_fractional（固定权益比例）/
+    # vol_target（按波动率目标缩放）/ full（满仓）
+    method: str = "atr_unit"
+
+    # 每个单位价格波动一个N时的损益占权益的比例，与海龟策略的单次交易风险一致
+    unit_risk: float = TurtleConfig.risk_percentage
+    atr_window: int = TurtleConfig.atr_window
+
+    # 固定比例法下每只股票满仓时占权益的比例
+    fraction: float = 0.2
+
+    # 波动率目标法的年化波动率目标和估计窗口
+    target_volatility: float = 0.15
+    volatility_window: int = 20
+
+    # 凯利上限：仓位不超过 kelly_fraction 倍的凯利比例（0 表示不启用），按 kelly_window 估计收益均值和方差
+    kelly_fraction: float = 0.0
+    kelly_window: int = 120
+
+    # 单只股票的最大单位数，高度相关的一组股票合计的最大单位数
+    max_units_per_market: int = 4
+    max_units_per_group: int = 6
+
+    # 股票代码到相关组名称的映射，未列出的股票各自为一组
+    groups: Dict[str, str] = field(default_factory=dict)
+
+    # 总敞口上限（持仓市值之和 / 权益），1 表示不使用杠杆
+    max_gross_exposure: float = 1.0
+
+@dataclass
+class CorrelationConfig:
+    """相关性与协方差配置类"""
+
+    # 滚动窗口（K线数）
+    window: int = 120
+
+    # 窗口内有效收益率少于该数量的股票不输出相关性
+    min_periods: int = 60
+
+    # 收缩估计方法: ledoit_wolf / none
+    shrinkage: str = "ledoit_wolf"
+
+    # 相关系数不低于该阈值的股票划为同一相关组（按连通关系传递）
+    group_threshold: float = 0.7
+
+@dataclass
+class ScreenerConfig:
+    """选股器配置类
+
+    快照保存每只股票最近 history 根K线及常用指标，选股时只需加载一个文件。
+    """
+
+    # 快照保留的K线数，需覆盖筛选表达式中最长的指标窗口
+    history: int = 260
+
+    # 刷新快照时预先计算的指标，表达式中其余指标在选股时按需计算
+    indicators: tuple = ('SMA_5', 'SMA_20', 'SMA_60', 'HIGH_20', 'LOW_20', 'HIGH_55',
+                         'ATR_20', 'RSI_14', 'VOLMA_20', 'ROC_20')
+
+    # 默认返回的股票数
+    top: int = 50
+
+@dataclass
+class ForecastConfig:
+    """基准预测模型配置类"""
+
+    # 拟合使用的最近K线数
+    window: int = 250
+
+    # 有效K线少于该数量的股票不预测
+    min_history: int = 30
+
+@dataclass
+class TuningConfig:
+    """LSTM超参数搜索配置类
+
+    每组参数在独立的工作进程中按时间序列交叉验证评估，
+    工作进程数默认为 CPU 核数 / 每个进程的线程数，避免线程过度争用。
+    """
+
+    # 搜索空间：LSTMConfig 的字段名到候选值的映射，取全部组合
+    space: Dict[str, list] = field(default_factory=lambda: {
+        'time_step': [10, 20, 40],
+        'lstm_units': [32, 64, 100],
+        'dense_units': [25, 50],
+        'batch_size': [32, 64],
+    })
+
+    # 时间序列交叉验证的折数（扩展窗口，验证集始终在训练集之后）
+    n_splits: int = 3
+
+    # 早停：验证损失连续 patience 轮不下降时停止，epochs 为最大轮数
+    patience: int = 5
+
+    # 工作进程数（0 表示自动）和每个进程的 TensorFlow 线程数
+    workers: int = 0
+    threads_per_worker: int = 2
+
+@dataclass
+class EvaluationConfig:
+    """预测效果评估配置类
+
+    从最近一个截止日起每隔 step 根K线取一个历史截止日，共 cutoffs 个，
+    每个截止日只用之前的数据预测，与之后的实际收盘价比较。
+    """
+
+    # 历史截止日数量和间隔（K线数）
+    cutoffs: int = 20
+    step: int = 5
+
+    # 基准模型评估的工作进程数：1 表示在当前进程内计算，0 表示按计算量自动决定
+    workers: int = 1
+
+    # 自动决定进程数时，截止日数 × K线数 × 股票数 不少于该值才启用多进程，
+    # 较小的评估在当前进程内几秒即可完成，不足以抵消 spawn 启动进程的开销
+    parallel_min_cells: int = 200_000_000
+
+    # 股票的评估样本数不少于该值时使用该股票自己的经验置信度，否则使用全部股票的
+    min_samples: int = 10
+
+@dataclass
+class IntervalConfig:
+    """预测区间配置类
+
+    LSTM 类模型在 mc_samples > 0 时用 MC Dropout 估计区间：推理时保留 Dropout，
+    全部股票的重复样本拼成一个批次预测；其余情况使用预测效果评估得到的
+    历史相对误差分位数（共形预测），没有评估记录时不给出区间。
+    """
+
+    # 区间的目标覆盖率
+    coverage: float = 0.9
+
+    # MC Dropout 样本数，0 表示不采样
+    mc_samples: int = 100
+
+@dataclass
+class MonitorConfig:
+    """实时信号监控配置类"""
+
+    # 监控的K线间隔
+    interval: str = "1d"
+
+    # 启动时为指标预热获取的历史范围，以及之后每轮轮询获取的范围
+    bootstrap_period: str = "1y"
+    poll_period: str = "5d"
+
+    # 轮询间隔（秒）
+    poll_seconds: int = 300
+
+    # 每只股票在内存中保留的K线数，指标和策略只在这段窗口上更新
+    window: int = 250
+
+    # 同时获取数据的股票数
+    max_concurrency: int = 8
+
+    # 监控的策略和信号输出方式（stdout/jsonl/webhook）
+    strategies: tuple = ('turtle',)
+    sinks: tuple = ('stdout', 'jsonl')
+
+    # JSONL 信号文件和 webhook 地址
+    signal_file: str = os.path.join(DataConfig.output_dir, "signals.jsonl")
+    webhook_url: str = ""
+
+@dataclass
+class OutputConfig:
+    """分析结果输出配置类
+
+    结果按批次（run_id）追加写入列式存储，Excel 只作为可选的报表导出。
+    """
+
+    # 存储后端: parquet（按批次分区的数据集）/ sqlite
+    backend: str = "parquet"
+
+    # Parquet 数据集根目录和 SQLite 数据库文件
+    results_dir: str = os.path.join(DataConfig.output_dir, "results")
+    sqlite_file: str = os.path.join(DataConfig.output_dir, "results.db")
+
+    # 运行结束时是否把本批次的全部结果导出为一个 Excel 报表
+    excel_reports: bool = False
+
 @dataclass
 class AIConfig:
     model_type: str = "ollama"  # or "transformers"
@@ -64,6 +344,16 @@ class Settings:
     DATA = DataConfig()
     LSTM = LSTMConfig()
     TURTLE = TurtleConfig()
+    BACKTEST = BacktestConfig()
+    RISK = RiskConfig()
+    CORRELATION = CorrelationConfig()
+    SCREENER = ScreenerConfig()
+    TUNING = TuningConfig()
+    FORECAST = ForecastConfig()
+    EVALUATION = EvaluationConfig()
+    INTERVAL = IntervalConfig()
+    MONITOR = MonitorConfig()
+    OUTPUT = OutputConfig()
     AI = AIConfig()
 
     @classmethod
@@ -0,0 +1,294 @@
+"""
+回测绩效分析
+
+所有函数都接受一维（单次回测）或二维（批量回测，形状为 [回测数, K线数]）的
+权益数组，沿最后一个轴向量化计算，批量参数扫描的结果可以一次性完成分析。
+"""
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..config.settings import Settings
+
+
+def _as_2d(values: np.ndarray) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    return values[np.newaxis, :] if values.ndim == 1 else values
+
+
+def _squeeze(result, single: bool):
+    return result[0] if single else result
+
+
+def returns(equity: np.ndarray) -> np.ndarray:
+    """逐期收益率，长度比权益数组少1"""
+    equity = np.asarray(equity, dtype=float)
+    return equity[..., 1:] / equity[..., :-1] - 1
+
+
+def total_return(equity: np.ndarray) -> np.ndarray:
+    equity = np.asarray(equity, dtype=float)
+    return equity[..., -1] / equity[..., 0] - 1
+
+
+def annual_return(equity: np.ndarray,
+                  periods_per_year: int = Settings.BACKTEST.periods_per_year) -> np.ndarray:
+    equity = np.asarray(equity, dtype=float)
+    periods = equity.shape[-1] - 1
+    return (1 + total_return(equity)) ** (periods_per_year / max(periods, 1)) - 1
+
+
+def annual_volatility(equity: np.ndarray,
+                      periods_per_year: int = Settings.BACKTEST.periods_per_year) -> np.ndarray:
+    return returns(equity).std(axis=-1, ddof=1) * np.sqrt(periods_per_year)
+
+
+def sharpe_ratio(equity: np.ndarray,
+                 risk_free_rate: float = Settings.BACKTEST.risk_free_rate,
+                 periods_per_year: int = Settings.BACKTEST.periods_per_year) -> np.ndarray:
+    r = returns(equity)
+    excess = r - risk_free_rate / periods_per_year
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.sqrt(periods_per_year) * excess.mean(axis=-1) / r.std(axis=-1, ddof=1)
+
+
+def sortino_ratio(equity: np.ndarray,
+                  risk_free_rate: float = Settings.BACKTEST.risk_free_rate,
+                  periods_per_year: int = Settings.BACKTEST.periods_per_year) -> np.ndarray:
+    """索提诺比率，只以低于无风险收益的下行波动作为风险"""
+    excess = returns(equity) - risk_free_rate / periods_per_year
+    downside = np.sqrt(np.mean(np.minimum(excess, 0) ** 2, axis=-1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.sqrt(periods_per_year) * excess.mean(axis=-1) / downside
+
+
+def drawdown(equity: np.ndarray) -> np.ndarray:
+    """逐期回撤（非正数）"""
+    equity = np.asarray(equity, dtype=float)
+    peak = np.maximum.accumulate(equity, axis=-1)
+    return equity / peak - 1
+
+
+def max_drawdown(equity: np.ndarray) -> np.ndarray:
+    return drawdown(equity).min(axis=-1)
+
+
+def max_drawdown_duration(equity: np.ndarray) -> np.ndarray:
+    """最长水下时间（距上一次创新高的最大K线数）"""
+    values = _as_2d(equity)
+    steps = np.arange(values.shape[-1])
+    at_peak = values >= np.maximum.accumulate(values, axis=-1)
+    last_peak = np.maximum.accumulate(np.where(at_peak, steps, 0), axis=-1)
+    return _squeeze((steps - last_peak).max(axis=-1), np.ndim(equity) == 1)
+
+
+def calmar_ratio(equity: np.ndarray,
+                 periods_per_year: int = Settings.BACKTEST.periods_per_year) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return annual_return(equity, periods_per_year) / np.abs(max_drawdown(equity))
+
+
+def rolling_volatility(equity: np.ndarray, window: int,
+                       periods_per_year: int = Settings.BACKTEST.periods_per_year) -> np.ndarray:
+    """滚动年化波动率，前 window-1 期为 NaN，长度与收益率序列一致"""
+    mean, var = _rolling_moments(returns(equity), window)
+    return np.sqrt(var) * np.sqrt(periods_per_year)
+
+
+def rolling_sharpe(equity: np.ndarray, window: int,
+                   risk_free_rate: float = Settings.BACKTEST.risk_free_rate,
+                   periods_per_year: int = Settings.BACKTEST.periods_per_year) -> np.ndarray:
+    """滚动夏普比率，前 window-1 期为 NaN，长度与收益率序列一致"""
+    mean, var = _rolling_moments(returns(equity), window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.sqrt(periods_per_year) * (mean - risk_free_rate / periods_per_year) / np.sqrt(var)
+
+
+def _rolling_moments(r: np.ndarray, window: int):
+    """基于累积和计算滚动均值和样本方差，序列短于窗口时全部为 NaN"""
+    if window > r.shape[-1]:
+        empty = np.full(r.shape, np.nan)
+        return empty, empty.copy()
+    pad = [(0, 0)] * (r.ndim - 1) + [(1, 0)]
+    s1 = np.pad(np.cumsum(r, axis=-1), pad)
+    s2 = np.pad(np.cumsum(r * r, axis=-1), pad)
+    sum1 = s1[..., window:] - s1[..., :-window]
+    sum2 = s2[..., window:] - s2[..., :-window]
+    mean = sum1 / window
+    var = np.maximum(sum2 - window * mean * mean, 0) / (window - 1)
+    nan_pad = np.full(r.shape[:-1] + (window - 1,), np.nan)
+    return np.concatenate([nan_pad, mean], axis=-1), np.concatenate([nan_pad, var], axis=-1)
+
+
+def exposure(position: np.ndarray) -> np.ndarray:
+    """持仓时间占比"""
+    return np.mean(np.asarray(position) != 0, axis=-1)
+
+
+def turnover(position: np.ndarray, close: np.ndarray, equity: np.ndarray,
+             periods_per_year: int = Settings.BACKTEST.periods_per_year) -> np.ndarray:
+    """年化换手率：成交金额之和 / 平均权益，按年折算，position 为持仓数量"""
+    position = np.asarray(position, dtype=float)
+    traded = np.abs(np.diff(position, axis=-1, prepend=0)) * np.asarray(close, dtype=float)
+    return notional_turnover(traded, equity, periods_per_year)
+
+
+def notional_turnover(traded: np.ndarray, equity: np.ndarray,
+                      periods_per_year: int = Settings.BACKTEST.periods_per_year) -> np.ndarray:
+    """年化换手率，traded 为与权益同形状的逐期成交金额"""
+    equity = np.asarray(equity, dtype=float)
+    years = equity.shape[-1] / periods_per_year
+    return np.asarray(traded, dtype=float).sum(axis=-1) / equity.mean(axis=-1) / years
+
+
+def average_holding_period(position: np.ndarray) -> np.ndarray:
+    """平均持仓K线数：持仓K线总数 / 开仓次数"""
+    held = _as_2d(position) != 0
+    entries = held & ~np.pad(held, [(0, 0), (1, 0)])[:, :-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = held.sum(axis=-1) / entries.sum(axis=-1)
+    return _squeeze(result, np.ndim(position) == 1)
+
+
+def profit_factor(equity: np.ndarray) -> np.ndarray:
+    """盈利因子：逐期盈利之和 / 逐期亏损之和"""
+    pnl = np.diff(np.asarray(equity, dtype=float), axis=-1)
+    gains = np.where(pnl > 0, pnl, 0).sum(axis=-1)
+    losses = -np.where(pnl < 0, pnl, 0).sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return gains / losses
+
+
+def alpha_beta(equity: np.ndarray, benchmark: np.ndarray,
+               periods_per_year: int = Settings.BACKTEST.periods_per_year):
+    """
+    相对基准的年化alpha和beta
+
+    Args:
+        equity: 权益数组
+        benchmark: 与权益等长的基准价格（或净值）序列，批量分析时所有回测共用
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: alpha, beta
+    """
+    r = returns(equity)
+    b = returns(np.asarray(benchmark, dtype=float))
+    b_centered = b - b.mean()
+    beta = ((r - r.mean(axis=-1, keepdims=True)) * b_centered).sum(axis=-1) / (b_centered ** 2).sum()
+    alpha = (r.mean(axis=-1) - beta * b.mean()) * periods_per_year
+    return alpha, beta
+
+
+def monthly_returns(equity: np.ndarray, dates) -> pd.DataFrame:
+    """
+    月度收益表
+
+    Args:
+        equity: 权益数组
+        dates: 与权益等长的日期序列
+
+    Returns:
+        pd.DataFrame: 单次回测时行为年、列为月；批量时行为回测序号、列为月份
+    """
+    values = _as_2d(equity)
+    dates = pd.DatetimeIndex(dates)
+    months = dates.to_period('M')
+    # 每个月最后一根K线的位置
+    last = np.flatnonzero(np.append(months[1:] != months[:-1], True))
+    month_end = values[:, last]
+    prev = np.concatenate([values[:, :1], month_end[:, :-1]], axis=1)
+    table = month_end / prev - 1
+    labels = months[last]
+    if np.ndim(equity) == 1:
+        series = pd.Series(table[0], index=labels)
+        return pd.DataFrame({
+            'year': series.index.year,
+            'month': series.index.month,
+            'return': series.to_numpy(),
+        }).pivot(index='year', columns='month', values='return')
+    return pd.DataFrame(table, columns=labels.astype(str))
+
+
+def drawdown_table(equity: np.ndarray, dates=None, top: int = 5) -> pd.DataFrame:
+    """
+    单次回测的回撤区间表，按回撤深度排序
+
+    Returns:
+        pd.DataFrame: 每个回撤区间的开始、谷底、恢复位置、深度和持续K线数，未恢复的区间恢复位置为空
+    """
+    values = np.asarray(equity, dtype=float)
+    dd = drawdown(values)
+    underwater = dd < 0
+    edges = np.diff(np.concatenate([[0], underwater.astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)  # 恢复到前高的位置，等于长度时表示尚未恢复
+    rows = []
+    for start, end in zip(starts, ends):
+        trough = start + int(np.argmin(dd[start:end]))
+        rows.append({
+            'peak': start - 1,
+            'trough': trough,
+            'recovery': end if end < len(values) else None,
+            'depth': dd[trough],
+            'duration': end - start + 1,
+        })
+    table = pd.DataFrame(rows, columns=['peak', 'trough', 'recovery', 'depth', 'duration'])
+    table = table.sort_values('depth').head(top).reset_index(drop=True)
+    if dates is not None and not table.empty:
+        dates = pd.DatetimeIndex(dates)
+        for column in ('peak', 'trough', 'recovery'):
+            table[f'{column}_date'] = [dates[int(i)] if pd.notna(i) else pd.NaT
+                                       for i in table[column]]
+    return table
+
+
+def tearsheet(equity: np.ndarray,
+              position: Optional[np.ndarray] = None,
+              close: Optional[np.ndarray] = None,
+              traded: Optional[np.ndarray] = None,
+              benchmark: Optional[np.ndarray] = None,
+              risk_free_rate: float = Settings.BACKTEST.risk_free_rate,
+              periods_per_year: int = Settings.BACKTEST.periods_per_year) -> Dict[str, np.ndarray]:
+    """
+    计算完整的绩效指标集合
+
+    Args:
+        equity: 权益数组，一维或 [回测数, K线数]
+        position: 与权益同形状的持仓数组，提供后计算持仓占比、平均持仓周期和换手率
+        close: 收盘价（与K线数等长或与权益同形状），与持仓数量一起计算换手率
+        traded: 与权益同形状的逐期成交金额，持仓为敞口比例等没有收盘价口径时用于计算换手率
+        benchmark: 基准价格序列，提供后计算alpha/beta
+        risk_free_rate: 无风险年化利率
+        periods_per_year: 每年周期数
+
+    Returns:
+        Dict[str, np.ndarray]: 指标名到数值（单次回测）或数组（批量）的映射
+    """
+    report = {
+        'total_return': total_return(equity),
+        'annual_return': annual_return(equity, periods_per_year),
+        'annual_volatility': annual_volatility(equity, periods_per_year),
+        'sharpe_ratio': sharpe_ratio(equity, risk_free_rate, periods_per_year),
+        'sortino_ratio': sortino_ratio(equity, risk_free_rate, periods_per_year),
+        'max_drawdown': max_drawdown(equity),
+        'max_drawdown_duration': max_drawdown_duration(equity),
+        'calmar_ratio': calmar_ratio(equity, periods_per_year),
+        'profit_factor': profit_factor(equity),
+    }
+    if position is not None:
+        report['exposure'] = exposure(position)
+        report['average_holding_period'] = average_holding_period(position)
+        if close is not None:
+            report['turnover'] = turnover(position, close, equity, periods_per_year)
+    if traded is not None:
+        report['turnover'] = notional_turnover(traded, equity, periods_per_year)
+    if benchmark is not None:
+        report['alpha'], report['beta'] = alpha_beta(equity, benchmark, periods_per_year)
+    return report
+
+
+def tearsheet_frame(equity: np.ndarray, **kwargs) -> pd.DataFrame:
+    """批量回测的绩效表，每行对应一次回测"""
+    report = tearsheet(_as_2d(equity), **kwargs)
+    return pd.DataFrame({name: np.atleast_1d(value) for name, value in report.items()})
@@ -1,23 +1,37 @@
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
 import numpy as np
 import pandas as pd
 
-from ..models.entities import StockData
+from ..config.settings import Settings
+from ..models.entities import MarketPanel, StockData
+from . import analytics
+from .data_source import DataFrameChunkSource, ParquetChunkSource
+from .event_engine import EventBacktestResult, EventEngine, TargetEventStrategy
+from .fill_models import FeeModel, FillModel
+from .indicators import compute_indicators
+from .ledger import EquityLedger, TradeLog
+from .risk import RiskEngine
 from ..utils.data_processor import DataProcessor
 from ..utils.logger import Logger
 
+# 回测引擎版本，撮合或指标口径变化时递增，旧的缓存结果随之失效
+ENGINE_VERSION = "2.4"
+
 class BacktestEngine:
     """
     回测引擎类
     用于执行策略回测并计算各项指标
     """
-    def __init__(self, initial_capital: float = 1000000):
+    def __init__(self, initial_capital: float = Settings.BACKTEST.initial_capital,
+                 risk: Optional[RiskEngine] = None):
         self.logger = Logger()
         self.data_processor = DataProcessor()
         self.initial_capital = initial_capital
-        self.commission_rate = 0.0003  # 佣金费率 0.03%
-        self.min_commission = 5  # 最低佣金 5元
-        self.transfer_fee_rate = 0.00001  # 过户费 0.001%
-        self.stamp_duty_rate = 0.0005  # 印花税 0.05%，仅卖出收取
+        self.fee_model = FeeModel()
+        # 仓位规模与组合限制，与策略实时信号共用同一套风险参数
+        self.risk = risk or RiskEngine()
         self.reset()
         
     def reset(self):
@@ -25,7 +39,8 @@ class BacktestEngine:
         self.cash = self.initial_capital
         self.current_position = 0
         self.positions = []
-        self.portfolio_values = []
+        self.portfolio_values = EquityLedger()
+        self.trades = TradeLog()
         
     def _calculate_trading_cost(self, amount: float, is_buy: bool) -> float:
         """
@@ -38,14 +53,13 @@ class BacktestEngine:
         Returns:
             float: 总交易成本
         """
-        # 计算佣金
-        commission = max(amount * self.commission_rate, self.min_commission)
-        # 计算过户费
-        transfer_fee = amount * self.transfer_fee_rate
-        # 计算印花税（仅卖出时收取）
-        stamp_duty = amount * self.stamp_duty_rate if not is_buy else 0
-        
-        return commission + transfer_fee + stamp_duty
+        return self.fee_model.cost(amount, is_buy)
+
+    def _sized_targets(self, df: pd.DataFrame, strategy, code: str = '') -> np.ndarray:
+        """策略目标仓位经风险引擎换算后的敞口，单只股票不加杠杆"""
+        targets = self.risk.size_frame(df, strategy.position_targets(df),
+                                       getattr(strategy, 'max_units', 1), code)
+        return np.minimum(targets, 1.0)
 
     def run_backtest(self, stock_data: StockData, strategy) -> dict:
         """
@@ -59,33 +73,33 @@ class BacktestEngine:
             dict: 回测结果指标
         """
         try:
+            self.reset()
             df = self.data_processor.prepare_turtle_data(stock_data)
-            trades = []
+            targets = self._sized_targets(df, strategy, stock_data.code)
+            current_target = 0.0
             
             # 遍历每个交易日进行回测
             for i in range(1, len(df)):
                 current_row = df.iloc[i]
-                prev_row = df.iloc[i-1]
                 date = df.index[i]
                 
-                # 使用策略检查信号
-                entry_signal = strategy._check_entry_signal(current_row, prev_row)
-                exit_signal = strategy._check_exit_signal(current_row, prev_row)
-                
-                # 执行交易 - 使用100%仓位
-                if entry_signal and self.current_position == 0:
-                    # 计算可用资金（考虑交易成本）
-                    estimated_cost = self.cash
+                # 按风险引擎换算后的目标仓位占比调仓，海龟等策略按单位分批
+                target = targets[i]
+                # 剩余现金不足以支付最低佣金时不再买入
+                if target > current_target and self.cash > self.fee_model.min_commission:
+                    # 按目标增量占剩余可投资比例动用现金，满仓买入时即全部现金
+                    estimated_cost = self.cash * min((target - current_target) / (1 - current_target), 1.0)
                     trading_cost = self._calculate_trading_cost(estimated_cost, True)
-                    actual_cash = self.cash - trading_cost
+                    actual_cash = estimated_cost - trading_cost
                     
                     # 买入信号，使用扣除手续费后的现金
                     position_size = actual_cash / current_row['Close']
                     cost = position_size * current_row['Close']
                     total_cost = cost + trading_cost
                     
-                    self.current_position = position_size
+                    self.current_position += position_size
                     self.cash = self.cash - total_cost
+                    current_target = target
                     
                     self.logger.info(f"""
 买入信号 - {date.strftime('%Y-%m-%d')}:
@@ -95,105 +109,363 @@ class BacktestEngine:
     总成本: {total_cost:.2f}
     剩余现金: {self.cash:.2f}
 """)
-                    trades.append({
-                        'date': date,
-                        'action': 'BUY',
-                        'price': current_row['Close'],
-                        'size': position_size,
-                        'cost': cost,
-                        'trading_cost': trading_cost,
-                        'total_cost': total_cost
-                    })
+                    self.trades.append(date, 'BUY', current_row['Close'],
+                                       position_size, trading_cost)
                 
-                elif exit_signal and self.current_position > 0:
-                    # 卖出信号，清空所有仓位
-                    gross_revenue = self.current_position * current_row['Close']
+                elif target < current_target and self.current_position > 0:
+                    # 卖出信号，目标为0时清空所有仓位
+                    sell_size = self.current_position * (current_target - target) / current_target
+                    gross_revenue = sell_size * current_row['Close']
                     trading_cost = self._calculate_trading_cost(gross_revenue, False)
                     net_revenue = gross_revenue - trading_cost
                     
                     self.logger.info(f"""
 卖出信号 - {date.strftime('%Y-%m-%d')}:
     卖出价格: {current_row['Close']:.2f}
-    卖出数量: {self.current_position:.2f}
+    卖出数量: {sell_size:.2f}
     交易成本: {trading_cost:.2f}
     总收入(含费用): {gross_revenue:.2f}
     净收入(扣除费用): {net_revenue:.2f}
     当前现金: {self.cash:.2f}
 """)
-                    trades.append({
-                        'date': date,
-                        'action': 'SELL',
-                        'price': current_row['Close'],
-                        'size': self.current_position,
-                        'gross_revenue': gross_revenue,
-                        'trading_cost': trading_cost,
-                        'net_revenue': net_revenue
-                    })
-                    self.cash = net_revenue
-                    self.current_position = 0
+                    self.trades.append(date, 'SELL', current_row['Close'],
+                                       sell_size, trading_cost)
+                    self.cash += net_revenue
+                    self.current_position = 0 if target == 0 else self.current_position - sell_size
+                    current_target = target
                 
                 # 记录每日组合价值
                 portfolio_value = self.cash + (self.current_position * current_row['Close'])
-                self.portfolio_values.append({
-                    'date': date,
-                    'value': portfolio_value,
-                    'cash': self.cash,
-                    'position': self.current_position
-                })
+                self.portfolio_values.append(date, portfolio_value, self.cash,
+                                             self.current_position)
             
-            return self._calculate_metrics(trades)
+            return self._calculate_metrics()
             
         except Exception as e:
             self.logger.error(f"回测执行过程出错: {str(e)}")
             raise
             
-    def _calculate_metrics(self, trades: list) -> dict:
-        """计算回测指标"""
-        if not self.portfolio_values:
+    def run_event_backtest(self, stock_data: StockData, strategy,
+                           fill_model: Optional[FillModel] = None) -> dict:
+        """
+        使用事件驱动核心执行回测
+
+        与 run_backtest 相比支持次日开盘/K线均价成交、成交量参与率限制、
+        整手交易、T+1 交收和滑点，成交模型默认按 Settings.BACKTEST 组合。
+
+        Args:
+            stock_data: 股票数据
+            strategy: 提供 position_targets(df) 的交易策略对象
+            fill_model: 成交模型，为空时按配置构建
+
+        Returns:
+            dict: 回测结果指标
+        """
+        try:
+            self.reset()
+            df = self.data_processor.prepare_turtle_data(stock_data)
+            # 没有K线时与 run_backtest 一致，返回空指标
+            if df.empty:
+                return self._calculate_metrics()
+            targets = self._sized_targets(df, strategy, stock_data.code)
+            engine = EventEngine(self.initial_capital, fill_model=fill_model,
+                                 fee_model=self.fee_model)
+            result = engine.run(df, TargetEventStrategy(targets, stock_data.code))
+
+            # 与逐行回测保持一致，从第二根K线开始记录组合价值
+            self.portfolio_values.extend(result.index[1:], result.equity[1:],
+                                         result.cash[1:], result.position[1:])
+            self._log_fills(result.fills)
+            return self._calculate_metrics()
+
+        except Exception as e:
+            self.logger.error(f"事件驱动回测执行过程出错: {str(e)}")
+            raise
+
+    def run_backtest_stream(self, chunks: Iterable[pd.DataFrame], strategy, code: str = '',
+                            fill_model: Optional[FillModel] = None) -> dict:
+        """
+        流式回测：逐块读取K线，指标预热数据、策略状态、仓位规模、账户和挂单跨块延续
+
+        策略的目标仓位（海龟策略含加仓单位）经风险引擎换算为敞口后驱动调仓，
+        结果与分块大小无关；峰值内存只取决于块大小，组合价值按交易日收盘记录，
+        分钟级数据的记录量也只与交易日数相关。
+
+        Args:
+            chunks: 按时间顺序产出OHLCV数据块的可迭代对象，如 ParquetChunkSource
+            strategy: 提供 stream_targets(df, start, state) 的交易策略对象
+            code: 股票代码
+            fill_model: 成交模型，为空时按配置构建
+
+        Returns:
+            dict: 回测结果指标
+        """
+        try:
+            self.reset()
+            engine = EventEngine(self.initial_capital, fill_model=fill_model,
+                                 fee_model=self.fee_model)
+            adapter = TargetEventStrategy(np.zeros(0), code)
+            session = engine.session(adapter)
+            max_units = getattr(strategy, 'max_units', 1)
+            lookback = warmup = state = held = None
+            fills = []
+            for chunk in chunks:
+                if chunk.empty:
+                    continue
+                if lookback is None:
+                    # 预热K线数按第一块的K线间隔折算，日内数据上的高周期指标同样完整预热
+                    lookback = max(strategy.warmup_bars(chunk.index), self.risk.lookback)
+                df, warmup = self.data_processor.prepare_turtle_chunk(chunk, warmup, lookback)
+                # 开头的预热行只用于计算指标，只回测本块数据
+                skip = len(df) - len(chunk)
+                targets, state = strategy.stream_targets(df, skip, state)
+                exposure, held = self.risk.size_chunk(df, targets, max_units, code, held)
+                adapter.update_targets(np.minimum(exposure, 1.0))
+                result = session.feed(df.iloc[skip:])
+                fills.extend(result.fills)
+                self._record_daily_values(result)
+            # 跨块成交的订单在全部数据推进完后再合并为一条交易记录
+            self._log_fills(fills)
+            return self._calculate_metrics()
+
+        except Exception as e:
+            self.logger.error(f"流式回测执行过程出错: {str(e)}")
+            raise
+
+    def check_stream_invariance(self, data: pd.DataFrame, strategy, code: str = '',
+                                chunk_sizes: Iterable[int] = (4000, 1000, 300, 97),
+                                fill_model: Optional[FillModel] = None) -> dict:
+        """
+        校验流式回测的结果与分块大小无关
+
+        同一份K线按不同的块大小流式回测，组合价值记录和成交记录都应与第一个块大小的结果一致。
+
+        Args:
+            data: 包含OHLCV的K线数据
+            strategy: 交易策略对象
+            code: 股票代码
+            chunk_sizes: 参与比较的块大小
+            fill_model: 成交模型，为空时按配置构建
+
+        Returns:
+            dict: 第一个块大小下的回测指标
+
+        Raises:
+            ValueError: 某个块大小的结果与第一个不一致
+        """
+        baseline = None
+        for chunk_size in chunk_sizes:
+            metrics = self.run_backtest_stream(DataFrameChunkSource(data, chunk_size), strategy,
+                                               code, fill_model)
+            ledger, trades = self.portfolio_values, self.trades.to_frame()
+            if baseline is None:
+                baseline = (chunk_size, metrics, ledger, trades)
+                continue
+            base_size, _, base_ledger, base_trades = baseline
+            same = (len(ledger) == len(base_ledger) and len(trades) == len(base_trades)
+                    and np.allclose(ledger.values, base_ledger.values, rtol=1e-9, atol=1e-6)
+                    and np.allclose(trades['size'].to_numpy(dtype=float),
+                                    base_trades['size'].to_numpy(dtype=float), rtol=1e-9, atol=1e-6))
+            if not same:
+                raise ValueError(f"{code} 流式回测结果随块大小变化: {chunk_size} 行与 {base_size} 行不一致")
+        return baseline[1] if baseline is not None else {}
+
+    def run_universe_stream(self, stock_codes: List[str], strategy, period: str = "max",
+                            interval: str = "1m", batch_size: Optional[int] = None) -> Dict[str, dict]:
+        """
+        对本地Parquet K线库中的多只股票逐只执行流式回测
+
+        Args:
+            stock_codes: 股票代码列表
+            strategy: 交易策略对象
+            period: 数据周期（用于定位本地文件）
+            interval: 数据间隔（用于定位本地文件）
+            batch_size: 每块行数，为空时按文件行组切块
+
+        Returns:
+            Dict[str, dict]: 股票代码到回测指标的映射
+        """
+        results = {}
+        for code in stock_codes:
+            try:
+                source = ParquetChunkSource.for_symbol(code, period, interval, batch_size)
+                metrics = self.run_backtest_stream(source, strategy, code)
+                metrics.pop('trades', None)
+                results[code] = metrics
+            except Exception as e:
+                self.logger.error(f"Skipping {code} due to error: {str(e)}")
+                continue
+        return results
+
+    def run_panel(self, panel: MarketPanel, strategies: list) -> Dict[str, dict]:
+        """
+        在同一份面板数据上向量化回测多个策略
+
+        所有策略所需指标的并集只计算一次；每个策略的目标仓位经风险引擎换算为
+        组合限制内的敞口，逐列计算每只股票的净值贡献，并把全部股票作为同一账户
+        计算组合净值，调仓时按费率扣除佣金、过户费和卖出印花税（不含最低佣金）。
+
+        Args:
+            panel: DataProcessor.build_panel 生成的面板数据
+            strategies: BaseStrategy 策略对象列表
+
+        Returns:
+            Dict[str, dict]: 策略名称到结果的映射，结果包含 equity / position
+                （[K线数, 股票数] 的 DataFrame，position 为敞口）、按股票代码索引的
+                metrics 绩效表、组合净值 portfolio 及其绩效 portfolio_metrics
+        """
+        try:
+            names = set(self.risk.indicators)
+            for strategy in strategies:
+                names.update(strategy.indicators)
+            panel = compute_indicators(panel, names)
+
+            # 停牌等缺失K线按前收盘价计，收益率为0
+            close = pd.DataFrame(panel.fields['Close']).ffill().to_numpy()
+            asset_returns = np.zeros_like(close)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                asset_returns[1:] = np.nan_to_num(close[1:] / close[:-1] - 1)
+
+            fee = self.fee_model
+            buy_rate = fee.commission_rate + fee.transfer_fee_rate
+            sell_rate = buy_rate + fee.stamp_duty_rate
+
+            results = {}
+            for strategy in strategies:
+                position = self.risk.size(panel, strategy.target_positions(panel), strategy.max_units)
+                change = np.diff(position, axis=0, prepend=0)
+                period_returns = np.zeros_like(close)
+                # 按收盘价换仓，当根K线的持仓赚取下一根K线的收益
+                period_returns[1:] = position[:-1] * asset_returns[1:]
+                period_returns -= np.where(change > 0, change * buy_rate, -change * sell_rate)
+                equity = self.initial_capital * np.cumprod(1 + period_returns, axis=0)
+
+                # 敞口变化乘以调仓前的权益即为成交金额
+                held = np.concatenate([np.full((1, equity.shape[1]), self.initial_capital), equity[:-1]])
+                metrics = analytics.tearsheet_frame(equity.T, position=position.T,
+                                                    traded=(np.abs(change) * held).T)
+                metrics.index = pd.Index(panel.codes, name='code')
+                # 组合按目标敞口每根K线再平衡，收益为各股票贡献之和
+                portfolio = self.initial_capital * np.cumprod(1 + period_returns.sum(axis=1))
+                portfolio_held = np.concatenate([[self.initial_capital], portfolio[:-1]])
+                label = strategy.name if strategy.name not in results else f"{strategy.name}_{len(results)}"
+                results[label] = {
+                    'equity': pd.DataFrame(equity, index=panel.index, columns=panel.codes),
+                    'position': pd.DataFrame(position, index=panel.index, columns=panel.codes),
+                    'metrics': metrics,
+                    'portfolio': pd.Series(portfolio, index=panel.index),
+                    'portfolio_metrics': analytics.tearsheet(
+                        portfolio, position=position.sum(axis=1),
+                        traded=np.abs(change).sum(axis=1) * portfolio_held),
+                }
+            return results
+
+        except Exception as e:
+            self.logger.error(f"多策略面板回测执行过程出错: {str(e)}")
+            raise
+
+    def _record_daily_values(self, result: EventBacktestResult) -> None:
+        """按交易日记录收盘时的组合价值，跨块的同一交易日以最后一根K线为准"""
+        frame = result.to_frame()
+        if frame.empty:
+            return
+        daily = frame.groupby(frame.index.normalize()).last()
+        if self.portfolio_values.last_date == daily.index[0]:
+            self.portfolio_values.pop()
+        self.portfolio_values.extend(daily.index, daily['value'].to_numpy(),
+                                     daily['cash'].to_numpy(), daily['position'].to_numpy())
+
+    def _log_fills(self, fills: list) -> None:
+        """将同一订单的多笔成交合并为一条交易记录写入成交日志"""
+        orders = {}
+        for fill in fills:
+            order = orders.get(fill.order_id)
+            if order is None:
+                orders[fill.order_id] = [fill.timestamp, fill.side, fill.quantity,
+                                         fill.quantity * fill.price, fill.trading_cost]
+            else:
+                order[2] += fill.quantity
+                order[3] += fill.quantity * fill.price
+                order[4] += fill.trading_cost
+        for date, side, size, amount, trading_cost in orders.values():
+            self.trades.append(date, side, amount / size, size, trading_cost)
+
+    def _calculate_metrics(self) -> dict:
+        """根据组合价值记录和成交日志计算回测指标，整体为 O(n)"""
+        if not len(self.portfolio_values):
             return {}
-            
-        portfolio_values = pd.DataFrame(self.portfolio_values)
-        portfolio_values.set_index('date', inplace=True)
-        
+
+        values = self.portfolio_values.values
+        dates = self.portfolio_values.dates
+
         # 计算收益率
-        initial_value = portfolio_values['value'].iloc[0]
-        final_value = portfolio_values['value'].iloc[-1]
+        initial_value = values[0]
+        final_value = values[-1]
         total_return = (final_value - initial_value) / initial_value
-        
-        # 计算每日收益率
-        daily_returns = portfolio_values['value'].pct_change().dropna()
-        
+
         # 计算年化收益率
-        days = (portfolio_values.index[-1] - portfolio_values.index[0]).days
-        annual_return = (1 + total_return) ** (365/days) - 1
-        
-        # 计算夏普比率
-        risk_free_rate = 0.03
-        excess_returns = daily_returns - risk_free_rate/252
-        sharpe_ratio = np.sqrt(252) * excess_returns.mean() / daily_returns.std()
-        
-        # 计算最大回撤
-        cummax = portfolio_values['value'].cummax()
-        drawdown = (portfolio_values['value'] - cummax) / cummax
-        max_drawdown = drawdown.min()
-        
-        # 计算交易统计
-        winning_trades = [t for t in trades if t['action'] == 'SELL' and 
-                         t['net_revenue'] > trades[trades.index(t)-1]['total_cost']]
-        total_sell_trades = len([t for t in trades if t['action'] == 'SELL'])
-        
-        # 计算总交易成本
-        total_trading_cost = sum(t['trading_cost'] for t in trades)
-        
+        days = int((dates[-1] - dates[0]).astype('timedelta64[D]').astype(np.int64))
+        # 记录不足一个自然日（如单日的分钟数据）时无法年化
+        annual_return = (1 + total_return) ** (365/days) - 1 if days > 0 else np.nan
+
+        # 计算夏普比率和最大回撤
+        sharpe_ratio = analytics.sharpe_ratio(values)
+        max_drawdown = analytics.max_drawdown(values)
+
+        # 计算交易统计（持仓回到零计为一笔完整交易）
+        trade_stats = self.trades.round_trip_stats()
+        total_trades = trade_stats['total_trades']
+        winning_trades = trade_stats['winning_trades']
+
         return {
             'total_return': total_return,
             'annual_return': annual_return,
             'sharpe_ratio': sharpe_ratio,
             'max_drawdown': max_drawdown,
-            'total_trades': total_sell_trades,
-            'winning_trades': len(winning_trades),
-            'win_rate': len(winning_trades) / total_sell_trades if total_sell_trades > 0 else 0,
+            'total_trades': total_trades,
+            'winning_trades': winning_trades,
+            'win_rate': winning_trades / total_trades if total_trades > 0 else 0,
             'final_value': final_value,
-            'total_trading_cost': total_trading_cost,
-            'trades': trades
-        } 
\ No newline at end of file
+            'total_trading_cost': trade_stats['total_trading_cost'],
+            'trades': self.trades.to_frame()
+        }
+
+    def tearsheet(self, benchmark: Optional[np.ndarray] = None) -> dict:
+        """
+        基于最近一次回测的组合价值记录计算完整绩效指标
+
+        Args:
+            benchmark: 与组合价值记录等长的基准价格序列
+
+        Returns:
+            dict: 指标名到数值的映射，另含回撤区间表和月度收益表
+        """
+        ledger = self.portfolio_values
+        if len(ledger) < 2:
+            return {}
+        # 成交金额按成交时间归入所在（或之前最近）的记录期
+        trades = self.trades.data
+        period = np.searchsorted(ledger.dates, trades['date'], side='right') - 1
+        traded = np.bincount(np.clip(period, 0, None), weights=trades['amount'], minlength=len(ledger))
+        report = analytics.tearsheet(ledger.values, position=ledger.data['position'],
+                                     traded=traded[:len(ledger)], benchmark=benchmark)
+        report['drawdowns'] = analytics.drawdown_table(ledger.values, ledger.dates)
+        report['monthly_returns'] = analytics.monthly_returns(ledger.values, ledger.dates)
+        return report
+
+    def export(self, output_dir: Path) -> Dict[str, Path]:
+        """
+        导出组合价值曲线和成交日志
+
+        Args:
+            output_dir: 输出目录
+
+        Returns:
+            Dict[str, Path]: 组合价值（.npy）和成交日志（.npy）的文件路径
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        return {
+            'equity': self.portfolio_values.save(output_dir / 'equity.npy'),
+            'trades': self.trades.save(output_dir / 'trades.npy'),
+        }
@@ -0,0 +1,324 @@
+"""
+全市场滚动相关性与协方差
+
+收益率保存在长度为 window 的环形缓冲区中，同时维护收益率之和与交叉乘积矩阵。
+每根新K线只对交叉乘积做一次秩一更新（加入新收益率、移出最旧的收益率），
+不需要重新计算全部 N² 个股票对；批量补入大量K线时改为从缓冲区整体重算。
+缺失的收益率（停牌、未上市）按0计入，有效收益率不足 min_periods 的股票不输出结果。
+"""
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from ..config.settings import Settings
+from ..models.entities import MarketPanel
+from ..utils.logger import Logger
+
+
+def ledoit_wolf_shrinkage(x: np.ndarray, cov: np.ndarray) -> float:
+    """
+    Ledoit-Wolf 收缩强度，收缩目标为与样本协方差迹相同的单位阵
+
+    Args:
+        x: [样本数, 变量数] 的已去均值数据
+        cov: x 的协方差（除以样本数）
+
+    Returns:
+        float: 0~1 的收缩强度
+    """
+    n_samples, n_features = x.shape
+    mu = np.trace(cov) / n_features
+    # ||S - mu*I||² 与 S 的估计误差，后者由每个样本外积与 S 的偏差给出
+    delta = (np.sum(cov ** 2) - 2 * mu * np.trace(cov) + n_features * mu ** 2) / n_features
+    beta = (np.sum(np.sum(x ** 2, axis=1) ** 2) / n_samples - np.sum(cov ** 2)) / (n_features * n_samples)
+    beta = min(beta, delta)
+    return 0.0 if beta <= 0 else float(beta / delta)
+
+
+def shrink(cov: np.ndarray, intensity: float) -> np.ndarray:
+    """将协方差向 迹均值 * 单位阵 收缩"""
+    mu = np.trace(cov) / len(cov)
+    result = (1 - intensity) * cov
+    result.flat[::len(cov) + 1] += intensity * mu
+    return result
+
+
+class CorrelationService:
+    """
+    全市场滚动相关性与协方差服务
+
+    update_panel() 只处理晚于上次更新日期的K线，状态可保存到磁盘并在下次启动时恢复；
+    correlation()/covariance() 按需计算矩阵，支持 Ledoit-Wolf 收缩，
+    correlated_groups() 给出可直接用于 Settings.RISK.groups 的相关组划分。
+    """
+    def __init__(self, window: Optional[int] = None, path: Optional[Path] = None):
+        self.logger = Logger()
+        self.config = Settings.CORRELATION
+        self.window = window or self.config.window
+        self.path = Path(path or Settings.DATA.correlation_file)
+        self.codes: List[str] = []
+        self.last_date: Optional[pd.Timestamp] = None
+        # 环形缓冲区：收益率和有效标记，_pos 为下一次写入的位置
+        self._returns = np.zeros((self.window, 0))
+        self._valid = np.zeros((self.window, 0), dtype=bool)
+        self._pos = 0
+        self._count = 0
+        self._last_close = np.zeros(0)
+        self._sum = np.zeros(0)
+        self._cross = np.zeros((0, 0))
+        # 距上次整体重算的增量更新次数，每 window 次重算一次以消除浮点累积误差
+        self._updates = 0
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def update_panel(self, panel: MarketPanel) -> int:
+        """
+        用面板中晚于上次更新日期的K线更新状态，新出现的股票自动加入
+
+        Args:
+            panel: 包含 Close 字段的面板数据
+
+        Returns:
+            int: 本次处理的K线数
+        """
+        try:
+            known = self._positions()
+            self._extend([code for code in panel.codes if code not in known])
+            positions = self._positions()
+            cols = np.asarray([positions[code] for code in panel.codes], dtype=np.int64)
+
+            start = 0 if self.last_date is None else int(panel.index.searchsorted(self.last_date, side='right'))
+            if start >= len(panel.index):
+                return 0
+            close = np.full((len(panel.index) - start, len(self.codes)), np.nan)
+            close[:, cols] = panel.fields['Close'][start:]
+
+            # 以上次的收盘价为基准计算收益率，停牌期间沿用停牌前的收盘价
+            filled = pd.DataFrame(np.vstack([self._last_close, close])).ffill().to_numpy()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                returns = filled[1:] / filled[:-1] - 1
+            valid = np.isfinite(returns) & np.isfinite(close)
+            self._last_close = filled[-1]
+            # 没有任何股票具备前收盘价的K线（首次更新的第一根）不计入窗口
+            keep = valid.any(axis=1)
+            self._push(np.where(valid, returns, 0.0)[keep], valid[keep])
+            self.last_date = panel.index[-1]
+            return len(close)
+
+        except Exception as e:
+            self.logger.error(f"更新相关性矩阵出错: {str(e)}")
+            raise
+
+    def covariance(self, shrinkage: Union[str, float, None] = None) -> np.ndarray:
+        """
+        收益率协方差矩阵
+
+        Args:
+            shrinkage: 'ledoit_wolf'、'none' 或 0~1 的固定收缩强度，默认取配置
+
+        Returns:
+            np.ndarray: [股票数, 股票数] 的协方差，有效数据不足的股票所在行列为 NaN
+        """
+        x, cov, active = self._centered()
+        return self._scatter(self._shrink(x, cov, shrinkage), active)
+
+    def correlation(self, shrinkage: Union[str, float, None] = None) -> np.ndarray:
+        """
+        收益率相关系数矩阵
+
+        收缩在标准化收益率上进行，目标为单位阵，即把相关系数向0收缩。
+
+        Args:
+            shrinkage: 'ledoit_wolf'、'none' 或 0~1 的固定收缩强度，默认取配置
+
+        Returns:
+            np.ndarray: [股票数, 股票数] 的相关系数，有效数据不足的股票所在行列为 NaN
+        """
+        x, cov, active = self._centered()
+        std = np.sqrt(np.diag(cov))
+        z = x / std
+        corr = cov / np.outer(std, std)
+        corr = self._shrink(z, corr, shrinkage)
+        np.fill_diagonal(corr, 1.0)
+        return self._scatter(np.clip(corr, -1.0, 1.0), active)
+
+    def frame(self, kind: str = 'correlation', shrinkage: Union[str, float, None] = None) -> pd.DataFrame:
+        """以股票代码为行列标签的相关系数（kind='correlation'）或协方差（kind='covariance'）矩阵"""
+        values = self.covariance(shrinkage) if kind == 'covariance' else self.correlation(shrinkage)
+        return pd.DataFrame(values, index=self.codes, columns=self.codes)
+
+    def most_correlated(self, code: str, top: int = 10,
+                        shrinkage: Union[str, float, None] = None) -> pd.DataFrame:
+        """
+        与指定股票相关性最高的股票
+
+        Returns:
+            pd.DataFrame: 包含 code/correlation 列，按相关系数降序
+        """
+        positions = self._positions()
+        if code not in positions:
+            raise ValueError(f"相关性矩阵中没有股票: {code}")
+        row = self.correlation(shrinkage)[positions[code]]
+        order = [i for i in np.argsort(-np.nan_to_num(row, nan=-np.inf), kind='stable')
+                 if i != positions[code] and np.isfinite(row[i])]
+        return pd.DataFrame({'code': [self.codes[i] for i in order[:top]],
+                             'correlation': row[order[:top]]})
+
+    def correlated_groups(self, threshold: Optional[float] = None,
+                          shrinkage: Union[str, float, None] = None) -> Dict[str, str]:
+        """
+        按相关系数划分相关组：相关系数不低于阈值的股票相连，连通的股票属于同一组
+
+        Args:
+            threshold: 相关系数阈值，默认取配置
+            shrinkage: 收缩方法，默认取配置
+
+        Returns:
+            Dict[str, str]: 股票代码到组名称（组内第一只股票的代码）的映射，只包含两只及以上股票的组
+        """
+        threshold = self.config.group_threshold if threshold is None else threshold
+        with np.errstate(invalid='ignore'):
+            adjacent = self.correlation(shrinkage) >= threshold
+        n = len(self.codes)
+        labels = np.arange(n)
+        # 标签传播：每轮取相邻股票中的最小标签，直到不再变化
+        while True:
+            updated = np.minimum(labels, np.where(adjacent, labels[None, :], n).min(axis=1))
+            updated = updated[updated]
+            if np.array_equal(updated, labels):
+                break
+            labels = updated
+        sizes = np.bincount(labels, minlength=n)
+        return {self.codes[i]: self.codes[labels[i]] for i in range(n) if sizes[labels[i]] > 1}
+
+    def load(self) -> 'CorrelationService':
+        """从磁盘恢复状态，文件不存在时保持空状态"""
+        if not self.path.exists():
+            return self
+        with np.load(self.path, allow_pickle=False) as archive:
+            window = int(archive['window'])
+            if window != self.window:
+                self.logger.info(f"相关性状态的窗口为 {window}，与当前窗口 {self.window} 不一致，重新计算")
+                return self
+            self.codes = archive['codes'].tolist()
+            self._returns = archive['returns']
+            self._valid = archive['valid']
+            self._last_close = archive['last_close']
+            self._pos = int(archive['pos'])
+            self._count = int(archive['count'])
+            last_date = archive['last_date']
+            self.last_date = pd.Timestamp(last_date.item()) if last_date.size else None
+        self._rebuild()
+        return self
+
+    def save(self) -> None:
+        """原子写入状态文件，交叉乘积矩阵不保存，加载时由缓冲区重算"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        last_date = ([] if self.last_date is None
+                     else [np.datetime64(self.last_date.to_datetime64(), 'ns')])
+        with open(tmp_path, 'wb') as f:
+            np.savez(f,
+                     window=self.window,
+                     codes=np.asarray(self.codes, dtype=str),
+                     returns=self._returns,
+                     valid=self._valid,
+                     last_close=self._last_close,
+                     pos=self._pos,
+                     count=self._count,
+                     last_date=np.asarray(last_date, dtype='datetime64[ns]'))
+        os.replace(tmp_path, self.path)
+
+    def _positions(self) -> Dict[str, int]:
+        return {code: i for i, code in enumerate(self.codes)}
+
+    def _extend(self, codes: Sequence[str]) -> None:
+        """加入新股票，其历史收益率按缺失处理"""
+        if not codes:
+            return
+        k = len(codes)
+        n = len(self.codes)
+        self.codes = self.codes + list(codes)
+        self._returns = np.hstack([self._returns, np.zeros((self.window, k))])
+        self._valid = np.hstack([self._valid, np.zeros((self.window, k), dtype=bool)])
+        self._last_close = np.concatenate([self._last_close, np.full(k, np.nan)])
+        self._sum = np.concatenate([self._sum, np.zeros(k)])
+        cross = np.zeros((n + k, n + k))
+        cross[:n, :n] = self._cross
+        self._cross = cross
+
+    def _push(self, returns: np.ndarray, valid: np.ndarray) -> None:
+        """写入新的收益率行，少量K线逐行秩一更新，大量K线写入后整体重算"""
+        k = len(returns)
+        if k == 0:
+            return
+        if k * 10 >= self.window or self._updates + k >= self.window:
+            returns, valid = returns[-self.window:], valid[-self.window:]
+            slots = (self._pos + np.arange(len(returns))) % self.window
+            self._returns[slots] = returns
+            self._valid[slots] = valid
+            self._pos = (self._pos + len(returns)) % self.window
+            self._count = min(self._count + len(returns), self.window)
+            self._rebuild()
+            return
+        for row, mask in zip(returns, valid):
+            # 加入新行、移出最旧一行合并为一次秩二更新
+            old = self._returns[self._pos] if self._count == self.window else np.zeros_like(row)
+            self._sum += row - old
+            self._cross += np.stack([row, old], axis=1) @ np.stack([row, -old])
+            self._returns[self._pos] = row
+            self._valid[self._pos] = mask
+            self._pos = (self._pos + 1) % self.window
+            self._count = min(self._count + 1, self.window)
+        self._updates += k
+
+    def _rebuild(self) -> None:
+        """由缓冲区重算收益率之和与交叉乘积"""
+        filled = self._window_rows()
+        self._sum = filled.sum(axis=0)
+        self._cross = filled.T @ filled
+        self._updates = 0
+
+    def _window_rows(self) -> np.ndarray:
+        """窗口内已写入的收益率行"""
+        if self._count == self.window:
+            return self._returns
+        return self._returns[(self._pos - self._count + np.arange(self._count)) % self.window]
+
+    def _centered(self):
+        """有效股票的去均值收益率、协方差（除以样本数）和有效股票的下标"""
+        if self._count < 2:
+            raise ValueError("相关性窗口内的K线不足，请先更新数据")
+        observed = self._valid.sum(axis=0)
+        min_periods = min(self.config.min_periods, self._count)
+        active = np.flatnonzero(observed >= min_periods)
+        mean = self._sum[active] / self._count
+        cov = self._cross[np.ix_(active, active)] / self._count - np.outer(mean, mean)
+        # 窗口内收益率恒为0的股票方差为0，同样视为无效
+        nonzero = np.diag(cov) > 0
+        active, mean, cov = active[nonzero], mean[nonzero], cov[np.ix_(nonzero, nonzero)]
+        x = self._window_rows()[:, active] - mean
+        return x, cov, active
+
+    def _shrink(self, x: np.ndarray, cov: np.ndarray, shrinkage: Union[str, float, None]) -> np.ndarray:
+        shrinkage = self.config.shrinkage if shrinkage is None else shrinkage
+        if shrinkage == 'ledoit_wolf':
+            intensity = ledoit_wolf_shrinkage(x, cov) if len(cov) > 1 else 0.0
+        elif shrinkage == 'none':
+            intensity = 0.0
+        elif isinstance(shrinkage, (int, float)) and 0 <= shrinkage <= 1:
+            intensity = float(shrinkage)
+        else:
+            raise ValueError(f"未知的收缩方法: {shrinkage}，可选: ledoit_wolf / none / 0~1 的收缩强度")
+        return shrink(cov, intensity) if intensity > 0 else cov
+
+    def _scatter(self, values: np.ndarray, active: np.ndarray) -> np.ndarray:
+        """把有效股票的矩阵放回全部股票的位置，其余为 NaN"""
+        n = len(self.codes)
+        result = np.full((n, n), np.nan)
+        result[np.ix_(active, active)] = values
+        return result
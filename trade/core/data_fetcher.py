@@ -107,6 +107,25 @@ class DataFetcher:
             data.index = data.index.tz_localize(None)
         return data
     
+    def fetch_recent_bars(self, stock_code: str, period: str = "5d", interval: str = "1d",
+                          completed_only: bool = True) -> pd.DataFrame:
+        """
+        直接从网络获取最近一段K线，不读写本地缓存，供实时监控轮询使用
+
+        Args:
+            stock_code: 股票代码
+            period: 获取的时间范围
+            interval: 数据间隔
+            completed_only: 交易时间内丢弃最后一根尚未收盘的K线
+
+        Returns:
+            pd.DataFrame: K线数据
+        """
+        data = self._fetch_from_yfinance(stock_code, period=period, interval=interval)
+        if completed_only and not data.empty and self._is_trading_hours():
+            data = data.iloc[:-1]
+        return data
+
     def _is_trading_hours(self) -> bool:
         """检查当前是否是交易时间"""
         now = datetime.now()
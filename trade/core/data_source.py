@@ -0,0 +1,74 @@
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+from ..config.settings import Settings
+
+_OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class DataFrameChunkSource:
+    """将内存中的K线数据按固定行数切块，接口与 ParquetChunkSource 一致"""
+
+    def __init__(self, data: pd.DataFrame, chunk_size: int = 100000):
+        self.data = data
+        self.chunk_size = chunk_size
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        for start in range(0, len(self.data), self.chunk_size):
+            yield self.data.iloc[start:start + self.chunk_size]
+
+
+class ParquetChunkSource:
+    """
+    按行组（或固定批大小）逐块读取Parquet K线文件
+
+    每次只有一个数据块驻留内存，适合多年分钟级数据的流式回测。
+    """
+
+    def __init__(self, path: Path, batch_size: Optional[int] = None,
+                 columns: Optional[List[str]] = None):
+        """
+        Args:
+            path: Parquet文件路径
+            batch_size: 每块行数，为空时按文件的行组切块
+            columns: 读取的列，默认读取OHLCV
+        """
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.columns = columns or _OHLCV_COLUMNS
+
+    @classmethod
+    def for_symbol(cls, stock_code: str, period: str = "max", interval: str = "1m",
+                   batch_size: Optional[int] = None) -> 'ParquetChunkSource':
+        """按 DataFetcher 的缓存命名规则定位本地K线库中的文件"""
+        path = Path(Settings.DATA.parquet_dir) / f"{stock_code}_{period}_{interval}_data.parquet"
+        return cls(path, batch_size=batch_size)
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("分块读取Parquet需要安装 pyarrow") from e
+
+        parquet_file = pq.ParquetFile(self.path)
+        # 保留pandas写入的索引列，恢复时间索引
+        index_columns = [c for c in parquet_file.schema_arrow.pandas_metadata.get('index_columns', [])
+                         if isinstance(c, str)] if parquet_file.schema_arrow.pandas_metadata else []
+        columns = self.columns + index_columns
+
+        if self.batch_size is None:
+            for i in range(parquet_file.num_row_groups):
+                yield self._to_frame(parquet_file.read_row_group(i, columns=columns))
+        else:
+            for batch in parquet_file.iter_batches(batch_size=self.batch_size, columns=columns):
+                yield self._to_frame(pa.Table.from_batches([batch]))
+
+    @staticmethod
+    def _to_frame(table) -> pd.DataFrame:
+        df = table.to_pandas()
+        if isinstance(df.index, pd.DatetimeIndex) and df.index.tz is not None:
+            df.index = df.index.tz_localize(None)
+        return df
@@ -0,0 +1,325 @@
+"""
+预测效果评估
+
+在历史上的多个截止日回放预测：每个截止日只用截止日及之前的K线预测之后 days_ahead 根K线，
+与实际收盘价比较，按预测天数和股票统计 MAE、MAPE 和方向准确率，以及共形预测区间
+（实际价格相对预测价格的误差分位数）。
+
+基准预测模型在面板上一次预测全部股票，各截止日分组后在进程池中并行；LSTM 模型每只股票
+只在首个截止日之前的数据上训练一次，保存在评估模型库中（重复评估时直接加载，有新K线时只微调），
+该股票全部截止日的输入序列拼成一个批次预测。各预测天数的方向准确率作为经验置信度、
+误差分位数作为预测区间记录到模型库，预测结果的置信度和区间由此得出。
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..config.settings import Settings
+from ..models.entities import MarketPanel, StockData
+from ..utils.data_processor import DataProcessor
+from ..utils.logger import Logger
+from .forecasters import available_forecasters, create_forecaster
+from .model_registry import ModelRegistry
+
+
+def cutoff_positions(length: int, days_ahead: int, cutoffs: int, step: int,
+                     min_history: int = 1) -> np.ndarray:
+    """
+    历史截止日在K线序列中的位置
+
+    最近的截止日之后恰好留出 days_ahead 根K线用于比较，更早的截止日依次间隔 step 根。
+
+    Args:
+        length: K线数
+        days_ahead: 预测天数
+        cutoffs: 截止日数量
+        step: 截止日间隔（K线数）
+        min_history: 截止日及之前至少需要的K线数
+
+    Returns:
+        np.ndarray: 截止日所在的位置（含该K线），按时间先后排列
+    """
+    last = length - 1 - days_ahead
+    positions = last - step * np.arange(cutoffs)
+    return positions[positions >= min_history - 1][::-1]
+
+
+def _forecast_cutoffs(name: str, params: dict, close: np.ndarray, positions: Sequence[int],
+                      days_ahead: int) -> Tuple[Sequence[int], np.ndarray]:
+    """
+    在一组截止日上运行基准预测模型，在工作进程中执行
+
+    Returns:
+        Tuple: 截止日位置，[截止日数, 股票数, days_ahead] 的预测价格
+    """
+    forecaster = create_forecaster(name, **params)
+    return positions, np.stack([forecaster.forecast_close(close[:t + 1], days_ahead) for t in positions])
+
+
+def _future(close: np.ndarray, positions: Sequence[int], days_ahead: int) -> np.ndarray:
+    """各截止日之后 days_ahead 根K线的实际收盘价，[截止日数, 股票数, days_ahead]，超出数据范围为 NaN"""
+    padded = np.vstack([close, np.full((days_ahead, close.shape[1]), np.nan)])
+    return np.stack([padded[t + 1:t + 1 + days_ahead].T for t in positions])
+
+
+def forecast_errors(codes: Sequence[str], cutoffs: Sequence, last_close: np.ndarray,
+                    predicted: np.ndarray, actual: np.ndarray) -> pd.DataFrame:
+    """
+    把截止日 × 股票 × 预测天数的预测与实际值展开为明细表
+
+    Args:
+        codes: 股票代码
+        cutoffs: 截止日
+        last_close: [截止日数, 股票数] 的截止日收盘价
+        predicted: [截止日数, 股票数, 预测天数] 的预测价格
+        actual: 与 predicted 形状相同的实际收盘价
+
+    Returns:
+        pd.DataFrame: 每个 (截止日, 股票, 预测天数) 一行，包含误差、绝对百分比误差和方向是否正确
+        （预测无涨跌时为 NaN）；预测或实际值缺失的行被丢弃
+    """
+    n_cutoffs, n_codes, days_ahead = predicted.shape
+    last = np.repeat(last_close[:, :, None], days_ahead, axis=2)
+    frame = pd.DataFrame({
+        'cutoff': np.repeat(np.asarray(cutoffs), n_codes * days_ahead),
+        'code': np.tile(np.repeat(np.asarray(codes), days_ahead), n_cutoffs),
+        'horizon': np.tile(np.arange(1, days_ahead + 1), n_cutoffs * n_codes),
+        'last_close': last.ravel(),
+        'predicted_price': predicted.ravel(),
+        'actual_price': actual.ravel(),
+    }).dropna(subset=['last_close', 'predicted_price', 'actual_price'])
+    frame['error'] = frame['predicted_price'] - frame['actual_price']
+    frame['abs_error'] = frame['error'].abs()
+    frame['ape'] = frame['abs_error'] / frame['actual_price'].abs()
+    predicted_move = np.sign(frame['predicted_price'] - frame['last_close'])
+    # 预测价格等于截止日收盘价（如 naive）没有给出方向，不计入方向准确率
+    frame['direction_hit'] = (predicted_move == np.sign(frame['actual_price'] - frame['last_close'])
+                              ).astype(float).where(predicted_move != 0)
+    return frame.reset_index(drop=True)
+
+
+def conformal_bounds(ratios: np.ndarray, coverage: float) -> Tuple[float, float]:
+    """
+    共形预测的相对误差区间
+
+    取样本的 alpha/2 和 1-alpha/2 分位数并按样本数做有限样本修正，
+    新的预测与评估样本可交换时区间的覆盖率不低于 coverage。
+
+    Args:
+        ratios: 实际价格 / 预测价格 - 1
+        coverage: 目标覆盖率
+
+    Returns:
+        Tuple[float, float]: 相对误差的下限、上限
+    """
+    count = len(ratios)
+    alpha = 1 - coverage
+    low = max(np.floor((count + 1) * alpha / 2) / count, 0.0)
+    high = min(np.ceil((count + 1) * (1 - alpha / 2)) / count, 1.0)
+    return (float(np.quantile(ratios, low, method='lower')),
+            float(np.quantile(ratios, high, method='higher')))
+
+
+def summarize_errors(errors: pd.DataFrame, by: Sequence[str] = ('horizon',)) -> pd.DataFrame:
+    """
+    按预测天数（或股票等）汇总预测误差
+
+    Args:
+        errors: forecast_errors 返回的明细表
+        by: 分组列
+
+    Returns:
+        pd.DataFrame: 每组的样本数、MAE、MAPE 和方向准确率
+    """
+    return (errors.groupby(list(by))
+            .agg(count=('error', 'size'), mae=('abs_error', 'mean'), mape=('ape', 'mean'),
+                 directional_accuracy=('direction_hit', 'mean'))
+            .reset_index())
+
+
+class ForecastEvaluator:
+    """
+    预测效果评估
+
+    model_name 为 'lstm' 或已注册的基准预测模型名称。评估结果由 record 写入模型库，
+    此后该模型的预测结果使用评估得到的经验置信度和预测区间。
+    """
+    def __init__(self, model_name: str, days_ahead: int = 5, cutoffs: Optional[int] = None,
+                 step: Optional[int] = None, workers: Optional[int] = None,
+                 registry: Optional[ModelRegistry] = None):
+        """
+        Args:
+            model_name: 预测模型名称
+            days_ahead: 预测天数
+            cutoffs: 截止日数量，默认取配置
+            step: 截止日间隔（K线数），默认取配置
+            workers: 基准模型评估的工作进程数，默认取配置；1 为在当前进程内计算，
+                0 为按计算量自动决定
+            registry: 记录评估结果的模型库
+        """
+        if model_name != 'lstm' and model_name not in available_forecasters():
+            raise ValueError(f"不支持评估的预测模型: {model_name}，"
+                             f"可选: {', '.join(['lstm'] + available_forecasters())}")
+        self.logger = Logger()
+        self.config = Settings.EVALUATION
+        self.model_name = model_name
+        self.days_ahead = days_ahead
+        self.cutoffs = cutoffs or self.config.cutoffs
+        self.step = step or self.config.step
+        self.workers = self.config.workers if workers is None else workers
+        self.registry = registry or ModelRegistry()
+
+    def evaluate(self, stock_datas: List[StockData]) -> pd.DataFrame:
+        """
+        评估一组股票
+
+        Args:
+            stock_datas: 股票数据列表
+
+        Returns:
+            pd.DataFrame: forecast_errors 格式的预测明细
+        """
+        try:
+            if self.model_name == 'lstm':
+                return self._evaluate_lstm(stock_datas)
+            return self.evaluate_panel(DataProcessor.build_panel(stock_datas))
+
+        except Exception as e:
+            self.logger.error(f"评估预测模型出错: {str(e)}")
+            raise
+
+    def evaluate_panel(self, panel: MarketPanel) -> pd.DataFrame:
+        """
+        在面板（如选股快照）上评估基准预测模型
+
+        Args:
+            panel: 面板数据
+
+        Returns:
+            pd.DataFrame: forecast_errors 格式的预测明细
+        """
+        if self.model_name == 'lstm':
+            raise ValueError("LSTM 模型按股票训练，请使用 evaluate")
+        close = panel.fields['Close']
+        positions = cutoff_positions(len(panel.index), self.days_ahead, self.cutoffs, self.step,
+                                     Settings.FORECAST.min_history)
+        if not len(positions):
+            raise ValueError(f"K线数不足以评估: 至少需要 {Settings.FORECAST.min_history + self.days_ahead} 根")
+
+        workers = self._workers(len(positions), close.size)
+        self.logger.info(f"评估 {self.model_name}: {len(panel.codes)} 只股票，"
+                         f"{len(positions)} 个截止日，{workers} 个进程")
+        # 截止日交错分组，各组的历史长度相近，负载均衡
+        chunks = [positions[i::workers] for i in range(workers)]
+        if workers == 1:
+            results = [_forecast_cutoffs(self.model_name, {}, close, chunks[0], self.days_ahead)]
+        else:
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = [pool.submit(_forecast_cutoffs, self.model_name, {},
+                                       close[:chunk[-1] + 1], chunk, self.days_ahead)
+                           for chunk in chunks]
+                results = [future.result() for future in futures]
+
+        done = np.concatenate([chunk for chunk, _ in results])
+        order = np.argsort(done)
+        positions = done[order]
+        predicted = np.concatenate([prices for _, prices in results])[order]
+        # 截止日停牌的股票以之前最后一个有效收盘价作为方向判断的基准
+        last_close = pd.DataFrame(close).ffill().to_numpy()[positions]
+        return forecast_errors(panel.codes, panel.index[positions], last_close, predicted,
+                               _future(close, positions, self.days_ahead))
+
+    def _workers(self, cutoffs: int, cells: int) -> int:
+        """
+        实际使用的进程数，不超过截止日数
+
+        自动模式下只有 截止日数 × 面板大小 达到 parallel_min_cells 时才按CPU核数启用多进程，
+        否则在当前进程内计算。
+        """
+        workers = self.workers
+        if workers == 0:
+            workers = (os.cpu_count() or 1) if cutoffs * cells >= self.config.parallel_min_cells else 1
+        return max(1, min(workers, cutoffs))
+
+    def _evaluate_lstm(self, stock_datas: List[StockData]) -> pd.DataFrame:
+        """每只股票在首个截止日之前的数据上训练一次，全部截止日一个批次预测"""
+        from .lstm_predictor import LSTMPredictor
+
+        predictor = LSTMPredictor(registry=self.registry.evaluation_registry())
+        time_step = Settings.LSTM.time_step
+        frames = []
+        for stock_data in stock_datas:
+            data = stock_data.data
+            close = data['Close'].to_numpy(dtype=float)
+            # 训练至少需要 time_step 根K线之外再有验证样本
+            positions = cutoff_positions(len(data), self.days_ahead, self.cutoffs, self.step,
+                                         2 * time_step)
+            if not len(positions):
+                self.logger.warning(f"{stock_data.code} 的K线数不足以评估，跳过")
+                continue
+            history = StockData(code=stock_data.code, name=stock_data.name,
+                                data=data.iloc[:positions[0] + 1], last_update=stock_data.last_update)
+            status = predictor.ensure_trained(history)
+            self.logger.info(f"评估 {stock_data.code}: 模型{status}，{len(positions)} 个截止日")
+
+            windows = np.lib.stride_tricks.sliding_window_view(close, time_step)[positions - time_step + 1]
+            scaler = predictor.data_processor.scaler
+            scaled = scaler.transform(windows.reshape(-1, 1)).reshape(windows.shape)
+            forecast = predictor._forecast(scaled[:, :, None], self.days_ahead)
+            predicted = predictor.data_processor.inverse_transform_prices(forecast).reshape(forecast.shape)
+            frames.append(forecast_errors([stock_data.code], data.index[positions],
+                                          close[positions][:, None], predicted[:, None, :],
+                                          _future(close[:, None], positions, self.days_ahead)))
+        if not frames:
+            raise ValueError("没有K线数足以评估的股票")
+        return pd.concat(frames, ignore_index=True)
+
+    def record(self, errors: pd.DataFrame) -> dict:
+        """
+        把评估结果写入模型库，各预测天数的方向准确率作为经验置信度（没有给出方向的预测天数取 0.5），
+        相对误差的共形区间作为预测区间；样本不少于 min_samples 的股票另记自身的置信度和区间
+
+        Args:
+            errors: evaluate 返回的预测明细
+
+        Returns:
+            dict: 评估记录
+        """
+        horizons = list(range(1, self.days_ahead + 1))
+        by_horizon = summarize_errors(errors).set_index('horizon').reindex(horizons)
+        confidence = {'*': by_horizon['directional_accuracy'].fillna(0.5).round(4).tolist()}
+        lower, upper = {}, {}
+        coverage = Settings.INTERVAL.coverage
+        ratios = errors['actual_price'] / errors['predicted_price'] - 1
+        for code, group in [('*', errors)] + list(errors.groupby('code')):
+            counts = group['horizon'].value_counts().reindex(horizons, fill_value=0)
+            if code != '*' and (counts < self.config.min_samples).any():
+                continue
+            if code != '*':
+                confidence[code] = (group.groupby('horizon')['direction_hit'].mean()
+                                    .reindex(horizons).fillna(0.5).round(4).tolist())
+            if (counts > 0).all():
+                bounds = [conformal_bounds(ratios[group.index][group['horizon'] == h].to_numpy(), coverage)
+                          for h in horizons]
+                lower[code] = [round(low, 6) for low, _ in bounds]
+                upper[code] = [round(high, 6) for _, high in bounds]
+
+        record = {
+            'model': self.model_name,
+            'evaluated_at': datetime.now().isoformat(timespec='seconds'),
+            'days_ahead': self.days_ahead,
+            'cutoffs': sorted({str(cutoff) for cutoff in errors['cutoff']}),
+            'codes': int(errors['code'].nunique()),
+            'summary': by_horizon.reset_index().replace({np.nan: None}).to_dict('records'),
+            'confidence': confidence,
+        }
+        if '*' in lower:
+            record['intervals'] = {'coverage': coverage, 'lower': lower, 'upper': upper}
+        self.registry.record_evaluation(self.model_name, record)
+        return record
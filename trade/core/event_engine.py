@@ -0,0 +1,416 @@
+import heapq
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..config.settings import Settings
+from .fill_models import FeeModel, FillModel, build_fill_model
+
+
+class BarEvent:
+    """K线事件，引擎在整个回测过程中复用同一个对象以避免逐根分配"""
+    __slots__ = ('index', 'open', 'high', 'low', 'close', 'volume', '_timestamps')
+
+    def __init__(self, timestamps: pd.Index):
+        self.index = -1
+        self.open = self.high = self.low = self.close = self.volume = 0.0
+        self._timestamps = timestamps
+
+    @property
+    def timestamp(self):
+        """K线时间，按需从索引中读取以免每根K线都构造时间对象"""
+        return self._timestamps[self.index]
+
+
+class Order:
+    """
+    订单对象
+
+    quantity 为 None 时表示按撮合时的可用资金全仓买入 / 全部卖出
+    """
+    __slots__ = ('order_id', 'code', 'side', 'quantity', 'remaining',
+                 'created_index', 'expire_index')
+
+    def __init__(self, code: str, side: str, quantity: Optional[float] = None):
+        self.order_id = -1
+        self.code = code
+        self.side = side
+        self.quantity = quantity
+        self.remaining = quantity
+        self.created_index = -1
+        self.expire_index = -1
+
+    @property
+    def is_buy(self) -> bool:
+        return self.side == 'BUY'
+
+
+class FillEvent:
+    """成交事件"""
+    __slots__ = ('order_id', 'index', 'timestamp', 'side', 'quantity', 'price', 'trading_cost')
+
+    def __init__(self, order_id, index, timestamp, side, quantity, price, trading_cost):
+        self.order_id = order_id
+        self.index = index
+        self.timestamp = timestamp
+        self.side = side
+        self.quantity = quantity
+        self.price = price
+        self.trading_cost = trading_cost
+
+
+class Portfolio:
+    """
+    单标的组合账户
+    记录现金、持仓以及当日买入数量（用于 T+1 可卖数量计算）
+    """
+    __slots__ = ('cash', 'position', 'bought_today', 'day', 'fee_model')
+
+    def __init__(self, initial_capital: float, fee_model: FeeModel):
+        self.cash = initial_capital
+        self.position = 0.0
+        self.bought_today = 0.0
+        self.day = None
+        self.fee_model = fee_model
+
+    @property
+    def sellable(self) -> float:
+        """当前可卖数量（扣除当日买入部分）"""
+        return self.position - self.bought_today
+
+    def roll_day(self, day) -> None:
+        """进入新交易日时完成上一交易日买入股份的交收"""
+        if day != self.day:
+            self.day = day
+            self.bought_today = 0.0
+
+    def max_buy_quantity(self, price: float) -> float:
+        """按当前现金扣除费用后可买入的最大数量"""
+        if price <= 0:
+            return 0.0
+        return self.fee_model.max_buy_amount(self.cash) / price
+
+    def execute(self, is_buy: bool, quantity: float, price: float) -> float:
+        """
+        执行成交并更新账户
+
+        Returns:
+            float: 本次成交的交易成本
+        """
+        amount = quantity * price
+        trading_cost = self.fee_model.cost(amount, is_buy)
+        if is_buy:
+            self.cash -= amount + trading_cost
+            self.position += quantity
+            self.bought_today += quantity
+        else:
+            self.cash += amount - trading_cost
+            self.position -= quantity
+            if self.position < 1e-9:
+                self.position = 0.0
+            self.bought_today = min(self.bought_today, self.position)
+        return trading_cost
+
+
+class SignalEventStrategy:
+    """
+    将预先计算好的入场/出场信号数组适配为事件驱动策略
+
+    只在有信号的K线上被调用（通过 signal_indices 声明），
+    无持仓时入场信号全仓买入，有持仓时出场信号全部卖出。
+    """
+    def __init__(self, entries: np.ndarray, exits: np.ndarray, code: str = ''):
+        self.entries = np.asarray(entries, dtype=bool)
+        self.exits = np.asarray(exits, dtype=bool)
+        self.code = code
+        self._pending = False
+
+    def update_signals(self, entries: np.ndarray, exits: np.ndarray) -> None:
+        """分块回测时替换为下一块的信号数组，挂单状态保持不变"""
+        self.entries = np.asarray(entries, dtype=bool)
+        self.exits = np.asarray(exits, dtype=bool)
+
+    def signal_indices(self) -> np.ndarray:
+        return np.flatnonzero(self.entries | self.exits)
+
+    def on_bar(self, bar: BarEvent, portfolio: Portfolio) -> Optional[List[Order]]:
+        if self._pending:
+            return None
+        i = bar.index
+        if self.entries[i] and portfolio.position == 0:
+            self._pending = True
+            return [Order(self.code, 'BUY')]
+        if self.exits[i] and portfolio.position > 0:
+            self._pending = True
+            return [Order(self.code, 'SELL')]
+        return None
+
+    def on_order_done(self, order: Order) -> None:
+        self._pending = False
+
+
+class TargetEventStrategy:
+    """
+    将目标仓位占比序列适配为事件驱动策略，支持分批建仓（如海龟加仓）
+
+    只在目标仓位变化的K线上被调用，按当根收盘时的权益计算调仓数量：
+    目标为1时全仓买入，目标为0时全部卖出。新的调仓会撤销尚未成交的旧订单。
+    """
+    def __init__(self, targets: np.ndarray, code: str = ''):
+        self.targets = np.asarray(targets, dtype=float)
+        self.code = code
+        self._open_orders: List[Order] = []
+        # 上一块最后一根K线的目标仓位，用于判断本块首根K线是否调仓
+        self._previous = 0.0
+
+    def update_targets(self, targets: np.ndarray) -> None:
+        """分块回测时替换为下一块的目标仓位，挂单状态保持不变"""
+        if len(self.targets):
+            self._previous = self.targets[-1]
+        self.targets = np.asarray(targets, dtype=float)
+
+    def signal_indices(self) -> np.ndarray:
+        return np.flatnonzero(np.diff(self.targets, prepend=self._previous) != 0)
+
+    def on_bar(self, bar: BarEvent, portfolio: Portfolio) -> Optional[List[Order]]:
+        # 剩余数量置0的订单在撮合时直接结束，相当于撤单
+        for order in self._open_orders:
+            order.remaining = 0.0
+        target = self.targets[bar.index]
+        if target >= 1:
+            order = Order(self.code, 'BUY')
+        elif target <= 0:
+            if portfolio.position == 0:
+                return None
+            order = Order(self.code, 'SELL')
+        else:
+            equity = portfolio.cash + portfolio.position * bar.close
+            quantity = target * equity / bar.close - portfolio.position
+            if quantity == 0:
+                return None
+            order = Order(self.code, 'BUY' if quantity > 0 else 'SELL', abs(quantity))
+        self._open_orders.append(order)
+        return [order]
+
+    def on_order_done(self, order: Order) -> None:
+        if order in self._open_orders:
+            self._open_orders.remove(order)
+
+
+@dataclass
+class EventBacktestResult:
+    """事件驱动回测的原始结果，逐K线的现金/持仓/权益以及全部成交"""
+    index: pd.Index
+    equity: np.ndarray
+    cash: np.ndarray
+    position: np.ndarray
+    fills: List[FillEvent] = field(default_factory=list)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'value': self.equity,
+            'cash': self.cash,
+            'position': self.position,
+        }, index=self.index)
+
+
+class EventEngine:
+    """
+    事件驱动回测核心
+    K线事件 -> 策略 -> 订单 -> 成交模型 -> 组合账户
+
+    订单按 (撮合K线, 优先级, 序号) 存入优先队列，同一根K线上先卖后买以释放资金。
+    策略若提供 signal_indices()，引擎只在有信号或有挂单的K线上推进，
+    其余K线的现金与持仓不变，权益曲线在回测结束后一次性向量化重建，
+    因此对分钟级数据每秒可处理百万根以上K线。
+    """
+    def __init__(self,
+                 initial_capital: float = Settings.BACKTEST.initial_capital,
+                 fill_model: Optional[FillModel] = None,
+                 fee_model: Optional[FeeModel] = None,
+                 order_ttl: int = Settings.BACKTEST.order_ttl):
+        self.initial_capital = initial_capital
+        self.fill_model = fill_model or build_fill_model()
+        self.fee_model = fee_model or FeeModel()
+        self.order_ttl = order_ttl
+
+    def run(self, data: pd.DataFrame, strategy) -> EventBacktestResult:
+        """
+        执行事件驱动回测
+
+        Args:
+            data: 包含 Open/High/Low/Close/Volume 列的K线数据
+            strategy: 提供 on_bar(bar, portfolio) 的策略对象，
+                      可选提供 signal_indices()、on_fill(fill)、on_order_done(order)
+
+        Returns:
+            EventBacktestResult: 回测结果
+        """
+        return self.session(strategy).feed(data)
+
+    def session(self, strategy) -> 'EventSession':
+        """创建可分块推进的回测会话，账户、挂单和策略状态在各数据块之间延续"""
+        return EventSession(self, strategy)
+
+
+class EventSession:
+    """
+    分块回测会话
+
+    每次 feed 一段K线数据，K线下标在块内从0开始，
+    跨越块边界的挂单在进入下一块时平移下标后继续撮合。
+    """
+    def __init__(self, engine: EventEngine, strategy):
+        self.engine = engine
+        self.strategy = strategy
+        self.portfolio = Portfolio(engine.initial_capital, engine.fee_model)
+        self.queue = []
+        self._seq = count()
+        self._order_ids = count()
+        self._on_fill = getattr(strategy, 'on_fill', None)
+        self._on_order_done = getattr(strategy, 'on_order_done', None)
+
+    def feed(self, data: pd.DataFrame) -> EventBacktestResult:
+        """
+        推进一段K线数据
+
+        Args:
+            data: 包含 Open/High/Low/Close/Volume 列的K线数据
+
+        Returns:
+            EventBacktestResult: 本段数据的回测结果
+        """
+        n = len(data)
+        opens = data['Open'].to_numpy(dtype=float).tolist()
+        highs = data['High'].to_numpy(dtype=float).tolist()
+        lows = data['Low'].to_numpy(dtype=float).tolist()
+        closes_arr = data['Close'].to_numpy(dtype=float)
+        closes = closes_arr.tolist()
+        volumes = data['Volume'].to_numpy(dtype=float).tolist()
+        index = data.index
+        if isinstance(index, pd.DatetimeIndex):
+            days = index.normalize().asi8.tolist()
+        else:
+            days = list(range(n))
+
+        engine = self.engine
+        strategy = self.strategy
+        portfolio = self.portfolio
+        queue = self.queue
+        delay = engine.fill_model.delay
+        start_cash, start_position = portfolio.cash, portfolio.position
+
+        signal_indices = getattr(strategy, 'signal_indices', None)
+        sparse = signal_indices().tolist() if signal_indices is not None else None
+        sparse_pos = 0
+        sparse_len = len(sparse) if sparse is not None else 0
+
+        fills: List[FillEvent] = []
+        points = ([], [], [])
+
+        bar = BarEvent(index)
+        i = -1
+        while True:
+            # 下一根需要处理的K线：下一个信号或最早的待撮合订单
+            if sparse is None:
+                nxt = i + 1
+            else:
+                nxt = sparse[sparse_pos] if sparse_pos < sparse_len else n
+            if queue and queue[0][0] < nxt:
+                nxt = queue[0][0]
+            if nxt >= n:
+                break
+            i = nxt
+
+            bar.index = i
+            bar.open = opens[i]
+            bar.high = highs[i]
+            bar.low = lows[i]
+            bar.close = closes[i]
+            bar.volume = volumes[i]
+            portfolio.roll_day(days[i])
+
+            if queue and queue[0][0] <= i:
+                self._match(i, bar, fills, points)
+
+            if sparse is None or (sparse_pos < sparse_len and sparse[sparse_pos] == i):
+                if sparse is not None:
+                    sparse_pos += 1
+                orders: Optional[Iterable[Order]] = strategy.on_bar(bar, portfolio)
+                if orders:
+                    for order in orders:
+                        order.order_id = next(self._order_ids)
+                        order.created_index = i
+                        order.expire_index = i + delay + engine.order_ttl
+                        heapq.heappush(queue, (i + delay, 1 if order.is_buy else 0,
+                                               next(self._seq), order))
+                    if delay == 0:
+                        self._match(i, bar, fills, points)
+
+        # 未撮合的挂单平移到下一块的坐标系
+        if queue:
+            self.queue = [(due - n, priority, seq, order) for due, priority, seq, order in queue]
+            for _, _, _, order in self.queue:
+                order.created_index -= n
+                order.expire_index -= n
+            heapq.heapify(self.queue)
+
+        cash, position = self._rebuild_state(n, points, start_cash, start_position)
+        return EventBacktestResult(
+            index=index,
+            equity=cash + position * closes_arr,
+            cash=cash,
+            position=position,
+            fills=fills,
+        )
+
+    def _match(self, i: int, bar: BarEvent, fills: List[FillEvent], points: tuple) -> None:
+        """撮合所有到期订单，未完全成交且未过期的订单顺延到下一根K线"""
+        fill_model = self.engine.fill_model
+        portfolio = self.portfolio
+        queue = self.queue
+        while queue and queue[0][0] <= i:
+            _, priority, _, order = heapq.heappop(queue)
+            is_buy = order.is_buy
+            price = fill_model.fill_price(bar, is_buy)
+
+            # 资金或持仓不足的部分直接撤单
+            available = portfolio.max_buy_quantity(price) if is_buy else portfolio.position
+            if order.remaining is None or order.remaining > available:
+                order.remaining = available
+            if order.quantity is None:
+                order.quantity = order.remaining
+            order.remaining = fill_model.round_quantity(order.remaining, is_buy, portfolio)
+
+            quantity = fill_model.fill_quantity(order, bar, portfolio) if order.remaining > 0 else 0
+            if quantity > 0:
+                trading_cost = portfolio.execute(is_buy, quantity, price)
+                order.remaining -= quantity
+                fill = FillEvent(order.order_id, i, bar.timestamp, order.side,
+                                 quantity, price, trading_cost)
+                fills.append(fill)
+                points[0].append(i)
+                points[1].append(portfolio.cash)
+                points[2].append(portfolio.position)
+                if self._on_fill is not None:
+                    self._on_fill(fill)
+
+            if order.remaining > 0 and i + 1 < order.expire_index:
+                heapq.heappush(queue, (i + 1, priority, next(self._seq), order))
+            elif self._on_order_done is not None:
+                self._on_order_done(order)
+
+    @staticmethod
+    def _rebuild_state(n: int, points: tuple, start_cash: float, start_position: float):
+        """根据成交时点向量化重建逐K线的现金与持仓"""
+        point_index, point_cash, point_position = points
+        if not point_index:
+            return np.full(n, start_cash), np.full(n, start_position)
+        pos = np.searchsorted(np.asarray(point_index), np.arange(n), side='right') - 1
+        cash_points = np.append(np.asarray(point_cash), start_cash)
+        position_points = np.append(np.asarray(point_position), start_position)
+        # pos == -1 时取追加在末尾的块初始状态
+        return cash_points[pos], position_points[pos]
@@ -0,0 +1,233 @@
+from typing import Optional
+
+from ..config.settings import Settings
+
+
+class FeeModel:
+    """
+    A股交易费用模型
+    包含佣金（有最低收费）、过户费和仅卖出收取的印花税
+    """
+    def __init__(self,
+                 commission_rate: float = Settings.BACKTEST.commission_rate,
+                 min_commission: float = Settings.BACKTEST.min_commission,
+                 transfer_fee_rate: float = Settings.BACKTEST.transfer_fee_rate,
+                 stamp_duty_rate: float = Settings.BACKTEST.stamp_duty_rate):
+        self.commission_rate = commission_rate
+        self.min_commission = min_commission
+        self.transfer_fee_rate = transfer_fee_rate
+        self.stamp_duty_rate = stamp_duty_rate
+
+    def cost(self, amount: float, is_buy: bool) -> float:
+        """
+        计算交易成本
+
+        Args:
+            amount: 交易金额
+            is_buy: 是否为买入交易
+
+        Returns:
+            float: 总交易成本
+        """
+        commission = max(amount * self.commission_rate, self.min_commission)
+        transfer_fee = amount * self.transfer_fee_rate
+        stamp_duty = amount * self.stamp_duty_rate if not is_buy else 0
+        return commission + transfer_fee + stamp_duty
+
+    def max_buy_amount(self, cash: float) -> float:
+        """
+        计算给定现金在扣除买入费用后最多可买入的金额
+
+        Args:
+            cash: 可用现金
+
+        Returns:
+            float: 可买入金额（不含费用）
+        """
+        amount = cash / (1 + self.commission_rate + self.transfer_fee_rate)
+        if amount * self.commission_rate < self.min_commission:
+            # 佣金按最低收费计算
+            amount = (cash - self.min_commission) / (1 + self.transfer_fee_rate)
+        return max(amount, 0.0)
+
+    def describe(self) -> dict:
+        """返回费用参数，用于结果缓存键和复现清单"""
+        return {
+            'type': type(self).__name__,
+            'commission_rate': self.commission_rate,
+            'min_commission': self.min_commission,
+            'transfer_fee_rate': self.transfer_fee_rate,
+            'stamp_duty_rate': self.stamp_duty_rate,
+        }
+
+
+class FillModel:
+    """
+    成交模型基类
+    决定订单在哪根K线、以什么价格、成交多少数量
+
+    子类通过重写 fill_price / fill_quantity 实现不同的撮合假设，
+    包装类（成交量限制、整手、T+1）通过 inner 串联组合。
+    """
+    # 订单提交后延迟多少根K线撮合（0 表示当根K线收盘撮合）
+    delay = 1
+
+    def __init__(self, slippage_bps: float = Settings.BACKTEST.slippage_bps):
+        self.slippage = slippage_bps / 10000.0
+
+    def fill_price(self, bar, is_buy: bool) -> float:
+        """撮合价格，默认在参考价上叠加滑点"""
+        price = self.reference_price(bar)
+        return price * (1 + self.slippage) if is_buy else price * (1 - self.slippage)
+
+    def reference_price(self, bar) -> float:
+        raise NotImplementedError
+
+    def fill_quantity(self, order, bar, portfolio) -> float:
+        """本根K线可成交数量，基类不做额外限制"""
+        return order.remaining
+
+    def round_quantity(self, quantity: float, is_buy: bool, portfolio) -> float:
+        """按交易单位规整订单数量，基类不做处理"""
+        return quantity
+
+    def describe(self) -> dict:
+        return {'type': type(self).__name__, 'slippage_bps': self.slippage * 10000}
+
+
+class CloseFill(FillModel):
+    """以信号K线收盘价立即成交（与旧版回测一致，存在一定的前视偏差）"""
+    delay = 0
+
+    def reference_price(self, bar) -> float:
+        return bar.close
+
+
+class NextOpenFill(FillModel):
+    """以下一根K线开盘价成交"""
+
+    def reference_price(self, bar) -> float:
+        return bar.open
+
+
+class BarVWAPFill(FillModel):
+    """以下一根K线的近似成交均价 (O+H+L+C)/4 成交"""
+
+    def reference_price(self, bar) -> float:
+        return (bar.open + bar.high + bar.low + bar.close) * 0.25
+
+
+class FillModelWrapper(FillModel):
+    """包装其他成交模型，在其基础上追加约束"""
+
+    def __init__(self, inner: FillModel):
+        self.inner = inner
+        self.delay = inner.delay
+
+    def fill_price(self, bar, is_buy: bool) -> float:
+        return self.inner.fill_price(bar, is_buy)
+
+    def fill_quantity(self, order, bar, portfolio) -> float:
+        return self.inner.fill_quantity(order, bar, portfolio)
+
+    def round_quantity(self, quantity: float, is_buy: bool, portfolio) -> float:
+        return self.inner.round_quantity(quantity, is_buy, portfolio)
+
+    def describe(self) -> dict:
+        return {'type': type(self).__name__, 'inner': self.inner.describe()}
+
+
+class VolumeParticipationFill(FillModelWrapper):
+    """成交量参与率限制：单根K线成交量不超过该K线成交量的固定比例，剩余部分继续挂单"""
+
+    def __init__(self, inner: FillModel, participation_rate: float):
+        super().__init__(inner)
+        self.participation_rate = participation_rate
+
+    def fill_quantity(self, order, bar, portfolio) -> float:
+        quantity = self.inner.fill_quantity(order, bar, portfolio)
+        return min(quantity, bar.volume * self.participation_rate)
+
+    def describe(self) -> dict:
+        info = super().describe()
+        info['participation_rate'] = self.participation_rate
+        return info
+
+
+class LotSizeFill(FillModelWrapper):
+    """整手成交：买入数量向下取整到一手（A股100股），清仓卖出允许零股"""
+
+    def __init__(self, inner: FillModel, lot_size: int = 100):
+        super().__init__(inner)
+        self.lot_size = lot_size
+
+    def fill_quantity(self, order, bar, portfolio) -> float:
+        quantity = self.inner.fill_quantity(order, bar, portfolio)
+        return self.round_quantity(quantity, order.is_buy, portfolio)
+
+    def round_quantity(self, quantity: float, is_buy: bool, portfolio) -> float:
+        quantity = self.inner.round_quantity(quantity, is_buy, portfolio)
+        if not is_buy and quantity >= portfolio.position:
+            return quantity
+        return (quantity // self.lot_size) * self.lot_size
+
+    def describe(self) -> dict:
+        info = super().describe()
+        info['lot_size'] = self.lot_size
+        return info
+
+
+class TPlusOneFill(FillModelWrapper):
+    """T+1 交收：当日买入的股份次日才能卖出，未能卖出的部分继续挂单"""
+
+    def fill_quantity(self, order, bar, portfolio) -> float:
+        quantity = self.inner.fill_quantity(order, bar, portfolio)
+        if order.is_buy:
+            return quantity
+        return min(quantity, portfolio.sellable)
+
+
+_BASE_FILL_MODELS = {
+    'close': CloseFill,
+    'next_open': NextOpenFill,
+    'vwap': BarVWAPFill,
+}
+
+
+def build_fill_model(name: Optional[str] = None,
+                     slippage_bps: Optional[float] = None,
+                     participation_rate: Optional[float] = None,
+                     lot_size: Optional[int] = None,
+                     t_plus_one: Optional[bool] = None) -> FillModel:
+    """
+    按配置组合成交模型，未指定的参数取 Settings.BACKTEST
+
+    组合顺序为 基础价格模型 -> T+1 -> 成交量限制 -> 整手，
+    保证整手取整在最后一步完成。
+
+    Args:
+        name: 基础成交模型名称 close/next_open/vwap
+        slippage_bps: 滑点（基点）
+        participation_rate: 成交量参与率上限，0 表示不限制
+        lot_size: 最小交易单位，0 表示不限制
+        t_plus_one: 是否启用 T+1
+
+    Returns:
+        FillModel: 组合后的成交模型
+    """
+    config = Settings.BACKTEST
+    name = name or config.fill_model
+    if name not in _BASE_FILL_MODELS:
+        raise ValueError(f"未知的成交模型: {name}，可选: {', '.join(_BASE_FILL_MODELS)}")
+    model = _BASE_FILL_MODELS[name](
+        config.slippage_bps if slippage_bps is None else slippage_bps
+    )
+    if config.t_plus_one if t_plus_one is None else t_plus_one:
+        model = TPlusOneFill(model)
+    participation_rate = config.participation_rate if participation_rate is None else participation_rate
+    if participation_rate > 0:
+        model = VolumeParticipationFill(model, participation_rate)
+    lot_size = config.lot_size if lot_size is None else lot_size
+    if lot_size > 0:
+        model = LotSizeFill(model, lot_size)
+    return model
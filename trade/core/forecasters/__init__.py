@@ -0,0 +1,11 @@
+from .base import (BaseForecaster, available_forecasters, backfill, create_forecaster,
+                   register_forecaster, right_align)
+from .builtin import (AutoRegressiveForecaster, DriftForecaster, ExponentialSmoothingForecaster,
+                      GradientBoostingForecaster, HoltForecaster, NaiveForecaster)
+
+__all__ = [
+    'BaseForecaster', 'available_forecasters', 'backfill', 'create_forecaster',
+    'register_forecaster', 'right_align',
+    'AutoRegressiveForecaster', 'DriftForecaster', 'ExponentialSmoothingForecaster',
+    'GradientBoostingForecaster', 'HoltForecaster', 'NaiveForecaster',
+]
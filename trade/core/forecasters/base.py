@@ -0,0 +1,185 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Type
+
+import numpy as np
+import pandas as pd
+
+from ...config.settings import Settings
+from ...models.entities import MarketPanel, PredictionResult, StockData
+from ...utils.data_processor import DataProcessor
+from ...utils.logger import Logger
+from ..lstm_predictor import prediction_results
+from ..model_registry import ModelRegistry
+
+_REGISTRY: Dict[str, Type['BaseForecaster']] = {}
+
+
+def register_forecaster(cls: Type['BaseForecaster']) -> Type['BaseForecaster']:
+    """预测模型注册装饰器，按类属性 name 注册"""
+    _REGISTRY[cls.name] = cls
+    return cls
+
+
+def _load_builtin_forecasters() -> None:
+    from . import builtin  # noqa: F401
+
+
+def available_forecasters() -> List[str]:
+    """已注册的基准预测模型名称"""
+    _load_builtin_forecasters()
+    return sorted(_REGISTRY)
+
+
+def create_forecaster(name: str, **params) -> 'BaseForecaster':
+    """
+    按名称创建基准预测模型
+
+    Args:
+        name: 注册的模型名称
+        **params: 覆盖默认值的模型参数
+
+    Returns:
+        BaseForecaster: 预测模型实例
+    """
+    _load_builtin_forecasters()
+    if name not in _REGISTRY:
+        raise ValueError(f"未知的预测模型: {name}，可选: {', '.join(sorted(_REGISTRY))}")
+    return _REGISTRY[name](**params)
+
+
+def right_align(close: np.ndarray, window: int) -> np.ndarray:
+    """
+    把每只股票的有效收盘价靠右对齐，取最近 window 根
+
+    面板中各股票停牌、上市时间不同，对齐后缺失值集中在开头，
+    各模型只需处理序列开头的缺失。
+
+    Args:
+        close: [K线数, 股票数] 的收盘价
+        window: 保留的K线数
+
+    Returns:
+        np.ndarray: [window, 股票数] 的收盘价，有效数据不足的股票开头为 NaN
+    """
+    valid = np.isfinite(close) & (close > 0)
+    # 稳定排序把无效值移到开头，有效值保持时间顺序
+    order = np.argsort(valid, axis=0, kind='stable')
+    aligned = np.take_along_axis(np.where(valid, close, np.nan), order, axis=0)
+    if len(aligned) < window:
+        aligned = np.vstack([np.full((window - len(aligned), close.shape[1]), np.nan), aligned])
+    return aligned[-window:]
+
+
+def backfill(close: np.ndarray) -> np.ndarray:
+    """用第一个有效值填充开头的缺失，填充部分为常数序列，不产生误差和收益"""
+    valid = np.isfinite(close)
+    first = np.where(valid.any(axis=0), valid.argmax(axis=0), 0)
+    mask = np.arange(len(close))[:, None] < first[None, :]
+    return np.where(mask, close[first, np.arange(close.shape[1])][None, :], close)
+
+
+class BaseForecaster(ABC):
+    """
+    基准预测模型基类
+
+    子类实现向量化的 forecast(close, days_ahead)，在 [K线数, 股票数] 的收盘价上
+    一次拟合全部股票并返回 [股票数, days_ahead] 的预测价格；predict/predict_batch 与
+    LSTMPredictor 的接口一致，返回 PredictionResult。
+    """
+    name: str = ''
+    description: str = ''
+    default_params: dict = {}
+
+    def __init__(self, **params):
+        unknown = set(params) - set(self.default_params)
+        if unknown:
+            raise ValueError(f"预测模型 {self.name} 不支持参数: {', '.join(sorted(unknown))}")
+        self.logger = Logger()
+        self.config = Settings.FORECAST
+        self.registry = ModelRegistry()
+        self.params = {**self.default_params, **params}
+
+    @abstractmethod
+    def forecast(self, close: np.ndarray, days_ahead: int) -> np.ndarray:
+        """
+        拟合并预测
+
+        Args:
+            close: [K线数, 股票数] 的收盘价，已靠右对齐，开头可能为 NaN
+            days_ahead: 预测天数
+
+        Returns:
+            np.ndarray: [股票数, days_ahead] 的预测价格，无法预测的股票为 NaN
+        """
+        pass
+
+    def forecast_close(self, close: np.ndarray, days_ahead: int) -> np.ndarray:
+        """对齐、截取最近 window 根K线后预测，有效K线少于 min_history 的股票结果为 NaN"""
+        close = right_align(close, self.config.window)
+        prices = self.forecast(close, days_ahead)
+        enough = np.isfinite(close).sum(axis=0) >= self.config.min_history
+        return np.where(enough[:, None], prices, np.nan)
+
+    def ensure_trained(self, stock_data: StockData, retrain: bool = False) -> str:
+        """基准模型在预测时拟合，无需预先训练"""
+        return 'fitted'
+
+    def forecast_panel(self, panel: MarketPanel, days_ahead: int = 5) -> pd.DataFrame:
+        """
+        预测面板中的全部股票
+
+        Args:
+            panel: 面板数据，如选股快照
+            days_ahead: 预测天数
+
+        Returns:
+            pd.DataFrame: code/horizon/predicted_price/last_close 列，每只股票每个预测天数一行
+        """
+        prices = self.forecast_close(panel.fields['Close'], days_ahead)
+        last = right_align(panel.fields['Close'], 1)[0]
+        codes = np.asarray(panel.codes)
+        frame = pd.DataFrame({
+            'code': np.repeat(codes, days_ahead),
+            'horizon': np.tile(np.arange(1, days_ahead + 1), len(codes)),
+            'predicted_price': prices.ravel(),
+            'last_close': np.repeat(last, days_ahead),
+        })
+        return frame.dropna(subset=['predicted_price']).reset_index(drop=True)
+
+    def predict_batch(self, stock_datas: List[StockData],
+                      days_ahead: int = 5) -> List[PredictionResult]:
+        """
+        一次预测多只股票
+
+        Args:
+            stock_datas: 股票数据列表
+            days_ahead: 预测天数
+
+        Returns:
+            List[PredictionResult]: 按股票、日期排列的预测结果，历史不足的股票被跳过
+        """
+        try:
+            if not stock_datas:
+                return []
+            panel = DataProcessor.build_panel(stock_datas)
+            prices = self.forecast_close(panel.fields['Close'], days_ahead)
+            predictions = []
+            skipped = []
+            for stock_data, row in zip(stock_datas, prices):
+                if np.isnan(row).any():
+                    skipped.append(stock_data.code)
+                    continue
+                confidence = self.registry.confidence(self.name, stock_data.code, days_ahead)
+                lower, upper = self.registry.interval(self.name, stock_data.code, row)
+                predictions.extend(prediction_results(stock_data, row, confidence, lower, upper))
+            if skipped:
+                self.logger.warning(f"K线数不足 {self.config.min_history} 根，跳过预测: {', '.join(skipped)}")
+            return predictions
+
+        except Exception as e:
+            self.logger.error(f"{self.description}预测出错: {str(e)}")
+            raise
+
+    def predict(self, stock_data: StockData, days_ahead: int = 5) -> List[PredictionResult]:
+        """预测一只股票的未来价格"""
+        return self.predict_batch([stock_data], days_ahead)
@@ -0,0 +1,182 @@
+import numpy as np
+
+from .base import BaseForecaster, backfill, register_forecaster
+
+
+def _columns(values: np.ndarray) -> np.ndarray:
+    return np.arange(values.shape[-1])
+
+
+@register_forecaster
+class NaiveForecaster(BaseForecaster):
+    """朴素预测：未来价格等于最后收盘价"""
+    name = 'naive'
+    description = '朴素预测'
+
+    def forecast(self, close: np.ndarray, days_ahead: int) -> np.ndarray:
+        return np.repeat(close[-1][:, None], days_ahead, axis=1)
+
+
+@register_forecaster
+class DriftForecaster(BaseForecaster):
+    """漂移预测：按窗口内首尾价格连线的斜率外推"""
+    name = 'drift'
+    description = '漂移'
+
+    def forecast(self, close: np.ndarray, days_ahead: int) -> np.ndarray:
+        count = np.isfinite(close).sum(axis=0)
+        first = close[np.minimum(len(close) - count, len(close) - 1), _columns(close)]
+        slope = (close[-1] - first) / np.maximum(count - 1, 1)
+        return close[-1][:, None] + slope[:, None] * np.arange(1, days_ahead + 1)
+
+
+@register_forecaster
+class ExponentialSmoothingForecaster(BaseForecaster):
+    """
+    简单指数平滑
+
+    全部候选平滑系数与全部股票一起递推，每只股票取一步预测误差平方和最小的系数。
+    """
+    name = 'ses'
+    description = '指数平滑'
+    default_params = {'alphas': (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)}
+
+    def forecast(self, close: np.ndarray, days_ahead: int) -> np.ndarray:
+        x = backfill(close)
+        alphas = np.asarray(self.params['alphas'], dtype=float)[:, None]
+        level = np.repeat(x[:1], len(alphas), axis=0)
+        sse = np.zeros_like(level)
+        for value in x[1:]:
+            error = value - level
+            sse += error ** 2
+            level += alphas * error
+        best = np.argmin(np.nan_to_num(sse, nan=np.inf), axis=0)
+        return np.repeat(level[best, _columns(x)][:, None], days_ahead, axis=1)
+
+
+@register_forecaster
+class HoltForecaster(BaseForecaster):
+    """
+    Holt 线性趋势指数平滑
+
+    水平和趋势的平滑系数在网格上与全部股票一起递推，每只股票取一步预测误差平方和最小的组合。
+    """
+    name = 'holt'
+    description = 'Holt线性趋势'
+    default_params = {'alphas': (0.2, 0.4, 0.6, 0.8), 'betas': (0.05, 0.1, 0.2, 0.3)}
+
+    def forecast(self, close: np.ndarray, days_ahead: int) -> np.ndarray:
+        x = backfill(close)
+        alpha, beta = (grid.ravel()[:, None] for grid in
+                       np.meshgrid(self.params['alphas'], self.params['betas'], indexing='ij'))
+        level = np.repeat(x[:1], len(alpha), axis=0)
+        trend = np.zeros_like(level)
+        sse = np.zeros_like(level)
+        for value in x[1:]:
+            predicted = level + trend
+            error = value - predicted
+            sse += error ** 2
+            level = predicted + alpha * error
+            trend = trend + alpha * beta * error
+        best = np.argmin(np.nan_to_num(sse, nan=np.inf), axis=0)
+        columns = _columns(x)
+        return (level[best, columns][:, None]
+                + trend[best, columns][:, None] * np.arange(1, days_ahead + 1))
+
+
+@register_forecaster
+class AutoRegressiveForecaster(BaseForecaster):
+    """
+    AR(p) 自回归，对数收益率上建模，相当于对数价格的 ARIMA(p,1,0)
+
+    全部股票的最小二乘正规方程一次构造，批量求解。
+    """
+    name = 'ar'
+    description = 'AR自回归'
+    default_params = {'order': 5, 'ridge': 1e-8}
+
+    def forecast(self, close: np.ndarray, days_ahead: int) -> np.ndarray:
+        order = self.params['order']
+        returns = np.diff(np.log(close), axis=0)
+        if len(returns) <= order:
+            return np.repeat(close[-1][:, None], days_ahead, axis=1)
+        valid = np.isfinite(returns)
+        filled = np.where(valid, returns, 0.0)
+        length = len(returns)
+
+        # 第 k 个滞后项为 t-k-1 期收益率，缺失的行不参与拟合
+        lags = np.stack([filled[order - k - 1:length - k - 1] for k in range(order)], axis=-1)
+        rows = valid[order:] & np.stack([valid[order - k - 1:length - k - 1]
+                                         for k in range(order)], axis=-1).all(axis=-1)
+        design = np.concatenate([np.ones(lags.shape[:-1] + (1,)), lags], axis=-1) * rows[..., None]
+        target = filled[order:] * rows
+        gram = np.einsum('tnp,tnq->npq', design, design) + self.params['ridge'] * np.eye(order + 1)
+        coef = np.linalg.solve(gram, np.einsum('tnp,tn->np', design, target)[..., None])[..., 0]
+
+        # 由近及远的最近 order 期收益率
+        history = filled[-order:][::-1].T
+        price = close[-1].copy()
+        result = np.empty((close.shape[1], days_ahead))
+        for day in range(days_ahead):
+            step = coef[:, 0] + (coef[:, 1:] * history).sum(axis=1)
+            price = price * np.exp(step)
+            result[:, day] = price
+            history = np.concatenate([step[:, None], history[:, :-1]], axis=1)
+        return result
+
+
+@register_forecaster
+class GradientBoostingForecaster(BaseForecaster):
+    """
+    梯度提升树
+
+    以最近 lags 期对数收益率及其均值、标准差为特征预测下一期收益率，
+    全部股票的样本合并训练一个模型，多步预测逐步递推。
+    """
+    name = 'gbm'
+    description = '梯度提升树'
+    default_params = {'lags': 10, 'max_iter': 200, 'learning_rate': 0.05,
+                      'max_samples': 200000, 'random_state': 0}
+
+    @staticmethod
+    def _features(windows: np.ndarray) -> np.ndarray:
+        """[..., lags] 的收益率窗口 -> [..., lags + 2] 的特征（由近及远的收益率、均值、标准差）"""
+        return np.concatenate([windows[..., ::-1], windows.mean(axis=-1, keepdims=True),
+                               windows.std(axis=-1, keepdims=True)], axis=-1)
+
+    def forecast(self, close: np.ndarray, days_ahead: int) -> np.ndarray:
+        from sklearn.ensemble import HistGradientBoostingRegressor
+
+        params = self.params
+        lags = params['lags']
+        returns = np.diff(np.log(close), axis=0)
+        naive = np.repeat(close[-1][:, None], days_ahead, axis=1)
+        if len(returns) <= lags:
+            return naive
+
+        windows = np.lib.stride_tricks.sliding_window_view(returns, lags, axis=0)
+        features = self._features(windows[:-1])
+        target = returns[lags:]
+        usable = np.isfinite(features).all(axis=-1) & np.isfinite(target)
+        X, y = features[usable], target[usable]
+        if len(y) < 10 * (lags + 2):
+            self.logger.warning("样本不足以训练梯度提升树，使用朴素预测")
+            return naive
+        if len(y) > params['max_samples']:
+            rng = np.random.default_rng(params['random_state'])
+            keep = rng.choice(len(y), params['max_samples'], replace=False)
+            X, y = X[keep], y[keep]
+        model = HistGradientBoostingRegressor(max_iter=params['max_iter'],
+                                              learning_rate=params['learning_rate'],
+                                              random_state=params['random_state'])
+        model.fit(X, y)
+
+        state = windows[-1]
+        price = close[-1].copy()
+        result = np.empty((close.shape[1], days_ahead))
+        for day in range(days_ahead):
+            step = model.predict(self._features(state))
+            price = price * np.exp(step)
+            result[:, day] = price
+            state = np.concatenate([state[:, 1:], step[:, None]], axis=1)
+        return result
@@ -0,0 +1,297 @@
+from datetime import datetime
+from dataclasses import asdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..config.settings import Settings
+from ..models.entities import StockData, PredictionResult
+from .lstm_predictor import LSTMPredictor, _load_tensorflow, sample_interval
+from .model_registry import ModelRegistry
+from .training import restore_checkpoint, training_callbacks
+
+if TYPE_CHECKING:
+    from tensorflow.keras.models import Model
+
+# 共享模型在模型库中的代码
+GLOBAL_CODE = '_global'
+
+
+def relative_windows(close: np.ndarray, time_step: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    把收盘价序列切成以窗口末收盘价归一化的训练样本
+
+    归一化后不同价位的股票处于同一尺度，不需要为每只股票保存归一化参数。
+
+    Args:
+        close: 收盘价序列，非正值和缺失值被剔除
+        time_step: 窗口长度
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: [样本数, time_step] 的窗口（收盘价 / 窗口末收盘价 - 1）
+            和 [样本数] 的目标（下一根收盘价 / 窗口末收盘价 - 1）
+    """
+    close = close[np.isfinite(close) & (close > 0)]
+    if len(close) <= time_step:
+        return np.empty((0, time_step)), np.empty(0)
+    windows = np.lib.stride_tricks.sliding_window_view(close[:-1], time_step)
+    last = windows[:, -1]
+    return windows / last[:, None] - 1, close[time_step:] / last - 1
+
+
+class GlobalLSTMPredictor(LSTMPredictor):
+    """
+    跨股票共享的LSTM预测模型
+
+    全部股票共用一个模型，输入为归一化的收盘价窗口和股票编号（经嵌入层学习各股票的差异），
+    输出下一根K线相对窗口末收盘价的涨跌幅。训练数据由 tf.data 从本地Parquet K线库逐只股票
+    流式读取、交错打乱，不需要把全市场数据载入内存；训练一次即得到一个可供全部股票预测的模型，
+    以 GLOBAL_CODE 保存在模型库中。训练时未见过的股票使用“未知股票”编号预测。
+    """
+    name = 'global'
+
+    def __init__(self, registry: Optional[ModelRegistry] = None,
+                 period: str = "max", interval: str = "1d"):
+        """
+        Args:
+            registry: 模型库
+            period: 训练数据在本地K线库中的周期
+            interval: 训练数据在本地K线库中的间隔
+        """
+        super().__init__(registry)
+        self.period = period
+        self.interval = interval
+        self.vocabulary: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self.metadata: Optional[dict] = None
+
+    @property
+    def spec(self) -> dict:
+        return {**super().spec, 'embedding_dim': Settings.LSTM.embedding_dim,
+                'target': 'relative_close', 'interval': self.interval}
+
+    def universe(self) -> List[str]:
+        """本地K线库中对应周期和间隔的全部股票代码"""
+        suffix = f"_{self.period}_{self.interval}_data.parquet"
+        return sorted(path.name[:-len(suffix)]
+                      for path in Path(Settings.DATA.parquet_dir).glob(f"*{suffix}"))
+
+    def _set_vocabulary(self, codes: Iterable[str]) -> None:
+        # 编号 0 留给未知股票
+        self.vocabulary = list(codes)
+        self._ids = {code: i + 1 for i, code in enumerate(self.vocabulary)}
+
+    def _build_model(self) -> 'Model':
+        """构建共享模型：股票嵌入沿时间轴复制后与价格窗口拼接，输入LSTM"""
+        _load_tensorflow()
+        from tensorflow.keras.layers import Concatenate, Embedding, Input, RepeatVector
+        from tensorflow.keras.models import Model
+
+        config = Settings.LSTM
+        window = Input(shape=(config.time_step, 1), name='window')
+        symbol = Input(shape=(), dtype='int32', name='symbol')
+        embedding = Embedding(len(self.vocabulary) + 1, config.embedding_dim)(symbol)
+        x = Concatenate()([window, RepeatVector(config.time_step)(embedding)])
+        model = Model(inputs={'window': window, 'symbol': symbol}, outputs=self._lstm_head(x))
+        return self._compile(model)
+
+    def _samples(self, code, validation):
+        """一只股票的全部样本，每只股票按时间顺序取最后 validation_split 部分作为验证集"""
+        code = code.decode('utf-8') if isinstance(code, bytes) else str(code)
+        path = Path(Settings.DATA.parquet_dir) / f"{code}_{self.period}_{self.interval}_data.parquet"
+        try:
+            close = pd.read_parquet(path, columns=['Close'])['Close'].to_numpy(dtype=float)
+        except Exception as e:
+            self.logger.error(f"Skipping {code} due to error: {str(e)}")
+            return
+        windows, targets = relative_windows(close, Settings.LSTM.time_step)
+        split = int(len(windows) * (1 - Settings.LSTM.validation_split))
+        part = slice(split, None) if validation else slice(None, split)
+        windows, targets = windows[part], targets[part]
+        if len(windows):
+            yield ({'window': windows[:, :, None].astype(np.float32),
+                    'symbol': np.full(len(windows), self._ids.get(code, 0), dtype=np.int32)},
+                   targets.astype(np.float32))
+
+    def _dataset(self, codes: List[str], validation: bool = False):
+        """
+        tf.data 训练管道：并行交错读取多只股票，拆成单个样本后打乱、分批并预取
+        """
+        tf = _load_tensorflow()
+        config = Settings.LSTM
+        signature = ({'window': tf.TensorSpec([None, config.time_step, 1], tf.float32),
+                      'symbol': tf.TensorSpec([None], tf.int32)},
+                     tf.TensorSpec([None], tf.float32))
+        dataset = tf.data.Dataset.from_tensor_slices(codes).interleave(
+            lambda code: tf.data.Dataset.from_generator(
+                self._samples, args=(code, validation), output_signature=signature),
+            num_parallel_calls=tf.data.AUTOTUNE,
+            deterministic=False,
+        ).unbatch()
+        if not validation:
+            def drop_symbol(features, target):
+                # 随机把部分样本的股票编号替换为未知股票，训练未知股票的嵌入
+                symbol = features['symbol']
+                unknown = tf.random.uniform(tf.shape(symbol)) < config.symbol_dropout
+                return {**features, 'symbol': tf.where(unknown, 0, symbol)}, target
+
+            dataset = dataset.shuffle(config.shuffle_buffer).map(
+                drop_symbol, num_parallel_calls=tf.data.AUTOTUNE)
+        return dataset.batch(config.batch_size).prefetch(tf.data.AUTOTUNE)
+
+    def train(self, stock_codes: Optional[Iterable[str]] = None) -> dict:
+        """
+        在本地K线库的多只股票上训练共享模型并保存到模型库
+
+        Args:
+            stock_codes: 股票代码列表，为空时使用本地K线库中的全部股票
+
+        Returns:
+            dict: 模型元数据
+        """
+        try:
+            codes = sorted(set(stock_codes)) if stock_codes else self.universe()
+            if not codes:
+                raise ValueError(f"本地K线库中没有可用于训练的 {self.period}/{self.interval} 数据")
+            self._set_vocabulary(codes)
+            self._model = self._build_model()
+            checkpoint = self.registry.checkpoint_path(GLOBAL_CODE, self.spec)
+            history = self.model.fit(
+                self._dataset(codes),
+                validation_data=self._dataset(codes, validation=True),
+                epochs=Settings.LSTM.epochs,
+                callbacks=training_callbacks(GLOBAL_CODE, checkpoint=checkpoint),
+                verbose=Settings.LSTM.verbose
+            )
+            restore_checkpoint(self.model, checkpoint)
+            now = datetime.now().isoformat(timespec='seconds')
+            metadata = {
+                'vocabulary': self.vocabulary,
+                'period': self.period,
+                'interval': self.interval,
+                'trained_at': now,
+                'updated_at': now,
+                'epochs': len(history.history['loss']),
+                'loss': float(history.history['loss'][-1]),
+                'val_loss': min(history.history['val_loss']) if 'val_loss' in history.history else None,
+                'config': asdict(Settings.LSTM),
+            }
+            self.registry.save(GLOBAL_CODE, self.spec, self.model, metadata)
+            self.metadata = metadata
+            return metadata
+
+        except Exception as e:
+            self.logger.error(f"训练共享预测模型出错: {str(e)}")
+            raise
+
+    def load(self) -> dict:
+        """从模型库加载共享模型"""
+        entry = self.registry.load(GLOBAL_CODE, self.spec)
+        if entry is None:
+            raise FileNotFoundError("模型库中没有共享预测模型，请先运行 train-global 训练")
+        self._set_vocabulary(entry['vocabulary'])
+        self._model = self._build_model()
+        self.model.load_weights(entry['weights'])
+        self.metadata = entry
+        self.logger.info(f"已加载共享预测模型: {len(self.vocabulary)} 只股票")
+        return entry
+
+    def ensure_trained(self, stock_data: StockData, retrain: bool = False) -> str:
+        """共享模型不按股票训练，只需从模型库加载一次"""
+        if self.metadata is None:
+            self.load()
+        return 'loaded'
+
+    def predict(self, stock_data: StockData, days_ahead: int = 5) -> List[PredictionResult]:
+        return self.predict_batch([stock_data], days_ahead)
+
+    def predict_batch(self, stock_datas: List[StockData],
+                      days_ahead: int = 5) -> List[PredictionResult]:
+        """
+        用共享模型一次预测多只股票，全部股票拼成一个批次，多步预测在编译好的计算图中完成
+
+        Args:
+            stock_datas: 股票数据列表，K线数少于 time_step 的股票被跳过
+            days_ahead: 预测天数
+
+        Returns:
+            List[PredictionResult]: 按股票、日期排列的预测结果
+        """
+        try:
+            if self.metadata is None:
+                self.load()
+            time_step = Settings.LSTM.time_step
+            usable = [sd for sd in stock_datas if len(sd.data) >= time_step]
+            if len(usable) < len(stock_datas):
+                skipped = [sd.code for sd in stock_datas if len(sd.data) < time_step]
+                self.logger.warning(f"K线数不足 {time_step} 根，跳过预测: {', '.join(skipped)}")
+            if not usable:
+                return []
+            unknown = [sd.code for sd in usable if sd.code not in self._ids]
+            if unknown:
+                self.logger.info(f"共享模型训练时未包含以下股票，按未知股票预测: {', '.join(unknown)}")
+
+            closes = np.stack([sd.data['Close'].to_numpy(dtype=float)[-time_step:] for sd in usable])
+            last = closes[:, -1:]
+            symbols = np.array([self._ids.get(sd.code, 0) for sd in usable], dtype=np.int32)
+            windows = closes[:, :, None] / last[:, :, None] - 1
+            prices = last * (1 + self._forecast_change(windows, symbols, days_ahead))
+            lower = upper = [None] * len(usable)
+            if Settings.INTERVAL.mc_samples:
+                samples = self._forecast_change(windows, symbols, days_ahead, Settings.INTERVAL.mc_samples)
+                lower, upper = sample_interval(last * (1 + samples))
+
+            predictions = []
+            for stock_data, row, row_lower, row_upper in zip(usable, prices, lower, upper):
+                predictions.extend(self._prediction_results(stock_data, row, row_lower, row_upper))
+            return predictions
+        except Exception as e:
+            self.logger.error(f"共享模型批量预测出错: {str(e)}")
+            raise
+
+    def _forecast_change(self, windows: np.ndarray, symbols: np.ndarray,
+                         days_ahead: int, samples: int = 0) -> np.ndarray:
+        """
+        自回归多步预测
+
+        Args:
+            samples: MC Dropout 样本数，为 0 时为确定性预测
+
+        Returns:
+            np.ndarray: [股票数, days_ahead] 的各预测日收盘价相对最后收盘价的涨跌幅；
+            samples > 0 时为 [samples, 股票数, days_ahead] 的样本
+        """
+        tf = _load_tensorflow()
+        days = tf.constant(days_ahead, dtype=tf.int32)
+        if not samples:
+            return self._compiled_rollout()(tf.constant(windows, dtype=tf.float32),
+                                            tf.constant(symbols, dtype=tf.int32), days).numpy()
+        outputs = self._compiled_rollout(training=True)(
+            tf.constant(np.repeat(windows, samples, axis=0), dtype=tf.float32),
+            tf.constant(np.repeat(symbols, samples), dtype=tf.int32), days).numpy()
+        return outputs.reshape(len(windows), samples, days_ahead).transpose(1, 0, 2)
+
+    @staticmethod
+    def _build_rollout(model, training: bool = False):
+        """每一步预测后把窗口重新以新的末收盘价归一化，累计涨跌幅"""
+        tf = _load_tensorflow()
+
+        @tf.function(input_signature=[
+            tf.TensorSpec([None, Settings.LSTM.time_step, 1], tf.float32),
+            tf.TensorSpec([None], tf.int32),
+            tf.TensorSpec([], tf.int32),
+        ])
+        def rollout(windows, symbols, days):
+            outputs = tf.TensorArray(tf.float32, size=days)
+            growth = tf.ones_like(windows[:, -1, :])
+            for i in tf.range(days):
+                step = model({'window': windows, 'symbol': symbols}, training=training)
+                growth = growth * (1 + step)
+                outputs = outputs.write(i, growth[:, 0] - 1)
+                windows = tf.concat([(1 + windows[:, 1:, :]) / (1 + step[:, None, :]) - 1,
+                                     tf.zeros_like(windows[:, :1, :])], axis=1)
+            return tf.transpose(outputs.stack())
+
+        return rollout
@@ -0,0 +1,100 @@
+from collections import defaultdict
+from typing import Callable, Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+from ..models.entities import MarketPanel
+from ..utils.data_processor import rolling_window
+from .timeframe import split_timeframe, timeframe_fields
+
+
+def _ema(values: np.ndarray, span: int) -> np.ndarray:
+    return pd.DataFrame(values).ewm(span=span, adjust=False).mean().to_numpy()
+
+
+def _true_range(fields: Dict[str, np.ndarray]) -> np.ndarray:
+    high, low, close = fields['High'], fields['Low'], fields['Close']
+    prev_close = np.full_like(close, np.nan)
+    prev_close[1:] = close[:-1]
+    return np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def _rsi(close: np.ndarray, window: int) -> np.ndarray:
+    delta = np.full_like(close, np.nan)
+    delta[1:] = close[1:] - close[:-1]
+    gain = rolling_window(np.where(delta > 0, delta, 0.0), window, np.mean)
+    loss = rolling_window(np.where(delta < 0, -delta, 0.0), window, np.mean)
+    # 与 calculate_technical_indicators 的RSI口径一致，首行差分按0计
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - 100 / (1 + gain / loss)
+
+
+def _roc(close: np.ndarray, n: int) -> np.ndarray:
+    result = np.full_like(close, np.nan)
+    result[n:] = (close[n:] / close[:-n] - 1) * 100
+    return result
+
+
+# 指标名称格式为 "<类型>_<参数1>_<参数2>..."，如 SMA_20、MACD_12_26、MACDSIG_12_26_9
+_INDICATORS: Dict[str, Callable[..., np.ndarray]] = {
+    'SMA': lambda f, n: rolling_window(f['Close'], n, np.mean),
+    'EMA': lambda f, n: _ema(f['Close'], n),
+    'STD': lambda f, n: rolling_window(f['Close'], n, lambda w, axis: np.std(w, axis=axis, ddof=1)),
+    'HIGH': lambda f, n: rolling_window(f['High'], n, np.max),
+    'LOW': lambda f, n: rolling_window(f['Low'], n, np.min),
+    'TR': lambda f: _true_range(f),
+    'ATR': lambda f, n: rolling_window(_true_range(f), n, np.mean),
+    'RSI': lambda f, n: _rsi(f['Close'], n),
+    'MACD': lambda f, fast, slow: _ema(f['Close'], fast) - _ema(f['Close'], slow),
+    'MACDSIG': lambda f, fast, slow, signal: _ema(_ema(f['Close'], fast) - _ema(f['Close'], slow), signal),
+    'VOLMA': lambda f, n: rolling_window(f['Volume'], n, np.mean),
+    'ROC': lambda f, n: _roc(f['Close'], n),
+}
+
+
+def available_indicators() -> list:
+    return sorted(_INDICATORS)
+
+
+def compute_indicator(fields: Dict[str, np.ndarray], name: str) -> np.ndarray:
+    """
+    按名称计算单个指标
+
+    Args:
+        fields: 面板字段，至少包含 OHLCV
+        name: 指标名称，如 SMA_20
+
+    Returns:
+        np.ndarray: 与面板字段同形状的指标数组
+    """
+    kind, *args = name.split('_')
+    if kind not in _INDICATORS:
+        raise ValueError(f"未知的指标: {name}，可用类型: {', '.join(available_indicators())}")
+    return _INDICATORS[kind](fields, *(int(a) for a in args))
+
+
+def compute_indicators(panel: MarketPanel, names: Iterable[str]) -> MarketPanel:
+    """
+    在面板上计算一组指标，已存在的字段不会重复计算
+
+    带周期前缀的名称（如 'W:SMA_10'、'D:HIGH_20'、'W:Close'）在对应的高周期面板上计算，
+    再按收盘可用时间对齐到本面板，每个周期只聚合和对齐一次
+
+    Returns:
+        MarketPanel: 增加了指标字段的新面板
+    """
+    fields = dict(panel.fields)
+    timeframes = dict(panel.timeframes)
+    by_timeframe = defaultdict(set)
+    for name in set(names):
+        if name not in fields:
+            rule, base = split_timeframe(name)
+            by_timeframe[rule].add(base)
+
+    for name in sorted(by_timeframe.pop('', ())):
+        fields[name] = compute_indicator(fields, name)
+    for rule, bases in sorted(by_timeframe.items()):
+        aligned, timeframes[rule] = timeframe_fields(panel, rule, sorted(bases), compute_indicators)
+        fields.update(aligned)
+    return MarketPanel(codes=panel.codes, index=panel.index, fields=fields, timeframes=timeframes)
@@ -0,0 +1,183 @@
+"""
+轻量推理
+
+把模型库中训练好的 LSTMPredictor 模型导出为 TFLite 格式（可选 float16 / 动态范围 / int8 量化），
+TFLitePredictor 用 TFLite 解释器加载导出的模型，预测接口与 LSTMPredictor 相同。
+推理进程只需安装 tflite-runtime（或 ai-edge-litert），不需要导入完整的 TensorFlow 和 scikit-learn，
+启动时间和内存占用都远小于 Keras 推理。
+"""
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config.settings import Settings
+from ..models.entities import StockData, PredictionResult
+from .lstm_predictor import LSTMPredictor, _load_tensorflow
+from .model_registry import ModelRegistry
+
+TFLITE_FILE = 'model.tflite'
+QUANTIZATIONS = ('none', 'float16', 'dynamic', 'int8')
+
+
+def _interpreter_class():
+    """按 tflite-runtime、ai-edge-litert、tensorflow 的顺序查找 TFLite 解释器"""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        import tensorflow as tf
+        return tf.lite.Interpreter
+    except ImportError as e:
+        raise ImportError("TFLite 推理需要安装 tflite-runtime 或 ai-edge-litert") from e
+
+
+def export_tflite(model, path: Path, quantize: str = 'none',
+                  representative: Optional[np.ndarray] = None) -> Path:
+    """
+    把 Keras 模型转换为 TFLite 模型
+
+    以批大小为1的固定形状转换，LSTM 被融合为 TFLite 内置算子，推理时不依赖 TensorFlow 算子；
+    解释器可按需调整批大小。
+
+    Args:
+        model: 输入为 [批大小, time_step, 1] 的 Keras 模型
+        path: 输出文件路径
+        quantize: 量化方式: none / float16（权重半精度）/ dynamic（权重int8）/
+            int8（按代表性数据校准激活值，输入输出保持float32）
+        representative: int8 量化的代表性输入，[样本数, time_step, 1]
+
+    Returns:
+        Path: 输出文件路径
+    """
+    if quantize not in QUANTIZATIONS:
+        raise ValueError(f"未知的量化方式: {quantize}，可选: {', '.join(QUANTIZATIONS)}")
+    if quantize == 'int8' and representative is None:
+        raise ValueError("int8 量化需要代表性数据")
+    tf = _load_tensorflow()
+
+    run = tf.function(lambda x: model(x, training=False))
+    concrete = run.get_concrete_function(
+        tf.TensorSpec([1, Settings.LSTM.time_step, 1], tf.float32))
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete], model)
+    if quantize != 'none':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantize == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == 'int8':
+        converter.representative_dataset = lambda: ([sample[None].astype(np.float32)]
+                                                    for sample in representative)
+    content = converter.convert()
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp{os.getpid()}")
+    tmp.write_bytes(content)
+    os.replace(tmp, path)
+    return path
+
+
+def export_predictor(stock_data: StockData, quantize: str = 'none',
+                     predictor: Optional[LSTMPredictor] = None) -> Path:
+    """
+    导出一只股票的预测模型，模型库中没有可用模型时先训练
+
+    Args:
+        stock_data: 股票数据
+        quantize: 量化方式，见 export_tflite
+        predictor: LSTM预测器，默认新建
+
+    Returns:
+        Path: 导出的 TFLite 文件路径，位于模型库中该模型的目录下
+    """
+    predictor = predictor or LSTMPredictor()
+    predictor.ensure_trained(stock_data)
+    representative = None
+    if quantize == 'int8':
+        X, _ = predictor.data_processor.prepare_lstm_data(stock_data, fit=False)
+        representative = X[-500:, :, None]
+    path = predictor.registry.artifact_path(stock_data.code, predictor.spec, TFLITE_FILE)
+    export_tflite(predictor.model, path, quantize, representative)
+    size = path.stat().st_size / 1024
+    predictor.logger.info(f"已导出TFLite模型: {stock_data.code} ({quantize}, {size:.0f} KB)")
+    return path
+
+
+class TFLitePredictor(LSTMPredictor):
+    """
+    基于导出的 TFLite 模型的预测器
+
+    接口与 LSTMPredictor 相同，只读取模型库中由 export_predictor 导出的模型和归一化参数，
+    不训练、不导入 TensorFlow。模型重新训练后需重新导出。
+    """
+    def __init__(self, registry: Optional[ModelRegistry] = None, num_threads: int = 1):
+        """
+        Args:
+            registry: 模型库
+            num_threads: 每个解释器的线程数
+        """
+        super().__init__(registry)
+        self.num_threads = num_threads
+        self._interpreters: Dict[str, Tuple[object, dict]] = {}
+
+    @property
+    def spec(self) -> dict:
+        # 导出的是 LSTMPredictor 训练的模型
+        return {**super().spec, 'model': LSTMPredictor.__name__}
+
+    def _interpreter(self, code: str) -> Tuple[object, dict]:
+        if code not in self._interpreters:
+            entry = self.registry.load(code, self.spec)
+            path = self.registry.artifact_path(code, self.spec, TFLITE_FILE)
+            if entry is None or not path.exists():
+                raise FileNotFoundError(f"{code} 没有导出的TFLite模型，请先运行 export-model")
+            interpreter = _interpreter_class()(model_path=str(path), num_threads=self.num_threads)
+            interpreter.allocate_tensors()
+            self._interpreters[code] = (interpreter, entry['scaler'])
+        return self._interpreters[code]
+
+    def ensure_trained(self, stock_data: StockData, retrain: bool = False) -> str:
+        """加载该股票导出的模型，TFLite 推理不支持训练"""
+        if retrain:
+            raise ValueError("TFLite 推理不支持训练，请用 LSTMPredictor 训练后重新导出")
+        self._interpreter(stock_data.code)
+        return 'loaded'
+
+    def predict(self, stock_data: StockData, days_ahead: int = 5) -> List[PredictionResult]:
+        """预测未来价格"""
+        try:
+            interpreter, scaler = self._interpreter(stock_data.code)
+            low = scaler['data_min'][0]
+            span = (scaler['data_max'][0] - low) or 1.0
+            window = stock_data.data['Close'].to_numpy(dtype=float)[-Settings.LSTM.time_step:]
+            windows = ((window - low) / span).astype(np.float32)[None, :, None]
+            prices = self._run(interpreter, windows, days_ahead)[0] * span + low
+            return self._prediction_results(stock_data, prices)
+        except Exception as e:
+            self.logger.error(f"TFLite预测出错: {str(e)}")
+            raise
+
+    @staticmethod
+    def _run(interpreter, windows: np.ndarray, days_ahead: int) -> np.ndarray:
+        """自回归多步预测，windows 为 [批大小, time_step, 1] 的归一化序列"""
+        input_detail = interpreter.get_input_details()[0]
+        output_detail = interpreter.get_output_details()[0]
+        if tuple(input_detail['shape']) != windows.shape:
+            interpreter.resize_tensor_input(input_detail['index'], windows.shape)
+            interpreter.allocate_tensors()
+        outputs = np.empty((windows.shape[0], days_ahead), dtype=np.float32)
+        for day in range(days_ahead):
+            interpreter.set_tensor(input_detail['index'], windows)
+            interpreter.invoke()
+            next_value = interpreter.get_tensor(output_detail['index'])
+            outputs[:, day] = next_value[:, 0]
+            windows = np.concatenate([windows[:, 1:, :], next_value[:, None, :]], axis=1)
+        return outputs
@@ -0,0 +1,177 @@
+from pathlib import Path
+from typing import List, Union
+
+import numpy as np
+import pandas as pd
+
+EQUITY_DTYPE = np.dtype([
+    ('date', 'datetime64[ns]'),
+    ('value', 'f8'),
+    ('cash', 'f8'),
+    ('position', 'f8'),
+])
+
+TRADE_DTYPE = np.dtype([
+    ('date', 'datetime64[ns]'),
+    ('action', 'i1'),  # 1 买入, -1 卖出
+    ('price', 'f8'),
+    ('size', 'f8'),
+    ('amount', 'f8'),
+    ('trading_cost', 'f8'),
+])
+
+BUY = 1
+SELL = -1
+
+
+class _ArrayLedger:
+    """
+    基于结构化NumPy数组的追加式记录
+    预分配容量，写满后按倍数扩容，追加操作均摊 O(1)
+    """
+    dtype: np.dtype = None
+
+    def __init__(self, capacity: int = 1024):
+        self._data = np.empty(max(capacity, 1), dtype=self.dtype)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self) -> None:
+        self._size = 0
+
+    @property
+    def data(self) -> np.ndarray:
+        """已写入部分的结构化数组视图"""
+        return self._data[:self._size]
+
+    def _reserve(self, extra: int) -> None:
+        required = self._size + extra
+        if required > len(self._data):
+            capacity = max(required, len(self._data) * 2)
+            grown = np.empty(capacity, dtype=self.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+
+    def pop(self) -> None:
+        """删除最后一条记录"""
+        if self._size:
+            self._size -= 1
+
+    def to_frame(self) -> pd.DataFrame:
+        """导出为以日期为索引的DataFrame"""
+        return pd.DataFrame(self.data).set_index('date')
+
+    def save(self, path: Union[str, Path]) -> Path:
+        """保存为 .npy 文件"""
+        path = Path(path)
+        np.save(path, self.data)
+        return path
+
+    @classmethod
+    def load(cls, path: Union[str, Path]):
+        """从 save 生成的 .npy 文件恢复"""
+        data = np.load(path)
+        ledger = cls(len(data))
+        ledger._data[:len(data)] = data
+        ledger._size = len(data)
+        return ledger
+
+
+class EquityLedger(_ArrayLedger):
+    """逐K线（或逐交易日）的组合价值、现金和持仓记录"""
+    dtype = EQUITY_DTYPE
+
+    def append(self, date, value: float, cash: float, position: float) -> None:
+        self._reserve(1)
+        self._data[self._size] = (np.datetime64(date, 'ns'), value, cash, position)
+        self._size += 1
+
+    def extend(self, dates, values: np.ndarray, cash: np.ndarray, position: np.ndarray) -> None:
+        """批量追加整段数组"""
+        n = len(values)
+        self._reserve(n)
+        block = self._data[self._size:self._size + n]
+        block['date'] = np.asarray(dates, dtype='datetime64[ns]')
+        block['value'] = values
+        block['cash'] = cash
+        block['position'] = position
+        self._size += n
+
+    @property
+    def last_date(self):
+        return self._data['date'][self._size - 1] if self._size else None
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._data['value'][:self._size]
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self._data['date'][:self._size]
+
+
+class TradeLog(_ArrayLedger):
+    """列式成交记录，买卖方向以 BUY/SELL 整数编码"""
+    dtype = TRADE_DTYPE
+
+    def append(self, date, action: str, price: float, size: float,
+               trading_cost: float) -> None:
+        self._reserve(1)
+        self._data[self._size] = (np.datetime64(date, 'ns'), BUY if action == 'BUY' else SELL,
+                                  price, size, price * size, trading_cost)
+        self._size += 1
+
+    def to_frame(self) -> pd.DataFrame:
+        """导出为DataFrame，买入记录附带总成本、卖出记录附带净收入"""
+        df = super().to_frame()
+        is_buy = df['action'].to_numpy() == BUY
+        df['action'] = np.where(is_buy, 'BUY', 'SELL')
+        df['total_cost'] = np.where(is_buy, df['amount'] + df['trading_cost'], np.nan)
+        df['net_revenue'] = np.where(is_buy, np.nan, df['amount'] - df['trading_cost'])
+        return df
+
+    def to_records(self) -> List[dict]:
+        """导出为字典列表"""
+        return self.to_frame().reset_index().to_dict('records')
+
+    def round_trip_stats(self) -> dict:
+        """
+        按 开仓->平仓 统计完整交易
+
+        分批买入的成本按数量累计，每笔卖出按平均每股成本分摊建仓成本，持仓回到零时
+        计为一笔完整交易；分批减仓（如风险引擎调低目标或止损）的各笔卖出合并计入同一笔交易。
+        期末仍持有的仓位不计入。
+
+        Returns:
+            dict: 完整交易笔数、盈利笔数和总交易成本
+        """
+        data = self.data
+        position = basis = trip_cost = trip_revenue = 0.0
+        total_trades = winning_trades = 0
+        for action, size, amount, trading_cost in zip(data['action'].tolist(), data['size'].tolist(),
+                                                      data['amount'].tolist(),
+                                                      data['trading_cost'].tolist()):
+            if action == BUY:
+                position += size
+                basis += amount + trading_cost
+                continue
+            if position <= 0:
+                continue
+            sold = min(size, position)
+            allocated = basis * sold / position
+            basis -= allocated
+            position -= sold
+            trip_cost += allocated
+            trip_revenue += amount - trading_cost
+            # 浮点误差范围内的剩余仓位视为已平仓
+            if position <= 1e-9 * size:
+                total_trades += 1
+                winning_trades += trip_revenue > trip_cost
+                position = basis = trip_cost = trip_revenue = 0.0
+        return {
+            'total_trades': total_trades,
+            'winning_trades': int(winning_trades),
+            'total_trading_cost': float(data['trading_cost'].sum()),
+        }
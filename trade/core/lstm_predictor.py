@@ -1,59 +1,195 @@
-# 检查是否在 Mac 上运行
 import platform
-from datetime import timedelta
-from typing import List
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 import numpy as np
-import tensorflow as tf
-from tensorflow.keras.layers import LSTM, Dense, Dropout, Input
-from tensorflow.keras.models import Model
+import pandas as pd
 
 from ..config.settings import Settings
 from ..models.entities import StockData, PredictionResult
 from ..utils.data_processor import DataProcessor
 from ..utils.logger import Logger
+from .model_registry import ModelRegistry
+from .result_cache import data_fingerprint
+from .training import restore_checkpoint, training_callbacks
+
+if TYPE_CHECKING:
+    from tensorflow.keras.models import Model
 
+# 检查是否在 Mac 上运行
 is_mac = platform.system() == 'Darwin'
 is_apple_silicon = is_mac and platform.machine() == 'arm64'
 
-if is_apple_silicon:
-    try:
-        # 为 Apple Silicon (M1/M2/M3) 设置 Metal 插件
-        physical_devices = tf.config.list_physical_devices('GPU')
-        if len(physical_devices) > 0:
-            tf.config.experimental.set_memory_growth(physical_devices[0], True)
-        tf.config.set_visible_devices(physical_devices[0], 'GPU')
-    except:
-        print("无法设置 GPU 设备。将使用 CPU 进行计算。")
-elif is_mac:
-    # 对于 Intel Mac 的原有设置
-    gpus = tf.config.list_physical_devices('GPU')
-    if gpus:
-        tf.config.experimental.set_visible_devices([], 'GPU')
-        tf.config.experimental.set_memory_growth(gpus[0], True)
+# 模型输入的特征列；特征集或网络结构变化时模型库中的旧模型不再适用
+FEATURES = ('Close',)
+MODEL_VERSION = '1'
+
+def price_signals(predicted_price: float, current_price: float) -> List[str]:
+    """按预测价格相对当前价格的涨跌幅生成交易信号"""
+    signals = []
+    price_change = (predicted_price - current_price) / current_price
+    if price_change > 0.03:
+        signals.append("强烈买入")
+    elif price_change > 0.01:
+        signals.append("建议买入")
+    elif price_change < -0.03:
+        signals.append("强烈卖出")
+    elif price_change < -0.01:
+        signals.append("建议卖出")
+    else:
+        signals.append("持观望态度")
+
+    return signals
+
+def sample_interval(samples: np.ndarray,
+                    coverage: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    由预测样本（第0轴为样本）的分位数得到预测区间
+
+    Args:
+        samples: [样本数, ...] 的预测价格
+        coverage: 覆盖率，默认 Settings.INTERVAL.coverage
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: 区间下限、上限
+    """
+    alpha = 1 - (coverage or Settings.INTERVAL.coverage)
+    lower, upper = np.quantile(samples, [alpha / 2, 1 - alpha / 2], axis=0)
+    return lower, upper
+
+def prediction_results(stock_data: StockData, prices: np.ndarray,
+                       confidence: Optional[List[float]] = None,
+                       lower: Optional[np.ndarray] = None,
+                       upper: Optional[np.ndarray] = None) -> List[PredictionResult]:
+    """
+    把一只股票各预测天数的价格转换为预测结果
+
+    Args:
+        stock_data: 股票数据
+        prices: 第1天到第N天的预测价格
+        confidence: 各预测天数的经验置信度（见 ForecastEvaluator），为空时按预测天数递减
+        lower: 各预测天数的区间下限
+        upper: 各预测天数的区间上限
+
+    Returns:
+        List[PredictionResult]: 预测结果
+    """
+    last_date = stock_data.data.index[-1]
+    current_price = stock_data.data['Close'].values[-1]
+    predictions = []
+    for i, predicted_price in enumerate(prices):
+        predicted_price = float(predicted_price)
+        predictions.append(PredictionResult(
+            code=stock_data.code,
+            # 基于最后一个已知日期，向前推进i+1天
+            date=(last_date + timedelta(days=i + 1)).date(),
+            predicted_price=predicted_price,
+            # 没有评估记录时预测越远置信度越低
+            confidence=float(confidence[i]) if confidence else 0.9 / (i + 1),
+            signals=price_signals(predicted_price, current_price),
+            lower_price=None if lower is None else float(lower[i]),
+            upper_price=None if upper is None else float(upper[i])
+        ))
+    return predictions
+
+@lru_cache(maxsize=None)
+def _load_tensorflow():
+    """
+    导入 TensorFlow 并配置计算设备
+
+    TensorFlow 的导入和设备探测需要数秒，只在首次训练或预测时进行，
+    不需要模型的命令（策略分析、回测、查询等）无需加载 TensorFlow。
+
+    Returns:
+        module: tensorflow 模块
+    """
+    import tensorflow as tf
+
+    logger = Logger()
+    if is_apple_silicon:
+        try:
+            # 为 Apple Silicon (M1/M2/M3) 设置 Metal 插件
+            physical_devices = tf.config.list_physical_devices('GPU')
+            if len(physical_devices) > 0:
+                tf.config.experimental.set_memory_growth(physical_devices[0], True)
+            tf.config.set_visible_devices(physical_devices[0], 'GPU')
+        except Exception:
+            logger.warning("无法设置 GPU 设备。将使用 CPU 进行计算。")
+    elif is_mac:
+        # 对于 Intel Mac 的原有设置
+        gpus = tf.config.list_physical_devices('GPU')
+        if gpus:
+            tf.config.experimental.set_visible_devices([], 'GPU')
+            tf.config.experimental.set_memory_growth(gpus[0], True)
+        else:
+            logger.info("没有可用的 GPU，使用 CPU 进行计算。")
     else:
-        print("没有可用的 GPU，使用 CPU 进行计算。")
-else:
-    print("非 Mac 系统，使用默认设置。")
+        logger.info("非 Mac 系统，使用默认设置。")
+    return tf
 
 class LSTMPredictor:
-    def __init__(self):
+    # 评估记录和经验置信度使用的模型名称
+    name = 'lstm'
+
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        """
+        Args:
+            registry: 模型库，默认为 Settings.DATA.model_dir 下的模型库
+        """
         self.logger = Logger()
         self.data_processor = DataProcessor()
-        self.model = self._build_model()
+        self.registry = registry or ModelRegistry()
+        self._model = None
+        # 编译好的多步预测函数（按是否保留 Dropout 区分）及其对应的模型，模型重建后需重新编译
+        self._rollouts = {}
+        self._rollout_model = None
+
+    @property
+    def spec(self) -> dict:
+        """模型规格，决定模型库中的模型能否用于当前配置"""
+        config = Settings.LSTM
+        return {
+            'model': type(self).__name__,
+            'version': MODEL_VERSION,
+            'features': list(FEATURES),
+            'time_step': config.time_step,
+            'lstm_units': config.lstm_units,
+            'dense_units': config.dense_units,
+        }
 
-    def _build_model(self) -> Model:
+    @property
+    def model(self) -> 'Model':
+        """LSTM模型，首次训练或预测时才加载 TensorFlow 并构建"""
+        if self._model is None:
+            self._model = self._build_model()
+        return self._model
+
+    def _build_model(self) -> 'Model':
         """构建LSTM模型"""
+        _load_tensorflow()
+        from tensorflow.keras.layers import Input
+        from tensorflow.keras.models import Model
+
         inputs = Input(shape=(Settings.LSTM.time_step, 1))
-        x = LSTM(Settings.LSTM.lstm_units, return_sequences=True)(inputs)
+        model = Model(inputs=inputs, outputs=self._lstm_head(inputs))
+        return self._compile(model)
+
+    @staticmethod
+    def _lstm_head(x):
+        """两层LSTM加全连接输出层，输出下一根K线的预测值"""
+        from tensorflow.keras.layers import LSTM, Dense, Dropout
+
+        x = LSTM(Settings.LSTM.lstm_units, return_sequences=True)(x)
         x = Dropout(0.2)(x)
         x = LSTM(Settings.LSTM.lstm_units, return_sequences=False)(x)
         x = Dropout(0.2)(x)
         x = Dense(Settings.LSTM.dense_units)(x)
-        outputs = Dense(1)(x)
-
-        model = Model(inputs=inputs, outputs=outputs)
+        return Dense(1)(x)
 
+    @staticmethod
+    def _compile(model: 'Model') -> 'Model':
         if is_mac:
             # 为 Mac 优化的编译设置
             model.compile(optimizer='adam', loss='mean_squared_error',
@@ -61,9 +197,49 @@ class LSTMPredictor:
         else:
             model.compile(optimizer='adam', loss='mean_squared_error')
         return model
+
+    def ensure_trained(self, stock_data: StockData, retrain: bool = False) -> str:
+        """
+        准备该股票的模型：优先从模型库加载，有新K线时只用新K线微调，没有可用模型时完整训练
+
+        模型库中的模型只有在训练所用的历史K线未被修改时才会复用，
+        复权等原因导致历史数据变化时重新训练。
+
+        Args:
+            stock_data: 股票数据
+            retrain: 是否忽略模型库强制完整训练
+
+        Returns:
+            str: 'loaded'（直接加载）/ 'fine_tuned'（加载后微调）/ 'trained'（完整训练）
+        """
+        try:
+            code = stock_data.code
+            entry = None if retrain else self.registry.load(code, self.spec)
+            if entry is not None:
+                data = stock_data.data
+                trained_bars = data.index.searchsorted(pd.Timestamp(entry['last_bar']), side='right')
+                trained = data.iloc[:trained_bars]
+                if trained_bars and data_fingerprint(trained) == entry['fingerprint']:
+                    self.model.load_weights(entry['weights'])
+                    self._set_scaler(entry['scaler'])
+                    if trained_bars == len(data):
+                        self.logger.info(f"从模型库加载模型: {code}")
+                        return 'loaded'
+                    self._fine_tune(stock_data, trained_bars, entry)
+                    return 'fine_tuned'
+                self.logger.info(f"{code} 的历史数据已变化，重新训练模型")
+            self.train(stock_data)
+            return 'trained'
+
+        except Exception as e:
+            self.logger.error(f"准备LSTM模型出错: {str(e)}")
+            raise
+
     def train(self, stock_data: StockData) -> None:
-        """训练模型"""
+        """完整训练模型并保存到模型库"""
         try:
+            # 每只股票从新初始化的权重开始训练
+            self._model = self._build_model()
             X, y = self.data_processor.prepare_lstm_data(stock_data)
             # 划分训练集和验证集
             train_size = int(len(X) * (1 - Settings.LSTM.validation_split))
@@ -72,74 +248,164 @@ class LSTMPredictor:
             # 调整数据形状
             X_train = X_train.reshape(X_train.shape[0], X_train.shape[1], 1)
             X_val = X_val.reshape(X_val.shape[0], X_val.shape[1], 1)
-            # 训练模型
-            self.model.fit(
+            # 训练模型，验证损失不再下降时提前停止，训练结束后载入最优权重
+            checkpoint = self.registry.checkpoint_path(stock_data.code, self.spec)
+            history = self.model.fit(
                 X_train, y_train,
                 batch_size=Settings.LSTM.batch_size,
                 epochs=Settings.LSTM.epochs,
                 validation_data=(X_val, y_val),
-                verbose=1
+                callbacks=training_callbacks(stock_data.code, checkpoint=checkpoint),
+                verbose=Settings.LSTM.verbose
             )
+            restore_checkpoint(self.model, checkpoint)
+            self._save(stock_data, history)
         except Exception as e:
             self.logger.error(f"Error training LSTM model: {str(e)}")
             raise
+
+    def _fine_tune(self, stock_data: StockData, trained_bars: int, entry: dict) -> None:
+        """只用目标落在新K线上的样本微调已加载的模型，沿用原有的归一化参数"""
+        X, y = self.data_processor.prepare_lstm_data(stock_data, fit=False)
+        start = max(trained_bars - Settings.LSTM.time_step, 0)
+        X_new, y_new = X[start:], y[start:]
+        self.logger.info(f"使用 {len(X_new)} 根新K线微调模型: {stock_data.code}")
+        history = self.model.fit(
+            X_new.reshape(X_new.shape[0], X_new.shape[1], 1), y_new,
+            batch_size=Settings.LSTM.batch_size,
+            epochs=Settings.LSTM.finetune_epochs,
+            callbacks=training_callbacks(stock_data.code, validation=False),
+            verbose=Settings.LSTM.verbose
+        )
+        self._save(stock_data, history, entry)
+
+    def _set_scaler(self, state: dict) -> None:
+        # 用最小值、最大值两个点拟合即可还原 MinMaxScaler 的参数
+        self.data_processor.scaler.fit(np.array([state['data_min'], state['data_max']]))
+
+    def _save(self, stock_data: StockData, history, previous: Optional[dict] = None) -> None:
+        data = stock_data.data
+        scaler = self.data_processor.scaler
+        now = datetime.now().isoformat(timespec='seconds')
+        metadata = {
+            'last_bar': str(data.index[-1]),
+            'bars': len(data),
+            'fingerprint': data_fingerprint(data),
+            'scaler': {'data_min': scaler.data_min_.tolist(), 'data_max': scaler.data_max_.tolist()},
+            'trained_at': previous['trained_at'] if previous else now,
+            'updated_at': now,
+            'fine_tunes': previous['fine_tunes'] + 1 if previous else 0,
+            'epochs': len(history.history['loss']),
+            'loss': float(history.history['loss'][-1]),
+            'val_loss': min(history.history['val_loss']) if 'val_loss' in history.history else None,
+            'config': asdict(Settings.LSTM),
+        }
+        self.registry.save(stock_data.code, self.spec, self.model, metadata)
+
     def predict(self, stock_data: StockData, days_ahead: int = 5) -> List[PredictionResult]:
-        """预测未来价格"""
+        """预测未来价格，Settings.INTERVAL.mc_samples > 0 时用 MC Dropout 估计预测区间"""
         try:
             # 准备最新的时间序列数据
             last_sequence = stock_data.data['Close'].values[-Settings.LSTM.time_step:]
             last_sequence = self.data_processor.scaler.transform(
                 last_sequence.reshape(-1, 1)
             )
-            predictions = []
-            current_sequence = last_sequence.copy()
-            for i in range(days_ahead):
-                # 预测下一天
-                current_sequence_reshaped = current_sequence.reshape(
-                    1, Settings.LSTM.time_step, 1
-                )
-                next_pred = self.model.predict(current_sequence_reshaped)
-                # 转换回原始价格
-                predicted_price = float(self.data_processor.inverse_transform_prices(
-                    next_pred
-                )[0, 0])
-                # 计算预测日期
-                # 计算预测日期：基于最后一个已知日期，向前推进i+1天
-                prediction_date = (stock_data.data.index[-1] + timedelta(days=i+1)).date()
-                # 计算置信度（简单示例）
-                confidence = 0.9 / (i + 1)  # 预测越远置信度越低
-                # 生成信号
-                signals = self._generate_signals(predicted_price,
-                                              stock_data.data['Close'].values[-1])
-                predictions.append(PredictionResult(
-                    code=stock_data.code,
-                    date=prediction_date,
-                    predicted_price=predicted_price,
-                    confidence=confidence,
-                    signals=signals
-                ))
-                # 更新序列用于下一次预测
-                current_sequence = np.roll(current_sequence, -1)
-                current_sequence[-1] = next_pred
-            return predictions
+            # 一次调用得到全部预测天数，再转换回原始价格
+            scaled = self._forecast(last_sequence[None, :, :], days_ahead)[0]
+            prices = self.data_processor.inverse_transform_prices(scaled)[:, 0]
+            lower = upper = None
+            if Settings.INTERVAL.mc_samples:
+                samples = self._forecast(last_sequence[None, :, :], days_ahead,
+                                         Settings.INTERVAL.mc_samples)[:, 0]
+                lower, upper = sample_interval(
+                    self.data_processor.inverse_transform_prices(samples).reshape(samples.shape))
+            return self._prediction_results(stock_data, prices, lower, upper)
         except Exception as e:
             self.logger.error(f"Error making predictions: {str(e)}")
             raise
 
+    def predict_batch(self, stock_datas: List[StockData],
+                      days_ahead: int = 5) -> List[PredictionResult]:
+        """
+        逐只股票加载（必要时训练）各自的模型后预测
+
+        本类的模型和归一化参数按股票训练，不能跨股票共用；全部股票拼成一个批次、
+        在编译好的计算图中一次完成多步预测的批量推理只适用于共享模型
+        GlobalLSTMPredictor（--model global）。
+
+        Args:
+            stock_datas: 股票数据列表
+            days_ahead: 预测天数
+
+        Returns:
+            List[PredictionResult]: 按股票、日期排列的预测结果
+        """
+        predictions = []
+        for stock_data in stock_datas:
+            self.ensure_trained(stock_data)
+            predictions.extend(self.predict(stock_data, days_ahead))
+        return predictions
+
+    def _forecast(self, sequences: np.ndarray, days_ahead: int, samples: int = 0) -> np.ndarray:
+        """
+        自回归多步预测，每一步的预测值移入输入序列末尾继续预测
+
+        Args:
+            sequences: [股票数, time_step, 1] 的归一化序列
+            days_ahead: 预测天数
+            samples: MC Dropout 样本数，为 0 时为确定性预测
+
+        Returns:
+            np.ndarray: [股票数, days_ahead] 的归一化预测值；samples > 0 时为
+            [samples, 股票数, days_ahead] 的预测样本
+        """
+        tf = _load_tensorflow()
+        days = tf.constant(days_ahead, dtype=tf.int32)
+        if not samples:
+            return self._compiled_rollout()(tf.constant(sequences, dtype=tf.float32), days).numpy()
+        # 每只股票的序列重复 samples 次拼成一个批次，各行的 Dropout 掩码相互独立
+        tiled = np.repeat(sequences, samples, axis=0)
+        outputs = self._compiled_rollout(training=True)(tf.constant(tiled, dtype=tf.float32), days).numpy()
+        return outputs.reshape(len(sequences), samples, days_ahead).transpose(1, 0, 2)
+
+    def _compiled_rollout(self, training: bool = False):
+        """编译好的多步预测函数，training 为 True 时推理保留 Dropout（MC Dropout）"""
+        model = self.model
+        if self._rollout_model is not model:
+            self._rollouts = {}
+            self._rollout_model = model
+        if training not in self._rollouts:
+            self._rollouts[training] = self._build_rollout(model, training)
+        return self._rollouts[training]
+
+    @staticmethod
+    def _build_rollout(model, training: bool = False):
+        """把多步预测循环编译为计算图，批次大小和预测天数变化时不重新编译"""
+        tf = _load_tensorflow()
+
+        @tf.function(input_signature=[
+            tf.TensorSpec([None, Settings.LSTM.time_step, 1], tf.float32),
+            tf.TensorSpec([], tf.int32),
+        ])
+        def rollout(sequences, days):
+            outputs = tf.TensorArray(tf.float32, size=days)
+            for i in tf.range(days):
+                next_value = model(sequences, training=training)
+                outputs = outputs.write(i, next_value[:, 0])
+                sequences = tf.concat([sequences[:, 1:, :], next_value[:, None, :]], axis=1)
+            return tf.transpose(outputs.stack())
+
+        return rollout
+
+    def _prediction_results(self, stock_data: StockData, prices: np.ndarray,
+                            lower: Optional[np.ndarray] = None,
+                            upper: Optional[np.ndarray] = None) -> List[PredictionResult]:
+        """没有采样得到的区间时使用评估记录中的共形预测区间"""
+        confidence = self.registry.confidence(self.name, stock_data.code, len(prices))
+        if lower is None:
+            lower, upper = self.registry.interval(self.name, stock_data.code, prices)
+        return prediction_results(stock_data, prices, confidence, lower, upper)
+
     def _generate_signals(self, predicted_price: float,
                          current_price: float) -> List[str]:
-        """生成交易信号"""
-        signals = []
-        price_change = (predicted_price - current_price) / current_price
-        if price_change > 0.03:
-            signals.append("强烈买入")
-        elif price_change > 0.01:
-            signals.append("建议买入")
-        elif price_change < -0.03:
-            signals.append("强烈卖出")
-        elif price_change < -0.01:
-            signals.append("建议卖出")
-        else:
-            signals.append("持观望态度")
-
-        return signals
+        return price_signals(predicted_price, current_price)
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config.settings import Settings
+from ..utils.logger import Logger
+
+_METADATA = 'metadata.json'
+_WEIGHTS = 'model.weights.h5'
+_TUNING = 'tuning.json'
+# 评估记录和评估用模型所在的目录，与股票代码目录并列
+EVALUATION_DIR = '_evaluation'
+
+
+def spec_key(spec: dict) -> str:
+    """模型规格（模型类型、特征集和结构参数）的哈希"""
+    text = json.dumps(spec, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+class ModelRegistry:
+    """
+    预测模型库
+
+    按 (股票代码, 模型规格) 保存训练好的模型权重和元数据，元数据包括归一化参数、
+    训练截止的K线、数据指纹和训练记录。目录结构为 {code}/{规格哈希}/，
+    规格改变（如特征集或网络结构不同）时自然对应到新的目录，旧模型不会被误用。
+    超参数搜索的结果记录在 {code}/tuning.json 中，预测效果评估的结果记录在
+    _evaluation/{模型名}.json 中。
+    """
+    def __init__(self, root: Optional[Path] = None):
+        self.logger = Logger()
+        self.root = Path(root or Settings.DATA.model_dir)
+        # 已读取的评估记录，同一模型库实例内只解析一次
+        self._evaluations: Dict[str, Optional[dict]] = {}
+
+    def _entry(self, code: str, spec: dict) -> Path:
+        return self.root / code / spec_key(spec)
+
+    def artifact_path(self, code: str, spec: dict, name: str) -> Path:
+        """
+        模型目录中附加文件（如导出的推理模型）的路径
+
+        模型重新训练或微调后整个目录被替换，附加文件随之删除，不会与新权重不一致。
+        """
+        return self._entry(code, spec) / name
+
+    def checkpoint_path(self, code: str, spec: dict) -> Path:
+        """训练过程中最优权重检查点的路径，与模型目录相邻，训练结束后删除"""
+        entry = self._entry(code, spec)
+        return entry.with_name(f"{entry.name}.checkpoint.weights.h5")
+
+    def load(self, code: str, spec: dict) -> Optional[dict]:
+        """
+        读取模型元数据
+
+        Args:
+            code: 股票代码
+            spec: 模型规格
+
+        Returns:
+            Optional[dict]: 元数据，'weights' 为权重文件路径；没有保存的模型时为 None
+        """
+        entry = self._entry(code, spec)
+        if not (entry / _METADATA).exists():
+            return None
+        with open(entry / _METADATA, encoding='utf-8') as f:
+            metadata = json.load(f)
+        metadata['weights'] = str(entry / _WEIGHTS)
+        return metadata
+
+    def save(self, code: str, spec: dict, model, metadata: dict) -> Path:
+        """
+        保存模型权重和元数据，覆盖该股票同一规格的旧模型
+
+        Args:
+            code: 股票代码
+            spec: 模型规格
+            model: Keras 模型
+            metadata: 元数据
+
+        Returns:
+            Path: 模型目录
+        """
+        entry = self._entry(code, spec)
+        # 先写入临时目录再整体重命名，进程中断不会留下权重与元数据不一致的模型
+        tmp = entry.with_name(f"{entry.name}.tmp{os.getpid()}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        model.save_weights(str(tmp / _WEIGHTS))
+        with open(tmp / _METADATA, 'w', encoding='utf-8') as f:
+            json.dump({**metadata, 'code': code, 'spec': spec}, f, ensure_ascii=False, indent=2, default=str)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+        self.logger.info(f"模型已保存: {code} ({entry.name})")
+        return entry
+
+    def entries(self, code: Optional[str] = None) -> List[dict]:
+        """列出已保存模型的元数据，可按股票代码过滤"""
+        pattern = f"{code or '*'}/*/{_METADATA}"
+        entries = []
+        for path in sorted(self.root.glob(pattern)):
+            with open(path, encoding='utf-8') as f:
+                entries.append(json.load(f))
+        return entries
+
+    def record_tuning(self, code: str, record: dict) -> Path:
+        """
+        追加一次超参数搜索的结果
+
+        Args:
+            code: 股票代码
+            record: 搜索记录，包含数据范围、交叉验证设置和各组参数的得分
+
+        Returns:
+            Path: 搜索记录文件路径
+        """
+        path = self.root / code / _TUNING
+        path.parent.mkdir(parents=True, exist_ok=True)
+        records = self.tuning_records(code)
+        records.append(record)
+        tmp = path.with_name(f"{path.name}.tmp{os.getpid()}")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp, path)
+        return path
+
+    def tuning_records(self, code: str) -> List[dict]:
+        """某只股票的全部超参数搜索记录，按时间先后排列"""
+        path = self.root / code / _TUNING
+        if not path.exists():
+            return []
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def evaluation_registry(self) -> 'ModelRegistry':
+        """评估用的模型库，评估时按历史截止日训练的模型保存在这里，不覆盖用于预测的模型"""
+        return ModelRegistry(self.root / EVALUATION_DIR)
+
+    def record_evaluation(self, model: str, record: dict) -> Path:
+        """
+        保存一个预测模型最近一次的评估结果，覆盖之前的记录
+
+        Args:
+            model: 预测模型名称
+            record: 评估记录，包含各预测天数的误差统计和经验置信度
+
+        Returns:
+            Path: 评估记录文件路径
+        """
+        path = self.root / EVALUATION_DIR / f"{model}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.tmp{os.getpid()}")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp, path)
+        self._evaluations.pop(model, None)
+        return path
+
+    def evaluation(self, model: str) -> Optional[dict]:
+        """
+        预测模型最近一次的评估记录，没有评估过时为 None
+
+        记录在首次访问时读取并缓存，逐只股票查询置信度和预测区间时不再重复解析文件；
+        通过本实例的 record_evaluation 写入新记录后重新读取。
+        """
+        if model not in self._evaluations:
+            path = self.root / EVALUATION_DIR / f"{model}.json"
+            record = None
+            if path.exists():
+                with open(path, encoding='utf-8') as f:
+                    record = json.load(f)
+            self._evaluations[model] = record
+        return self._evaluations[model]
+
+    def confidence(self, model: str, code: str, days_ahead: int) -> Optional[List[float]]:
+        """
+        评估得到的经验置信度（各预测天数的方向准确率）
+
+        评估样本足够的股票使用自身的准确率，否则使用全部股票的准确率。
+
+        Args:
+            model: 预测模型名称
+            code: 股票代码
+            days_ahead: 预测天数
+
+        Returns:
+            Optional[List[float]]: 第1天到第 days_ahead 天的置信度；没有评估记录或
+            评估的预测天数不足时为 None
+        """
+        record = self.evaluation(model)
+        if record is None:
+            return None
+        confidence = record['confidence'].get(code) or record['confidence']['*']
+        if len(confidence) < days_ahead:
+            return None
+        return confidence[:days_ahead]
+
+    def interval(self, model: str, code: str,
+                 prices: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """
+        按评估得到的相对误差分位数（共形预测）计算预测区间
+
+        评估样本足够的股票使用自身的分位数，否则使用全部股票的。
+
+        Args:
+            model: 预测模型名称
+            code: 股票代码
+            prices: 第1天到第N天的预测价格
+
+        Returns:
+            Tuple: 区间下限、上限；没有评估记录或评估的预测天数不足时为 (None, None)
+        """
+        record = self.evaluation(model)
+        if record is None or 'intervals' not in record:
+            return None, None
+        intervals = record['intervals']
+        lower = intervals['lower'].get(code) or intervals['lower']['*']
+        upper = intervals['upper'].get(code) or intervals['upper']['*']
+        days_ahead = len(prices)
+        if len(lower) < days_ahead:
+            return None, None
+        prices = np.asarray(prices, dtype=float)
+        return prices * (1 + np.asarray(lower[:days_ahead])), prices * (1 + np.asarray(upper[:days_ahead]))
+
+    def remove(self, code: str) -> None:
+        """删除某只股票的全部模型"""
+        shutil.rmtree(self.root / code, ignore_errors=True)
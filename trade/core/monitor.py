@@ -0,0 +1,339 @@
+"""
+实时信号监控
+
+守护进程按固定间隔轮询自选股的最新K线，把新K线追加到每只股票在内存中的有限窗口。
+指标只在新K线及其之前 lookback 根预热K线上计算，有状态的策略（如海龟内核）
+保存每只股票的状态并只在新K线上推进，只输出新K线上出现的信号。
+每轮的计算量取决于有新K线的股票数和新K线数，与历史数据总长度无关。
+"""
+import asyncio
+import json
+import math
+import signal
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..config.settings import Settings
+from ..models.entities import StockData
+from ..utils.data_processor import OHLCV_COLUMNS, DataProcessor
+from ..utils.logger import Logger
+from .strategies.base import ENTRY, create_strategy
+
+
+@dataclass
+class MonitorSignal:
+    """监控输出的交易信号"""
+    strategy: str
+    code: str
+    date: datetime
+    action: str  # 'BUY' or 'SELL'
+    price: float
+    signal_type: str = ''
+    volume: float = math.nan
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data['date'] = pd.Timestamp(self.date).isoformat()
+        data['volume'] = None if math.isnan(self.volume) else self.volume
+        return data
+
+
+class SignalSink:
+    """信号输出的基类，子类实现 emit"""
+
+    async def emit(self, signals: List[MonitorSignal]) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class StdoutSink(SignalSink):
+    """输出到标准输出"""
+
+    async def emit(self, signals: List[MonitorSignal]) -> None:
+        for s in signals:
+            kind = f"/{s.signal_type}" if s.signal_type else ''
+            print(f"[{pd.Timestamp(s.date):%Y-%m-%d %H:%M}] {s.strategy}{kind} {s.code} "
+                  f"{s.action} @ {s.price:.2f}", flush=True)
+
+
+class JsonlSink(SignalSink):
+    """追加写入 JSONL 文件，每行一个信号"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or Settings.MONITOR.signal_file)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    async def emit(self, signals: List[MonitorSignal]) -> None:
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for s in signals:
+                f.write(json.dumps(s.to_dict(), ensure_ascii=False) + '\n')
+
+
+class WebhookSink(SignalSink):
+    """
+    以 JSON 数组 POST 到 webhook 地址
+
+    未配置地址时只记录日志；发送失败不会中断监控。
+    """
+
+    def __init__(self, url: str = '', timeout: float = 10.0):
+        self.url = url or Settings.MONITOR.webhook_url
+        self.timeout = timeout
+        self.logger = Logger()
+        self._session = None
+
+    async def emit(self, signals: List[MonitorSignal]) -> None:
+        payload = [s.to_dict() for s in signals]
+        if not self.url:
+            self.logger.info(f"webhook 未配置地址，跳过发送 {len(payload)} 条信号")
+            return
+        try:
+            import aiohttp
+        except ImportError as e:
+            raise ImportError("webhook 输出需要安装 aiohttp") from e
+        try:
+            if self._session is None:
+                self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+            async with self._session.post(self.url, json=payload) as response:
+                if response.status >= 400:
+                    self.logger.error(f"webhook 返回错误状态: {response.status}")
+        except Exception as e:
+            self.logger.error(f"webhook 发送失败: {str(e)}")
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+_SINKS = {'stdout': StdoutSink, 'jsonl': JsonlSink, 'webhook': WebhookSink}
+
+
+def available_sinks() -> List[str]:
+    """已支持的信号输出名称"""
+    return list(_SINKS)
+
+
+def create_sink(name: str, **params) -> SignalSink:
+    """按名称创建信号输出（stdout/jsonl/webhook），params 传给输出的构造函数"""
+    if name not in _SINKS:
+        raise ValueError(f"未知的信号输出: {name}，可选: {', '.join(_SINKS)}")
+    return _SINKS[name](**params)
+
+
+def load_watchlist(path: Optional[Path] = None) -> List[str]:
+    """
+    读取自选股列表，每行一个代码，# 之后为注释
+
+    Args:
+        path: 列表文件，默认 Settings.DATA.stock_list_file
+
+    Returns:
+        List[str]: 去重后的股票代码
+    """
+    path = Path(path or Settings.DATA.stock_list_file)
+    codes = []
+    for line in path.read_text(encoding='utf-8').splitlines():
+        code = line.split('#', 1)[0].strip()
+        if code and code not in codes:
+            codes.append(code)
+    return codes
+
+
+class SignalMonitor:
+    """
+    自选股实时信号监控
+
+    每只股票在内存中只保留最近 window 根K线；每轮轮询把新K线追加到窗口末尾，
+    将有新K线的股票合并为一个面板，对每个策略向量化计算一次信号，只输出新K线上的信号。
+    提供 stream_signal_frame 的策略逐只股票保存状态，启动时在全部历史K线上推进一次，
+    之后每轮只在新K线上推进。
+    """
+    def __init__(self, stock_codes: Optional[Iterable[str]] = None,
+                 strategies: Optional[list] = None,
+                 sinks: Optional[List[SignalSink]] = None,
+                 bar_source: Optional[Callable[[str, str, str], pd.DataFrame]] = None,
+                 interval: Optional[str] = None):
+        """
+        Args:
+            stock_codes: 监控的股票代码，默认读取 Settings.DATA.stock_list_file
+            strategies: 策略对象列表，默认按配置创建
+            sinks: 信号输出列表，默认按配置创建
+            bar_source: 获取K线的函数 (代码, 时间范围, 间隔) -> DataFrame，默认使用 DataFetcher
+            interval: K线间隔，默认取配置
+        """
+        self.logger = Logger()
+        self.config = Settings.MONITOR
+        self.stock_codes = list(stock_codes) if stock_codes else load_watchlist()
+        self.strategies = strategies or [create_strategy(name) for name in self.config.strategies]
+        self.sinks = sinks if sinks is not None else [create_sink(name) for name in self.config.sinks]
+        self.interval = interval or self.config.interval
+        self.bar_source = bar_source or self._default_bar_source()
+        # 指标的预热K线数，首次获取到K线时按K线间隔折算，窗口至少覆盖它
+        self.lookback: Optional[int] = None
+        self.window = self.config.window
+        self.bars: Dict[str, pd.DataFrame] = {}
+        # 策略名称 -> 股票代码 -> 最新K线收盘后的策略状态
+        self.states: Dict[str, Dict[str, object]] = {}
+        self._stopping = asyncio.Event()
+
+    @staticmethod
+    def _default_bar_source() -> Callable[[str, str, str], pd.DataFrame]:
+        # 延迟导入，避免未使用默认数据源时加载 yfinance
+        from .data_fetcher import DataFetcher
+        fetcher = DataFetcher()
+        return lambda code, period, interval: fetcher.fetch_recent_bars(code, period, interval)
+
+    async def run(self, cycles: Optional[int] = None) -> None:
+        """
+        运行监控循环，收到 SIGINT/SIGTERM 或调用 stop() 后在本轮结束时退出
+
+        Args:
+            cycles: 运行的轮数，为空时一直运行
+        """
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        self.logger.info(f"开始监控 {len(self.stock_codes)} 只股票，策略: "
+                         f"{', '.join(s.name for s in self.strategies)}，间隔: {self.interval}")
+        cycle = 0
+        try:
+            while not self._stopping.is_set():
+                await self.run_cycle()
+                cycle += 1
+                if cycles is not None and cycle >= cycles:
+                    break
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.config.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for sink in self.sinks:
+                await sink.close()
+            self.logger.info("监控已停止")
+
+    def stop(self) -> None:
+        """请求停止监控"""
+        self._stopping.set()
+
+    async def run_cycle(self) -> List[MonitorSignal]:
+        """
+        执行一轮轮询：更新K线、计算新K线上的信号并输出
+
+        Returns:
+            List[MonitorSignal]: 本轮产生的信号
+        """
+        semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        updates = await asyncio.gather(*(self._update_symbol(code, semaphore)
+                                         for code in self.stock_codes))
+        # 股票代码 -> (开始推进的K线时间, 开始输出信号的K线时间)
+        pending = {code: update for code, update in zip(self.stock_codes, updates) if update is not None}
+        if not pending:
+            return []
+
+        signals = self._evaluate(pending)
+        for code in pending:
+            self.bars[code] = self.bars[code].iloc[-self.window:]
+        if signals:
+            for sink in self.sinks:
+                try:
+                    await sink.emit(signals)
+                except Exception as e:
+                    self.logger.error(f"信号输出失败 {type(sink).__name__}: {str(e)}")
+        return signals
+
+    async def _update_symbol(self, code: str, semaphore: asyncio.Semaphore
+                             ) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """
+        获取一只股票的新K线并追加到窗口
+
+        Returns:
+            Optional[Tuple[pd.Timestamp, pd.Timestamp]]: 开始推进策略的K线时间和开始输出信号的K线时间，
+                没有新K线时返回 None
+        """
+        existing = self.bars.get(code)
+        period = self.config.bootstrap_period if existing is None else self.config.poll_period
+        try:
+            async with semaphore:
+                data = await asyncio.to_thread(self.bar_source, code, period, self.interval)
+        except Exception as e:
+            self.logger.error(f"获取 {code} K线失败: {str(e)}")
+            return None
+        if data is None or data.empty:
+            return None
+
+        data = data[OHLCV_COLUMNS]
+        if existing is None:
+            # 启动时在全部历史K线上推进策略状态，只输出最新一根K线上的信号
+            self.bars[code] = data
+            return data.index[0], data.index[-1]
+        new = data[data.index > existing.index[-1]]
+        if new.empty:
+            return None
+        self.bars[code] = pd.concat([existing, new])
+        return new.index[0], new.index[0]
+
+    def _evaluate(self, pending: Dict[str, Tuple[pd.Timestamp, pd.Timestamp]]) -> List[MonitorSignal]:
+        """在有新K线的股票上向量化推进各策略，只保留新K线上的信号"""
+        codes = list(pending)
+        if self.lookback is None:
+            index = self.bars[codes[0]].index
+            self.lookback = max(s.warmup_bars(index) for s in self.strategies)
+            self.window = max(self.window, self.lookback)
+        stock_datas = []
+        for code in codes:
+            bars = self.bars[code]
+            # 开始推进的K线之前只保留指标所需的预热K线
+            first = bars.index.searchsorted(pending[code][0])
+            stock_datas.append(StockData(code=code, name=code, data=bars.iloc[max(first - self.lookback, 0):],
+                                         last_update=datetime.now()))
+        panel = DataProcessor.build_panel(stock_datas)
+        # 每只股票开始推进和开始输出信号的行
+        index = np.asarray(panel.index, dtype='datetime64[ns]')
+        starts, first_new = (np.searchsorted(index, np.asarray([pending[code][k] for code in codes],
+                                                               dtype='datetime64[ns]'))
+                             for k in (0, 1))
+
+        signals = []
+        for strategy in self.strategies:
+            try:
+                prepared = strategy.prepare(panel)
+                stream = getattr(strategy, 'stream_signal_frame', None)
+                if stream is not None:
+                    states = self.states.setdefault(strategy.name, {})
+                    frame, advanced = stream(prepared, starts, [states.get(code) for code in codes])
+                    states.update(zip(codes, advanced))
+                    rows = panel.index.get_indexer(frame['date'])
+                    cols = pd.Index(panel.codes).get_indexer(frame['code'])
+                    frame = frame[rows >= first_new[cols]]
+                    signals.extend(
+                        MonitorSignal(strategy=strategy.name, code=row.code, date=row.date,
+                                      action=row.action, price=float(row.price),
+                                      signal_type=row.signal_type, volume=float(row.volume))
+                        for row in frame.itertuples(index=False)
+                    )
+                else:
+                    values = strategy.generate_signals(prepared)
+                    values[np.arange(len(index))[:, None] < first_new[None, :]] = 0
+                    close = prepared.fields['Close']
+                    for i, j in zip(*np.nonzero(values)):
+                        signals.append(MonitorSignal(
+                            strategy=strategy.name, code=codes[j], date=panel.index[i],
+                            action='BUY' if values[i, j] == ENTRY else 'SELL',
+                            price=float(close[i, j])))
+            except Exception as e:
+                self.logger.error(f"策略 {strategy.name} 计算信号出错: {str(e)}")
+                continue
+        signals.sort(key=lambda s: (pd.Timestamp(s.date), s.code, s.strategy))
+        return signals
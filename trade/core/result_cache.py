@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import platform
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..config.settings import Settings
+from ..models.entities import StockData
+from ..utils.logger import Logger
+from .backtest_engine import ENGINE_VERSION, BacktestEngine
+from .fill_models import FillModel, build_fill_model
+from .ledger import EquityLedger, TradeLog
+
+_MANIFEST = 'manifest.json'
+_METRICS = 'metrics.json'
+
+
+def data_fingerprint(data: pd.DataFrame) -> str:
+    """
+    K线数据指纹：对时间索引和OHLCV数值做哈希
+
+    新增或修改任意一根K线都会改变指纹，依赖它的缓存结果自动失效。
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    index = data.index
+    if isinstance(index, pd.DatetimeIndex):
+        digest.update(np.asarray(index, dtype='datetime64[ns]').view(np.int64).tobytes())
+    else:
+        digest.update(np.asarray(index).tobytes())
+    for column in ('Open', 'High', 'Low', 'Close', 'Volume'):
+        if column in data:
+            digest.update(np.ascontiguousarray(data[column].to_numpy(dtype=float)).tobytes())
+    return digest.hexdigest()
+
+
+def strategy_spec(strategy) -> dict:
+    """策略类名及参数"""
+    return {
+        'class': f"{type(strategy).__module__}.{type(strategy).__qualname__}",
+        'params': getattr(strategy, 'params', {}),
+    }
+
+
+def _hash(payload: dict) -> str:
+    text = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+
+def _to_jsonable(value):
+    if isinstance(value, (np.floating, np.integer)):
+        return value.item()
+    return value
+
+
+class BacktestResultCache:
+    """
+    回测结果缓存
+
+    以 (数据指纹, 策略类及参数, 引擎版本, 费用、风险与成交模型) 为键保存回测结果，
+    每个结果目录包含组合价值记录、成交日志、指标和记录了生成方式的复现清单。
+    同一股票和策略有新K线时，新结果写入后旧结果被清理。
+    """
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.logger = Logger()
+        self.cache_dir = Path(cache_dir or Settings.DATA.backtest_cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def run(self, stock_data: StockData, strategy,
+            engine: Optional[BacktestEngine] = None,
+            fill_model: Optional[FillModel] = None,
+            refresh: bool = False) -> dict:
+        """
+        返回缓存的回测结果，不存在时执行事件驱动回测并写入缓存
+
+        命中缓存时引擎的组合价值记录和成交日志同样被恢复，可继续调用 tearsheet/export。
+
+        Args:
+            stock_data: 股票数据
+            strategy: 交易策略对象
+            engine: 回测引擎，为空时新建
+            fill_model: 成交模型，为空时按配置构建
+            refresh: 是否忽略已有缓存强制重跑
+
+        Returns:
+            dict: 回测结果指标
+        """
+        engine = engine or BacktestEngine()
+        fill_model = fill_model or build_fill_model()
+        lineage = {
+            'code': stock_data.code,
+            'strategy': strategy_spec(strategy),
+            'engine_version': ENGINE_VERSION,
+            'initial_capital': engine.initial_capital,
+            'fee_model': engine.fee_model.describe(),
+            'risk_model': engine.risk.describe(),
+            'fill_model': fill_model.describe(),
+        }
+        fingerprint = data_fingerprint(stock_data.data)
+        lineage_key = _hash(lineage)
+        key = _hash({**lineage, 'data': fingerprint})
+        # 同一股票、策略、引擎和费用配置的结果放在同一目录下，便于数据更新时清理
+        entry = self.cache_dir / lineage_key / key
+
+        if not refresh and (entry / _MANIFEST).exists():
+            self.logger.info(f"命中回测缓存: {stock_data.code} ({key})")
+            return self._load(entry, engine)
+
+        metrics = engine.run_event_backtest(stock_data, strategy, fill_model=fill_model)
+        manifest = {
+            'key': key,
+            'lineage': lineage_key,
+            **lineage,
+            'data': {
+                'fingerprint': fingerprint,
+                'bars': len(stock_data.data),
+                'start': str(stock_data.data.index[0]) if len(stock_data.data) else None,
+                'end': str(stock_data.data.index[-1]) if len(stock_data.data) else None,
+            },
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'environment': {
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+            },
+        }
+        self._store(entry, engine, metrics, manifest)
+        self._evict_stale(entry)
+        return metrics
+
+    def run_many(self, stock_data: StockData, strategies: Iterable,
+                 fill_model: Optional[FillModel] = None) -> List[dict]:
+        """
+        依次回测多组策略参数，已完成的组合直接读取缓存，中断后重跑即从断点继续
+
+        Returns:
+            List[dict]: 与 strategies 顺序一致的回测结果指标
+        """
+        results = []
+        for strategy in strategies:
+            metrics = self.run(stock_data, strategy, fill_model=fill_model)
+            metrics.pop('trades', None)
+            results.append(metrics)
+        return results
+
+    def manifests(self) -> List[dict]:
+        """列出所有缓存结果的复现清单"""
+        manifests = []
+        for path in sorted(self.cache_dir.glob(f'*/*/{_MANIFEST}')):
+            with open(path, encoding='utf-8') as f:
+                manifests.append(json.load(f))
+        return manifests
+
+    def _store(self, entry: Path, engine: BacktestEngine, metrics: dict, manifest: dict) -> None:
+        # 先写入临时目录再整体重命名，进程中断不会留下不完整的结果
+        tmp = entry.with_name(f"{entry.name}.tmp{os.getpid()}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        engine.export(tmp)
+        with open(tmp / _METRICS, 'w', encoding='utf-8') as f:
+            json.dump({k: _to_jsonable(v) for k, v in metrics.items() if k != 'trades'},
+                      f, ensure_ascii=False, indent=2)
+        with open(tmp / _MANIFEST, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, default=str)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+
+    def _load(self, entry: Path, engine: BacktestEngine) -> dict:
+        engine.portfolio_values = EquityLedger.load(entry / 'equity.npy')
+        engine.trades = TradeLog.load(entry / 'trades.npy')
+        with open(entry / _METRICS, encoding='utf-8') as f:
+            metrics = json.load(f)
+        metrics['trades'] = engine.trades.to_frame()
+        return metrics
+
+    def _evict_stale(self, entry: Path) -> None:
+        """删除同一股票、策略、引擎和费用配置下基于旧数据的结果"""
+        for other in entry.parent.iterdir():
+            if other != entry and other.is_dir() and '.tmp' not in other.name:
+                self.logger.info(f"数据已更新，清理过期回测缓存: {other.name}")
+                shutil.rmtree(other, ignore_errors=True)
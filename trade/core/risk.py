@@ -0,0 +1,286 @@
+"""
+仓位规模与组合风险
+
+所有计算都在 [K线数, 股票数] 的数组上进行，全部股票一次完成。
+策略给出的目标仓位（0~1，1 表示满仓）先乘以仓位规模方法给出的满仓权益比例得到敞口，
+再依次施加单只股票单位数、相关组单位数和总敞口限制。
+回测引擎和策略的实时信号都通过本模块计算仓位，两者的口径保持一致。
+"""
+from dataclasses import asdict
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..config.settings import RiskConfig, Settings
+from ..models.entities import MarketPanel, StockData
+from ..utils.data_processor import DataProcessor
+from .indicators import compute_indicators
+
+SIZING_METHODS = ('atr_unit', 'fixed_fractional', 'vol_target', 'full')
+
+
+def atr_unit_size(atr: np.ndarray, equity: float, unit_risk: float,
+                  dollar_per_point: float = 1.0) -> np.ndarray:
+    """
+    一个单位的持仓数量：价格波动一个N时的损益为权益的 unit_risk
+
+    Args:
+        atr: ATR（N），标量或数组
+        equity: 权益
+        unit_risk: 每单位风险比例
+        dollar_per_point: 每点价值
+
+    Returns:
+        np.ndarray: 与 atr 形状一致的持仓数量，ATR无效时为 NaN 或 inf
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return equity * unit_risk / (np.asarray(atr, dtype=float) * dollar_per_point)
+
+
+def atr_unit_weight(close: np.ndarray, atr: np.ndarray, unit_risk: float) -> np.ndarray:
+    """一个单位的持仓市值占权益的比例，即 atr_unit_size 的持仓数量乘以价格再除以权益"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return unit_risk * close / atr
+
+
+def _returns(close: np.ndarray) -> np.ndarray:
+    filled = pd.DataFrame(close).ffill().to_numpy()
+    result = np.full_like(filled, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[1:] = filled[1:] / filled[:-1] - 1
+    return result
+
+
+def volatility_target_weight(close: np.ndarray, target_volatility: float, window: int,
+                             periods_per_year: int = Settings.BACKTEST.periods_per_year) -> np.ndarray:
+    """
+    波动率目标仓位：年化波动率目标 / 最近 window 根K线的年化已实现波动率
+
+    Returns:
+        np.ndarray: 满仓时的权益比例，波动率未就绪时为 NaN
+    """
+    volatility = (pd.DataFrame(_returns(close)).rolling(window).std().to_numpy()
+                  * np.sqrt(periods_per_year))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return target_volatility / volatility
+
+
+def kelly_weight(close: np.ndarray, window: int, fraction: float) -> np.ndarray:
+    """
+    分数凯利仓位：fraction * 收益均值 / 收益方差，按最近 window 根K线估计，不做空
+
+    Returns:
+        np.ndarray: 仓位上限（权益比例），估计未就绪时为 NaN
+    """
+    rolling = pd.DataFrame(_returns(close)).rolling(window)
+    mean = rolling.mean().to_numpy()
+    var = rolling.var().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.maximum(fraction * mean / var, 0.0)
+
+
+def hold_at_changes(target: np.ndarray, values: np.ndarray,
+                    held: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> np.ndarray:
+    """
+    只在目标仓位变化的K线上取 values，其余K线沿用上次变化时的值
+
+    仓位规模在开仓或加减仓时确定，持仓期间不随ATR、波动率的变化反复调仓。
+    held 为上一段最后一根K线的 (目标仓位, 取值)，分块计算时首行据此判断是否变化。
+    """
+    if held is not None:
+        target = np.concatenate([held[0][None], target])
+        values = np.concatenate([held[1][None], values])
+    changed = np.ones(target.shape, dtype=bool)
+    changed[1:] = target[1:] != target[:-1]
+    steps = np.arange(len(target)).reshape((-1,) + (1,) * (target.ndim - 1))
+    last = np.maximum.accumulate(np.where(changed, steps, 0), axis=0)
+    result = np.take_along_axis(values, np.broadcast_to(last, target.shape), axis=0)
+    return result if held is None else result[1:]
+
+
+def group_ids(codes: Sequence[str], groups: Optional[dict] = None) -> np.ndarray:
+    """
+    每只股票所属相关组的编号
+
+    Args:
+        codes: 股票代码
+        groups: 股票代码到组名称的映射，未列出的股票各自为一组
+
+    Returns:
+        np.ndarray: [股票数] 的组编号
+    """
+    groups = groups or {}
+    labels = [groups.get(code, f"\0{i}") for i, code in enumerate(codes)]
+    return pd.factorize(pd.Index(labels))[0]
+
+
+def apply_limits(exposure: np.ndarray, units: np.ndarray, groups: np.ndarray,
+                 max_units_per_market: float, max_units_per_group: float,
+                 max_gross_exposure: float) -> np.ndarray:
+    """
+    施加组合层面的限制，超限时按比例缩减
+
+    Args:
+        exposure: [K线数, 股票数] 的敞口（权益比例）
+        units: 与 exposure 同形状的持有单位数
+        groups: [股票数] 的相关组编号
+        max_units_per_market: 单只股票的最大单位数
+        max_units_per_group: 同一相关组合计的最大单位数
+        max_gross_exposure: 总敞口上限
+
+    Returns:
+        np.ndarray: 限制后的敞口
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(units > max_units_per_market, max_units_per_market / units, 1.0)
+        units = units * scale
+        # 按组排序后分段求和得到每组的单位数，再把组的缩减比例按组编号取回每只股票
+        order = np.argsort(groups, kind='stable')
+        starts = np.flatnonzero(np.diff(groups[order], prepend=-1))
+        group_units = np.add.reduceat(units[:, order], starts, axis=1)
+        group_scale = np.where(group_units > max_units_per_group, max_units_per_group / group_units, 1.0)
+        exposure = exposure * scale * group_scale[:, np.searchsorted(groups[order][starts], groups)]
+        gross = np.abs(exposure).sum(axis=1, keepdims=True)
+        return exposure * np.where(gross > max_gross_exposure, max_gross_exposure / gross, 1.0)
+
+
+class RiskEngine:
+    """
+    仓位规模与组合风险引擎
+
+    按配置的方法计算每只股票满仓时的权益比例，与策略目标仓位相乘后施加组合限制：
+    - atr_unit: 每个单位价格波动一个N时损失权益的 unit_risk，满仓为策略的最大单位数
+    - fixed_fractional: 每只股票满仓时占权益的固定比例
+    - vol_target: 按年化波动率目标与已实现波动率之比缩放
+    - full: 满仓
+    启用 kelly_fraction 时，仓位另外不超过分数凯利比例。
+    """
+    def __init__(self, config: Optional[RiskConfig] = None, groups: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            config: 风险配置，默认 Settings.RISK
+            groups: 股票代码到相关组的映射，如 CorrelationService.correlated_groups() 的结果，
+                默认取配置中的 groups
+        """
+        self.config = config or Settings.RISK
+        self.groups = self.config.groups if groups is None else groups
+        if self.config.method not in SIZING_METHODS:
+            raise ValueError(f"未知的仓位规模方法: {self.config.method}，可选: {', '.join(SIZING_METHODS)}")
+
+    @property
+    def indicators(self) -> Tuple[str, ...]:
+        """仓位规模所需的指标"""
+        return (f"ATR_{self.config.atr_window}",) if self.config.method == 'atr_unit' else ()
+
+    @property
+    def lookback(self) -> int:
+        """分块计算时仓位规模所需的历史K线数（窗口加上计算收益率、TR所需的前一根）"""
+        config = self.config
+        windows = [config.atr_window if config.method == 'atr_unit' else 1]
+        if config.method == 'vol_target':
+            windows.append(config.volatility_window)
+        if config.kelly_fraction > 0:
+            windows.append(config.kelly_window)
+        return max(windows) + 1
+
+    def describe(self) -> dict:
+        """返回风险参数，用于结果缓存键和复现清单"""
+        return {'type': type(self).__name__, **asdict(self.config), 'groups': dict(self.groups)}
+
+    def position_weight(self, panel: MarketPanel, max_units: int = 1) -> np.ndarray:
+        """
+        每只股票满仓（目标仓位为1）时占权益的比例
+
+        Args:
+            panel: 已包含所需指标的面板数据
+            max_units: 策略满仓时的单位数
+
+        Returns:
+            np.ndarray: [K线数, 股票数] 的权益比例，无法估计时为 NaN
+        """
+        config = self.config
+        close = panel.fields['Close']
+        if config.method == 'atr_unit':
+            weight = max_units * atr_unit_weight(close, panel.fields[f"ATR_{config.atr_window}"],
+                                                 config.unit_risk)
+        elif config.method == 'fixed_fractional':
+            weight = np.full(close.shape, config.fraction)
+        elif config.method == 'vol_target':
+            weight = volatility_target_weight(close, config.target_volatility, config.volatility_window)
+        else:
+            weight = np.ones(close.shape)
+        if config.kelly_fraction > 0:
+            weight = np.fmin(weight, kelly_weight(close, config.kelly_window, config.kelly_fraction))
+        return weight
+
+    def size(self, panel: MarketPanel, target: np.ndarray, max_units: int = 1) -> np.ndarray:
+        """
+        将策略目标仓位换算为组合限制内的敞口
+
+        Args:
+            panel: 面板数据，缺少的指标会自动补齐
+            target: [K线数, 股票数] 的目标仓位，取值 0~1
+            max_units: 策略满仓时的单位数，目标仓位 * max_units 即持有单位数
+
+        Returns:
+            np.ndarray: [K线数, 股票数] 的敞口（持仓市值 / 权益）
+        """
+        panel = compute_indicators(panel, self.indicators)
+        weight = hold_at_changes(target, self.position_weight(panel, max_units))
+        return self._limit(panel.codes, target, weight, max_units)
+
+    def _limit(self, codes: Sequence[str], target: np.ndarray, weight: np.ndarray,
+               max_units: int) -> np.ndarray:
+        """目标仓位乘以满仓权益比例得到敞口，再施加组合限制"""
+        config = self.config
+        exposure = np.nan_to_num(target * weight, nan=0.0, posinf=0.0, neginf=0.0)
+        return apply_limits(exposure, target * max_units, group_ids(codes, self.groups),
+                            config.max_units_per_market, config.max_units_per_group,
+                            config.max_gross_exposure)
+
+    def size_frame(self, df: pd.DataFrame, target: np.ndarray, max_units: int = 1,
+                   code: str = '') -> np.ndarray:
+        """
+        单只股票的敞口序列，供逐行回测和事件驱动回测使用
+
+        Args:
+            df: 包含OHLCV的K线数据
+            target: 与K线等长的目标仓位
+            max_units: 策略满仓时的单位数
+            code: 股票代码，用于查找相关组
+
+        Returns:
+            np.ndarray: 与K线等长的敞口
+        """
+        return self.size(self._frame_panel(df, code), np.asarray(target, dtype=float)[:, None],
+                         max_units)[:, 0]
+
+    def size_chunk(self, df: pd.DataFrame, target: np.ndarray, max_units: int = 1,
+                   code: str = '', held: Optional[Tuple[np.ndarray, np.ndarray]] = None
+                   ) -> Tuple[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """
+        分块回测时单只股票的敞口序列，持仓期间的仓位规模跨块延续
+
+        Args:
+            df: 包含OHLCV的K线数据，开头多出 target 的行只用于预热指标
+            target: 本块的目标仓位，与 df 末尾的K线对齐
+            max_units: 策略满仓时的单位数
+            code: 股票代码，用于查找相关组
+            held: 上一块返回的 (目标仓位, 满仓权益比例)，首块为空
+
+        Returns:
+            Tuple[np.ndarray, tuple]: 本块的敞口和供下一块使用的 held
+        """
+        panel = compute_indicators(self._frame_panel(df, code), self.indicators)
+        target = np.asarray(target, dtype=float)[:, None]
+        weight = self.position_weight(panel, max_units)[len(df) - len(target):]
+        weight = hold_at_changes(target, weight, held)
+        exposure = self._limit(panel.codes, target, weight, max_units)[:, 0]
+        return exposure, ((target[-1], weight[-1]) if len(target) else held)
+
+    @staticmethod
+    def _frame_panel(df: pd.DataFrame, code: str) -> MarketPanel:
+        return DataProcessor.build_panel([StockData(code=code, name=code, data=df,
+                                                    last_update=datetime.now())])
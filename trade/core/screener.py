@@ -0,0 +1,322 @@
+"""
+全市场选股器
+
+选股表达式为 Python 表达式的安全子集，解析时按白名单校验：
+- 字段：Open/High/Low/Close/Volume 以及指标名，如 SMA_20、HIGH_20、VOLMA_20、RSI_14
+- 运算：+ - * /、比较（可连写）、and / or / not、括号
+- 函数：prev(x, n=1) 取 n 根K线之前的值；rank(x) 截面百分位排名；zscore(x) 截面标准分；
+  abs(x)、min(a, b)、max(a, b)
+
+示例：
+    Close > prev(HIGH_20)                 今日收盘突破此前20日高点
+    Volume > 2 * prev(VOLMA_20)           放量
+    rank(ROC_20) > 0.9 and RSI_14 < 80    20日涨幅位于全市场前10%
+"""
+import ast
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Union
+
+import numpy as np
+import pandas as pd
+
+from ..config.settings import Settings
+from ..models.entities import MarketPanel, StockData
+from ..utils.data_processor import OHLCV_COLUMNS, DataProcessor
+from ..utils.logger import Logger
+from .indicators import available_indicators, compute_indicators
+
+_COMPARE = {
+    ast.Gt: np.greater, ast.GtE: np.greater_equal,
+    ast.Lt: np.less, ast.LtE: np.less_equal,
+    ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+_BINARY = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.true_divide}
+
+
+def _rank(values: np.ndarray) -> np.ndarray:
+    """截面百分位排名，取值 (0, 1]，NaN 不参与排名"""
+    result = np.full(values.shape, np.nan)
+    valid = np.isfinite(values)
+    if valid.any():
+        result[valid] = pd.Series(values[valid]).rank(pct=True).to_numpy()
+    return result
+
+
+def _zscore(values: np.ndarray) -> np.ndarray:
+    """截面标准分"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (values - np.nanmean(values)) / np.nanstd(values)
+
+
+_FUNCTIONS = {
+    'rank': _rank,
+    'zscore': _zscore,
+    'abs': np.abs,
+    'min': np.fmin,
+    'max': np.fmax,
+}
+
+
+class ScreenExpression:
+    """
+    解析后的选股表达式
+
+    evaluate 在 [K线数, 股票数] 的字段数组上按指定行求值，返回 [股票数] 的数组，
+    对全部股票一次性向量化计算。
+    """
+    def __init__(self, text: str):
+        self.text = text
+        try:
+            self._tree = ast.parse(text.strip(), mode='eval').body
+        except SyntaxError as e:
+            raise ValueError(f"选股表达式语法错误: {text}") from e
+        self.fields: Set[str] = set()
+        # 表达式用到的最早一根K线距离最新K线的行数
+        self.depth = 0
+        self._validate(self._tree, 0)
+
+    def _validate(self, node: ast.AST, offset: int) -> None:
+        if isinstance(node, ast.BoolOp):
+            for value in node.values:
+                self._validate(value, offset)
+        elif isinstance(node, ast.Compare):
+            if not all(type(op) in _COMPARE for op in node.ops):
+                raise ValueError(f"选股表达式不支持的比较运算: {self.text}")
+            for child in [node.left, *node.comparators]:
+                self._validate(child, offset)
+        elif isinstance(node, ast.BinOp):
+            if type(node.op) not in _BINARY:
+                raise ValueError(f"选股表达式不支持的运算符: {self.text}")
+            self._validate(node.left, offset)
+            self._validate(node.right, offset)
+        elif isinstance(node, ast.UnaryOp):
+            if not isinstance(node.op, (ast.Not, ast.USub, ast.UAdd)):
+                raise ValueError(f"选股表达式不支持的运算符: {self.text}")
+            self._validate(node.operand, offset)
+        elif isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+                raise ValueError(f"选股表达式只支持数值常量: {self.text}")
+        elif isinstance(node, ast.Name):
+            kind = node.id.split('_')[0]
+            if node.id not in OHLCV_COLUMNS and kind not in available_indicators():
+                raise ValueError(f"选股表达式中未知的字段: {node.id}")
+            self.fields.add(node.id)
+            self.depth = max(self.depth, offset)
+        elif isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.keywords:
+                raise ValueError(f"选股表达式不支持的函数调用: {self.text}")
+            name = node.func.id
+            if name == 'prev':
+                periods = self._prev_periods(node)
+                self._validate(node.args[0], offset + periods)
+            elif name in _FUNCTIONS:
+                for arg in node.args:
+                    self._validate(arg, offset)
+            else:
+                raise ValueError(f"选股表达式中未知的函数: {name}")
+        else:
+            raise ValueError(f"选股表达式不支持的语法 {type(node).__name__}: {self.text}")
+
+    def _prev_periods(self, node: ast.Call) -> int:
+        if not 1 <= len(node.args) <= 2:
+            raise ValueError(f"prev 需要1到2个参数: {self.text}")
+        if len(node.args) == 1:
+            return 1
+        periods = node.args[1]
+        if not isinstance(periods, ast.Constant) or not isinstance(periods.value, int) or periods.value < 0:
+            raise ValueError(f"prev 的K线数必须为非负整数: {self.text}")
+        return periods.value
+
+    def evaluate(self, fields: Dict[str, np.ndarray], row: int = -1) -> np.ndarray:
+        """
+        在指定行上求值
+
+        Args:
+            fields: 面板字段，须包含表达式用到的全部字段
+            row: 求值的行，默认最新一根K线
+
+        Returns:
+            np.ndarray: [股票数] 的结果数组
+        """
+        n_rows = len(next(iter(fields.values())))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self._eval(self._tree, fields, row % n_rows)
+
+    def _eval(self, node: ast.AST, fields: Dict[str, np.ndarray], row: int):
+        if isinstance(node, ast.BoolOp):
+            values = [np.asarray(self._eval(v, fields, row), dtype=bool) for v in node.values]
+            reduce = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return reduce.reduce(values)
+        if isinstance(node, ast.Compare):
+            left = self._eval(node.left, fields, row)
+            result = True
+            for op, comparator in zip(node.ops, node.comparators):
+                right = self._eval(comparator, fields, row)
+                result = result & _COMPARE[type(op)](left, right)
+                left = right
+            return result
+        if isinstance(node, ast.BinOp):
+            return _BINARY[type(node.op)](self._eval(node.left, fields, row),
+                                          self._eval(node.right, fields, row))
+        if isinstance(node, ast.UnaryOp):
+            operand = self._eval(node.operand, fields, row)
+            if isinstance(node.op, ast.Not):
+                return np.logical_not(np.asarray(operand, dtype=bool))
+            return -operand if isinstance(node.op, ast.USub) else operand
+        if isinstance(node, ast.Constant):
+            return float(node.value)
+        if isinstance(node, ast.Name):
+            values = fields[node.id]
+            if row < 0:
+                return np.full(values.shape[1], np.nan)
+            return values[row]
+        # 函数调用
+        name = node.func.id
+        if name == 'prev':
+            return self._eval(node.args[0], fields, row - self._prev_periods(node))
+        args = [self._eval(arg, fields, row) for arg in node.args]
+        if name in ('min', 'max'):
+            return _FUNCTIONS[name].reduce(np.broadcast_arrays(*args))
+        return _FUNCTIONS[name](*args)
+
+
+class Screener:
+    """
+    全市场选股器
+
+    refresh() 从本地Parquet K线库读取每只股票最近 history 根K线，按日期对齐为面板，
+    预先计算常用指标后保存为单个 .npz 快照；screen() 加载快照后对全部股票一次性
+    向量化求值筛选表达式，不需要逐只股票读取数据或运行策略分析。
+    """
+    def __init__(self, period: str = "max", interval: str = "1d",
+                 snapshot_dir: Optional[Path] = None):
+        self.logger = Logger()
+        self.period = period
+        self.interval = interval
+        self.config = Settings.SCREENER
+        self.snapshot_path = (Path(snapshot_dir or Settings.DATA.screener_dir)
+                              / f"snapshot_{period}_{interval}.npz")
+        self._panel: Optional[MarketPanel] = None
+
+    def universe(self) -> List[str]:
+        """本地K线库中对应周期和间隔的全部股票代码"""
+        suffix = f"_{self.period}_{self.interval}_data.parquet"
+        return sorted(path.name[:-len(suffix)]
+                      for path in Path(Settings.DATA.parquet_dir).glob(f"*{suffix}"))
+
+    def refresh(self, stock_codes: Optional[Iterable[str]] = None) -> MarketPanel:
+        """
+        从本地K线库重建快照
+
+        Args:
+            stock_codes: 股票代码列表，为空时使用本地K线库中的全部股票
+
+        Returns:
+            MarketPanel: 快照面板
+        """
+        codes = list(stock_codes) if stock_codes else self.universe()
+        history = self.config.history
+        stock_datas = []
+        for code in codes:
+            path = Path(Settings.DATA.parquet_dir) / f"{code}_{self.period}_{self.interval}_data.parquet"
+            try:
+                df = pd.read_parquet(path, columns=OHLCV_COLUMNS)
+                if df.empty:
+                    continue
+                if isinstance(df.index, pd.DatetimeIndex) and df.index.tz is not None:
+                    df.index = df.index.tz_localize(None)
+                stock_datas.append(StockData(code=code, name=code, data=df.iloc[-history:],
+                                             last_update=datetime.now()))
+            except Exception as e:
+                self.logger.error(f"Skipping {code} due to error: {str(e)}")
+                continue
+        if not stock_datas:
+            raise ValueError(f"本地K线库中没有可用于选股的 {self.period}/{self.interval} 数据")
+
+        panel = DataProcessor.build_panel(stock_datas)
+        # 各股票最后交易日不同时对齐后的行数会超过 history，只保留最近部分
+        if len(panel.index) > history:
+            panel = MarketPanel(codes=panel.codes, index=panel.index[-history:],
+                                fields={k: v[-history:] for k, v in panel.fields.items()})
+        panel = compute_indicators(panel, self.config.indicators)
+        self._save(panel)
+        self._panel = panel
+        self.logger.info(f"选股快照已更新: {len(panel.codes)} 只股票, 最新日期 {panel.index[-1]}")
+        return panel
+
+    def load(self) -> MarketPanel:
+        """加载快照"""
+        if self._panel is None:
+            if not self.snapshot_path.exists():
+                raise FileNotFoundError(f"选股快照不存在，请先刷新: {self.snapshot_path}")
+            with np.load(self.snapshot_path, allow_pickle=False) as archive:
+                fields = {key[2:]: archive[key] for key in archive.files if key.startswith('f_')}
+                self._panel = MarketPanel(
+                    codes=archive['codes'].tolist(),
+                    index=pd.DatetimeIndex(archive['index'].astype('datetime64[ns]')),
+                    fields=fields,
+                )
+        return self._panel
+
+    def screen(self, filters: Union[str, Iterable[str]], rank_by: Optional[str] = None,
+               ascending: bool = False, top: Optional[int] = None,
+               panel: Optional[MarketPanel] = None) -> pd.DataFrame:
+        """
+        在最新一根K线上筛选全市场股票
+
+        Args:
+            filters: 一个或多个筛选表达式，同时满足才入选
+            rank_by: 排序表达式，结果按其取值排序并输出为 score 列
+            ascending: 是否升序排序
+            top: 返回的股票数，默认取配置
+            panel: 自定义面板，为空时使用快照
+
+        Returns:
+            pd.DataFrame: 入选股票，包含 code/date/Close、表达式用到的字段以及 score 列
+        """
+        try:
+            expressions = [ScreenExpression(f) for f in ([filters] if isinstance(filters, str) else filters)]
+            score = ScreenExpression(rank_by) if rank_by else None
+            names = set().union(*(e.fields for e in expressions + ([score] if score else [])))
+
+            panel = compute_indicators(panel if panel is not None else self.load(), names)
+            fields = panel.fields
+            depth = max([e.depth for e in expressions] + [score.depth if score else 0])
+            if depth >= len(panel.index):
+                raise ValueError(f"快照只有 {len(panel.index)} 根K线，不足以计算 {depth} 根之前的值")
+
+            # 最新一根K线停牌的股票不参与筛选
+            mask = np.isfinite(fields['Close'][-1])
+            for expression in expressions:
+                mask &= np.asarray(expression.evaluate(fields), dtype=bool)
+            cols = np.flatnonzero(mask)
+
+            result = pd.DataFrame({
+                'code': np.asarray(panel.codes, dtype=object)[cols],
+                'date': panel.index[-1],
+                'Close': fields['Close'][-1, cols],
+            })
+            for name in sorted(names - {'Close'}):
+                result[name] = fields[name][-1, cols]
+            if score is not None:
+                result['score'] = np.broadcast_to(score.evaluate(fields), mask.shape)[cols]
+                result = result.sort_values('score', ascending=ascending, na_position='last',
+                                            kind='stable')
+            return result.head(top or self.config.top).reset_index(drop=True)
+
+        except Exception as e:
+            self.logger.error(f"选股过程出错: {str(e)}")
+            raise
+
+    def _save(self, panel: MarketPanel) -> None:
+        """原子写入快照，避免读取到写了一半的文件"""
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.snapshot_path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f,
+                     codes=np.asarray(panel.codes, dtype=str),
+                     index=np.asarray(panel.index, dtype='datetime64[ns]'),
+                     **{f"f_{name}": values for name, values in panel.fields.items()})
+        os.replace(tmp_path, self.snapshot_path)
@@ -0,0 +1,17 @@
+from .base import (ENTRY, EXIT, BaseStrategy, available_strategies, create_strategy,
+                   positions_from_signals, register_strategy)
+from .builtin import (BollingerBreakoutStrategy, DualMovingAverageStrategy, MACDCrossStrategy,
+                      RSIMeanReversionStrategy)
+from .turtle_system import (ACTION_ADD, ACTION_ENTRY, ACTION_EXIT, ACTION_STOP,
+                            MultiTimeframeTurtleStrategy, TurtleKernelResult, TurtleSystem1Strategy,
+                            TurtleSystem2Strategy, TurtleSystemStrategy, turtle_kernel)
+
+__all__ = [
+    'ENTRY', 'EXIT', 'BaseStrategy', 'available_strategies', 'create_strategy',
+    'positions_from_signals', 'register_strategy',
+    'BollingerBreakoutStrategy', 'DualMovingAverageStrategy', 'MACDCrossStrategy',
+    'RSIMeanReversionStrategy',
+    'ACTION_ADD', 'ACTION_ENTRY', 'ACTION_EXIT', 'ACTION_STOP', 'MultiTimeframeTurtleStrategy',
+    'TurtleKernelResult',
+    'TurtleSystem1Strategy', 'TurtleSystem2Strategy', 'TurtleSystemStrategy', 'turtle_kernel',
+]
@@ -0,0 +1,280 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Tuple, Type
+
+import numpy as np
+import pandas as pd
+
+from ...config.settings import Settings
+from ...models.entities import MarketPanel, StockData, TradeSignal
+from ...utils.data_processor import DataProcessor
+from ...utils.logger import Logger
+from ..indicators import compute_indicators
+from ..risk import atr_unit_size
+from ..timeframe import bars_per_period, split_timeframe, timeframe_days
+
+# 信号编码
+ENTRY = 1
+EXIT = -1
+
+_REGISTRY: Dict[str, Type['BaseStrategy']] = {}
+
+
+def register_strategy(cls: Type['BaseStrategy']) -> Type['BaseStrategy']:
+    """策略注册装饰器，按类属性 name 注册"""
+    _REGISTRY[cls.name] = cls
+    return cls
+
+
+def positions_from_signals(signals: np.ndarray) -> np.ndarray:
+    """
+    将信号数组转换为持仓状态（1 持仓 / 0 空仓）
+
+    入场信号后保持持仓直到出场信号，与回测中"空仓才入场、持仓才出场"的规则一致。
+    """
+    state = np.where(signals == ENTRY, 1.0, np.where(signals == EXIT, 0.0, np.nan))
+    # 沿时间轴前向填充最近一次信号的状态
+    steps = np.arange(len(state)).reshape((-1,) + (1,) * (state.ndim - 1))
+    last = np.maximum.accumulate(np.where(np.isnan(state), 0, steps), axis=0)
+    filled = np.take_along_axis(state, np.broadcast_to(last, state.shape), axis=0)
+    return np.nan_to_num(filled, nan=0.0)
+
+
+def _load_builtin_strategies() -> None:
+    # 延迟导入内置策略模块，避免与 turtle_strategy 循环引用
+    from . import builtin, turtle_system  # noqa: F401
+    from .. import turtle_strategy  # noqa: F401
+
+
+def available_strategies() -> List[str]:
+    """已注册的策略名称"""
+    _load_builtin_strategies()
+    return sorted(_REGISTRY)
+
+
+def create_strategy(name: str, **params) -> 'BaseStrategy':
+    """
+    按名称创建策略实例
+
+    Args:
+        name: 注册的策略名称
+        **params: 覆盖默认值的策略参数
+
+    Returns:
+        BaseStrategy: 策略实例
+    """
+    _load_builtin_strategies()
+    if name not in _REGISTRY:
+        raise ValueError(f"未知的策略: {name}，可选: {', '.join(sorted(_REGISTRY))}")
+    return _REGISTRY[name](**params)
+
+
+class BaseStrategy(ABC):
+    """
+    策略基类
+
+    子类声明 default_params 和所需指标，并实现向量化的 generate_signals(panel)，
+    返回形状为 [K线数, 股票数] 的 int8 信号数组：ENTRY(1) 入场、EXIT(-1) 出场、0 无信号。
+    回测引擎可以先计算所有策略所需指标的并集，再让多个策略共享同一份面板数据。
+    指标名称可带周期前缀（如 'W:SMA_10'），由基础周期聚合并按收盘可用时间对齐。
+    """
+    name: str = ''
+    description: str = ''
+    default_params: dict = {}
+
+    def __init__(self, **params):
+        unknown = set(params) - set(self.default_params)
+        if unknown:
+            raise ValueError(f"策略 {self.name} 不支持参数: {', '.join(sorted(unknown))}")
+        self.logger = Logger()
+        self.data_processor = DataProcessor()
+        self.params = {**self.default_params, **params}
+
+    @property
+    @abstractmethod
+    def indicators(self) -> Tuple[str, ...]:
+        """策略所需的指标名称，如 ('SMA_5', 'SMA_20')"""
+        pass
+
+    @abstractmethod
+    def generate_signals(self, panel: MarketPanel) -> np.ndarray:
+        """
+        在已包含所需指标的面板上生成信号
+
+        Returns:
+            np.ndarray: [K线数, 股票数] 的 int8 信号数组
+        """
+        pass
+
+    @property
+    def timeframes(self) -> Tuple[str, ...]:
+        """策略使用的高周期，由指标名称的周期前缀（如 'W:SMA_10' 中的 'W'）声明"""
+        return tuple(sorted({split_timeframe(name)[0] for name in self.indicators} - {''}))
+
+    @property
+    def max_units(self) -> int:
+        """满仓时的单位数，目标仓位 * max_units 即持有单位数，分批建仓的策略可重写"""
+        return 1
+
+    @property
+    def lookback(self) -> int:
+        """
+        分块计算时需要保留的历史K线数（以日线为基础周期估算）
+
+        取所需指标的最长窗口，EMA类指标按4倍跨度近似其收敛长度，
+        高周期指标按每周期的交易日数折算。日内基础周期请使用 warmup_bars。
+        """
+        return self._lookback(timeframe_days)
+
+    def warmup_bars(self, index: pd.DatetimeIndex) -> int:
+        """
+        按基础K线的实际间隔换算的预热K线数
+
+        高周期指标的窗口按每个周期包含的基础K线数（由 index 推算）折算，
+        如以30分钟线为基础周期时，周线指标的每个周期折算为一周的30分钟K线数。
+
+        Args:
+            index: 基础周期的K线时间，取一段有代表性的数据（如第一块）即可
+
+        Returns:
+            int: 预热K线数，不少于 lookback
+        """
+        return max(self.lookback, self._lookback(lambda rule: bars_per_period(rule, index)))
+
+    def _lookback(self, period_bars) -> int:
+        """period_bars(rule) 为一个高周期折算的基础K线数"""
+        lookback = 1
+        for name in self.indicators:
+            rule, base = split_timeframe(name)
+            kind, *args = base.split('_')
+            windows = [int(a) for a in args] or [1]
+            scale = 4 if kind in ('EMA', 'MACD', 'MACDSIG') else 1
+            span = sum(windows) * scale if kind == 'MACDSIG' else max(windows) * scale
+            if rule:
+                # 预热数据开头的高周期K线可能不完整，多保留一个周期
+                span = (span + 1) * period_bars(rule)
+            lookback = max(lookback, span)
+        return lookback + 1
+
+    def prepare(self, panel: MarketPanel) -> MarketPanel:
+        """补齐策略所需的指标"""
+        return compute_indicators(panel, self.indicators)
+
+    def target_positions(self, panel: MarketPanel) -> np.ndarray:
+        """
+        目标仓位占比，取值 0~1，默认由信号推导为满仓/空仓；分批建仓的策略可重写
+
+        Returns:
+            np.ndarray: [K线数, 股票数] 的目标仓位数组
+        """
+        return positions_from_signals(self.generate_signals(panel))
+
+    def position_targets(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        单只股票的目标仓位序列，供逐行回测和事件驱动回测使用
+
+        Args:
+            df: 包含OHLCV的K线数据
+
+        Returns:
+            np.ndarray: 与K线等长的目标仓位数组
+        """
+        return self.target_positions(self.prepare(self._single_panel(df)))[:, 0]
+
+    def stream_targets(self, df: pd.DataFrame, start: int = 0,
+                       state=None) -> Tuple[np.ndarray, object]:
+        """
+        分块回测时单只股票的目标仓位，策略状态跨块延续，结果与整段计算一致
+
+        Args:
+            df: 包含OHLCV的K线数据，开头 start 行为上一块末尾的预热数据
+            start: 本块第一根K线在 df 中的位置
+            state: 上一块返回的策略状态，首块为空
+
+        Returns:
+            Tuple[np.ndarray, object]: 本块的目标仓位和供下一块使用的策略状态
+        """
+        signals = self.generate_signals(self.prepare(self._single_panel(df)))[start:, 0]
+        # 以上一块末尾的仓位作为起点，本块第一个信号之前沿用该仓位
+        seed = ENTRY if state else EXIT
+        targets = positions_from_signals(np.concatenate([[seed], signals]))[1:]
+        return targets, (targets[-1] if len(targets) else state)
+
+    def analyze(self, stock_data: StockData) -> List[TradeSignal]:
+        """
+        分析股票数据并生成交易信号
+
+        Args:
+            stock_data: 包含OHLCV数据的股票数据对象
+
+        Returns:
+            List[TradeSignal]: 交易信号列表
+        """
+        try:
+            panel = self.prepare(self._single_panel(stock_data.data))
+            signals = self.generate_signals(panel)[:, 0]
+            rows = np.flatnonzero(signals != 0)
+            atr = compute_indicators(panel, ['ATR_20']).fields['ATR_20'][rows, 0]
+            volumes = self._position_size(atr)
+            close = panel.fields['Close'][rows, 0]
+            return [
+                TradeSignal(
+                    code=stock_data.code,
+                    date=panel.index[i].date(),
+                    action="BUY" if signals[i] == ENTRY else "SELL",
+                    price=price,
+                    volume=volume,
+                    reason=self._signal_reason(panel, i, signals[i] == ENTRY)
+                )
+                for i, price, volume in zip(rows, close, volumes)
+            ]
+
+        except Exception as e:
+            self.logger.error(f"{self.name} 策略分析过程出错: {str(e)}")
+            raise
+
+    def _signal_reason(self, panel: MarketPanel, row: int, is_entry: bool) -> str:
+        """信号原因描述，子类可重写"""
+        params = ", ".join(f"{k}={v}" for k, v in self.params.items())
+        return f"{self.description or self.name}({params}) {'入场' if is_entry else '出场'}信号"
+
+    @staticmethod
+    def _position_size(atr: np.ndarray) -> np.ndarray:
+        """基于ATR的仓位大小，与海龟策略的口径一致"""
+        config = Settings.TURTLE
+        return atr_unit_size(atr, config.total_risk_capital, config.risk_percentage,
+                             config.dollar_per_point)
+
+    @staticmethod
+    def _single_panel(df: pd.DataFrame) -> MarketPanel:
+        return DataProcessor.build_panel([StockData(code='', name='', data=df,
+                                                    last_update=datetime.now())])
+
+    @staticmethod
+    def crossed_above(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """a 在本根K线上穿 b"""
+        result = np.zeros(a.shape, dtype=bool)
+        result[1:] = (a[1:] > b[1:]) & (a[:-1] <= b[:-1])
+        return result
+
+    @staticmethod
+    def crossed_below(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """a 在本根K线下穿 b"""
+        result = np.zeros(a.shape, dtype=bool)
+        result[1:] = (a[1:] < b[1:]) & (a[:-1] >= b[:-1])
+        return result
+
+    @staticmethod
+    def combine(entries: np.ndarray, exits: np.ndarray) -> np.ndarray:
+        """合并入场/出场布尔数组为信号数组，同时出现时以出场为准"""
+        signals = np.zeros(entries.shape, dtype=np.int8)
+        signals[entries] = ENTRY
+        signals[exits] = EXIT
+        return signals
+
+    @staticmethod
+    def shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+        """沿时间轴后移，空出的位置为 NaN"""
+        result = np.full(values.shape, np.nan)
+        result[periods:] = values[:-periods]
+        return result
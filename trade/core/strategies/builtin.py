@@ -0,0 +1,75 @@
+from typing import Tuple
+
+import numpy as np
+
+from ...models.entities import MarketPanel
+from .base import BaseStrategy, register_strategy
+
+
+@register_strategy
+class DualMovingAverageStrategy(BaseStrategy):
+    """双均线策略：快线上穿慢线入场，下穿出场"""
+    name = 'dual_ma'
+    description = '双均线交叉'
+    default_params = {'fast': 5, 'slow': 20}
+
+    @property
+    def indicators(self) -> Tuple[str, ...]:
+        return (f"SMA_{self.params['fast']}", f"SMA_{self.params['slow']}")
+
+    def generate_signals(self, panel: MarketPanel) -> np.ndarray:
+        fast = panel.fields[f"SMA_{self.params['fast']}"]
+        slow = panel.fields[f"SMA_{self.params['slow']}"]
+        return self.combine(self.crossed_above(fast, slow), self.crossed_below(fast, slow))
+
+
+@register_strategy
+class MACDCrossStrategy(BaseStrategy):
+    """MACD策略：MACD线上穿信号线入场，下穿出场"""
+    name = 'macd'
+    description = 'MACD交叉'
+    default_params = {'fast': 12, 'slow': 26, 'signal': 9}
+
+    @property
+    def indicators(self) -> Tuple[str, ...]:
+        p = self.params
+        return (f"MACD_{p['fast']}_{p['slow']}", f"MACDSIG_{p['fast']}_{p['slow']}_{p['signal']}")
+
+    def generate_signals(self, panel: MarketPanel) -> np.ndarray:
+        macd_name, signal_name = self.indicators
+        macd, signal = panel.fields[macd_name], panel.fields[signal_name]
+        return self.combine(self.crossed_above(macd, signal), self.crossed_below(macd, signal))
+
+
+@register_strategy
+class RSIMeanReversionStrategy(BaseStrategy):
+    """RSI均值回归策略：RSI低于超卖线入场，高于超买线出场"""
+    name = 'rsi'
+    description = 'RSI均值回归'
+    default_params = {'window': 14, 'oversold': 30, 'overbought': 70}
+
+    @property
+    def indicators(self) -> Tuple[str, ...]:
+        return (f"RSI_{self.params['window']}",)
+
+    def generate_signals(self, panel: MarketPanel) -> np.ndarray:
+        rsi = panel.fields[self.indicators[0]]
+        return self.combine(rsi < self.params['oversold'], rsi > self.params['overbought'])
+
+
+@register_strategy
+class BollingerBreakoutStrategy(BaseStrategy):
+    """布林带突破策略：收盘价突破上轨入场，跌破中轨出场"""
+    name = 'bollinger'
+    description = '布林带突破'
+    default_params = {'window': 20, 'width': 2}
+
+    @property
+    def indicators(self) -> Tuple[str, ...]:
+        return (f"SMA_{self.params['window']}", f"STD_{self.params['window']}")
+
+    def generate_signals(self, panel: MarketPanel) -> np.ndarray:
+        middle = panel.fields[f"SMA_{self.params['window']}"]
+        upper = middle + self.params['width'] * panel.fields[f"STD_{self.params['window']}"]
+        close = panel.fields['Close']
+        return self.combine(close > upper, close < middle)
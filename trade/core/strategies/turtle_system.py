@@ -0,0 +1,419 @@
+from dataclasses import dataclass, fields, replace
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ...models.entities import MarketPanel, StockData, TradeSignal
+from ..timeframe import TIMEFRAME_SEP, split_timeframe
+from .base import ENTRY, EXIT, BaseStrategy, register_strategy
+
+# 海龟内核的动作编码
+ACTION_ENTRY = 1
+ACTION_ADD = 2
+ACTION_EXIT = -1
+ACTION_STOP = -2
+
+_ACTION_TYPES = {ACTION_ENTRY: 'entry', ACTION_ADD: 'add', ACTION_EXIT: 'exit', ACTION_STOP: 'stop'}
+
+
+@dataclass
+class TurtleKernelResult:
+    """海龟内核的逐K线输出，数组形状均为 [K线数, 股票数]，状态为当根K线收盘后的值"""
+    action: np.ndarray      # int8 动作编码，0 表示无动作
+    units: np.ndarray       # 持有单位数
+    shares: np.ndarray      # 持仓数量
+    unit_size: np.ndarray   # 当根K线的单位大小
+    stop: np.ndarray        # 止损价，无持仓为 NaN
+    last_entry: np.ndarray  # 最近一次入场/加仓价格，无持仓为 NaN
+    state: Optional['TurtleKernelState'] = None  # 最后一根K线收盘后的内核状态
+
+    def signals(self) -> np.ndarray:
+        """首个单位入场为 ENTRY，平仓（离场或止损）为 EXIT，加仓不产生信号"""
+        signals = np.zeros(self.action.shape, dtype=np.int8)
+        signals[self.action == ACTION_ENTRY] = ENTRY
+        signals[self.action < 0] = EXIT
+        return signals
+
+
+@dataclass
+class TurtleKernelState:
+    """海龟内核在两根K线之间的状态，数组形状均为 [股票数]，分块推进时跨块延续"""
+    units: np.ndarray        # 持有单位数
+    shares: np.ndarray       # 持仓数量
+    stop: np.ndarray         # 止损价，无持仓为 NaN
+    last_entry: np.ndarray   # 最近一次入场/加仓价格，无持仓为 NaN
+    entry_n: np.ndarray      # 首个单位入场时的N
+    hyp_active: np.ndarray   # 系统一过滤规则的假想交易是否持有
+    hyp_entry: np.ndarray    # 假想交易的入场价
+    hyp_stop: np.ndarray     # 假想交易的止损价
+    last_winner: np.ndarray  # 上一次突破是否为盈利交易
+
+    @classmethod
+    def flat(cls, n_codes: int) -> 'TurtleKernelState':
+        """全部股票空仓的初始状态"""
+        return cls(units=np.zeros(n_codes, dtype=np.int16), shares=np.zeros(n_codes),
+                   stop=np.full(n_codes, np.nan), last_entry=np.full(n_codes, np.nan),
+                   entry_n=np.full(n_codes, np.nan), hyp_active=np.zeros(n_codes, dtype=bool),
+                   hyp_entry=np.full(n_codes, np.nan), hyp_stop=np.full(n_codes, np.nan),
+                   last_winner=np.zeros(n_codes, dtype=bool))
+
+    @classmethod
+    def stack(cls, states: Sequence[Optional['TurtleKernelState']]) -> 'TurtleKernelState':
+        """按股票顺序拼接多个状态，空状态视为空仓"""
+        states = [state or cls.flat(1) for state in states]
+        return cls(**{f.name: np.concatenate([getattr(state, f.name) for state in states])
+                      for f in fields(cls)})
+
+    def take(self, column: int) -> 'TurtleKernelState':
+        """单只股票的状态"""
+        return type(self)(**{f.name: getattr(self, f.name)[column:column + 1] for f in fields(self)})
+
+
+def turtle_kernel(close: np.ndarray, atr: np.ndarray, entry_high: np.ndarray,
+                  exit_low: np.ndarray, unit_size: np.ndarray,
+                  failsafe_high: Optional[np.ndarray] = None,
+                  max_units: int = 4, pyramid_n: float = 0.5, stop_n: float = 2.0,
+                  skip_after_winner: bool = False,
+                  state: Optional[TurtleKernelState] = None) -> TurtleKernelResult:
+    """
+    海龟交易规则的状态机内核
+
+    按时间逐根推进，每一步对全部股票向量化处理，单位数、止损价和最近入场价
+    都以 [股票数] 的数组保存，数百只股票的回测耗时只与K线数成正比。
+    规则均以收盘价判断：
+    - 入场：空仓且收盘价突破 entry_high
+    - 加仓：收盘价较最近一次入场价上涨 pyramid_n 个N（N取首个单位入场时的ATR），至多 max_units 个单位
+    - 止损：收盘价跌破 最近入场价 - stop_n * N，加仓后全部单位的止损随之上移
+    - 离场：收盘价跌破 exit_low
+    - 过滤（系统一）：上一次突破（无论是否实际入场）若为盈利交易则跳过本次突破，
+      收盘价突破 failsafe_high 时不受过滤
+
+    Args:
+        close: 收盘价
+        atr: 当根K线的ATR（N）
+        entry_high: 入场通道上轨，应已后移一根K线
+        exit_low: 离场通道下轨，应已后移一根K线
+        unit_size: 每个单位的持仓数量
+        failsafe_high: 过滤规则的保底突破通道，应已后移一根K线
+        max_units: 最大单位数
+        pyramid_n: 加仓间隔（N的倍数）
+        stop_n: 止损距离（N的倍数）
+        skip_after_winner: 是否启用系统一过滤规则
+        state: 上一段K线结束时的内核状态，为空时从空仓开始；
+               分块推进时传入上一块结果的 state，结果与整段推进一致
+
+    Returns:
+        TurtleKernelResult: 逐K线的动作与持仓状态
+    """
+    n_bars, n_codes = close.shape
+    action = np.zeros((n_bars, n_codes), dtype=np.int8)
+    units_out = np.zeros((n_bars, n_codes), dtype=np.int16)
+    shares_out = np.zeros((n_bars, n_codes))
+    stop_out = np.full((n_bars, n_codes), np.nan)
+    entry_out = np.full((n_bars, n_codes), np.nan)
+
+    # NaN 参与比较结果为 False，指标未就绪的K线不会产生信号
+    with np.errstate(invalid='ignore'):
+        breakout = close > entry_high
+        breakdown = close < exit_low
+        failsafe = close > failsafe_high if failsafe_high is not None else breakout
+        tradable = np.isfinite(atr) & (atr > 0) & np.isfinite(unit_size)
+
+    state = state or TurtleKernelState.flat(n_codes)
+    units, shares, stop = state.units, state.shares, state.stop
+    last_entry, entry_n = state.last_entry, state.entry_n
+    # 系统一过滤规则使用的假想交易
+    hyp_active, hyp_entry = state.hyp_active.copy(), state.hyp_entry
+    hyp_stop, last_winner = state.hyp_stop, state.last_winner
+
+    with np.errstate(invalid='ignore'):
+        for t in range(n_bars):
+            c = close[t]
+            held = units > 0
+            stopped = held & (c < stop)
+            exited = held & (breakdown[t] | stopped)
+
+            allowed = True
+            if skip_after_winner:
+                hyp_closed = hyp_active & (breakdown[t] | (c < hyp_stop))
+                last_winner = np.where(hyp_closed, c > hyp_entry, last_winner)
+                hyp_active &= ~hyp_closed
+                allowed = ~last_winner | failsafe[t]
+                hyp_open = ~hyp_active & breakout[t] & tradable[t]
+                hyp_entry = np.where(hyp_open, c, hyp_entry)
+                hyp_stop = np.where(hyp_open, c - stop_n * atr[t], hyp_stop)
+                hyp_active |= hyp_open
+
+            enter = ~held & breakout[t] & tradable[t] & allowed
+            add = (held & ~exited & (units < max_units) & tradable[t]
+                   & (c >= last_entry + pyramid_n * entry_n))
+            new_unit = enter | add
+
+            units = np.where(exited, 0, units + new_unit)
+            shares = np.where(exited, 0.0, shares + np.where(new_unit, unit_size[t], 0.0))
+            entry_n = np.where(enter, atr[t], entry_n)
+            last_entry = np.where(new_unit, c, np.where(exited, np.nan, last_entry))
+            stop = np.where(new_unit, c - stop_n * entry_n, np.where(exited, np.nan, stop))
+
+            row = action[t]
+            row[enter] = ACTION_ENTRY
+            row[add] = ACTION_ADD
+            row[exited] = ACTION_EXIT
+            row[stopped] = ACTION_STOP
+            units_out[t] = units
+            shares_out[t] = shares
+            stop_out[t] = stop
+            entry_out[t] = last_entry
+
+    return TurtleKernelResult(action=action, units=units_out, shares=shares_out,
+                              unit_size=unit_size, stop=stop_out, last_entry=entry_out,
+                              state=TurtleKernelState(units=units, shares=shares, stop=stop,
+                                                      last_entry=last_entry, entry_n=entry_n,
+                                                      hyp_active=hyp_active, hyp_entry=hyp_entry,
+                                                      hyp_stop=hyp_stop, last_winner=last_winner))
+
+
+class TurtleSystemStrategy(BaseStrategy):
+    """
+    海龟交易系统
+
+    收盘价突破前 entry_window 日最高价入场，跌破前 exit_window 日最低价离场；
+    按 pyramid_n 个N的间隔加仓至 max_units 个单位，止损位于最近入场价下方 stop_n 个N。
+    规则由 turtle_kernel 按时间推进、对全部股票向量化执行，
+    目标仓位为 持有单位数 / max_units。
+    """
+    default_params = {'entry_window': 20, 'exit_window': 10, 'atr_window': 20, 'stop_n': 2.0,
+                      'max_units': 4, 'pyramid_n': 0.5, 'skip_after_winner': False,
+                      'failsafe_window': 55}
+
+    @property
+    def rules(self) -> dict:
+        """海龟规则参数，键与 default_params 一致"""
+        return self.params
+
+    @property
+    def indicators(self) -> Tuple[str, ...]:
+        r = self.rules
+        names = (self._channel(f"HIGH_{r['entry_window']}"), self._channel(f"LOW_{r['exit_window']}"),
+                 self._channel(f"ATR_{r['atr_window']}"))
+        if r['skip_after_winner']:
+            names += (self._channel(f"HIGH_{r['failsafe_window']}"),)
+        return names
+
+    @property
+    def max_units(self) -> int:
+        return self.rules['max_units']
+
+    def _channel(self, name: str) -> str:
+        """通道和ATR所在周期的字段名，channel_timeframe 为空时使用基础周期"""
+        timeframe = self.rules.get('channel_timeframe', '')
+        return f"{timeframe}{TIMEFRAME_SEP}{name}" if timeframe else name
+
+    def _previous(self, panel: MarketPanel, name: str) -> np.ndarray:
+        """
+        不含当根K线的通道值：基础周期指标后移一根，
+        高周期指标对齐后本身只包含此前已收盘的周期
+        """
+        values = panel.fields[name]
+        return values if split_timeframe(name)[0] else self.shift(values)
+
+    def _entry_filter(self, panel: MarketPanel) -> Optional[np.ndarray]:
+        """允许入场的布尔数组，为空表示不过滤，子类可重写"""
+        return None
+
+    def run_kernel(self, panel: MarketPanel, state: Optional[TurtleKernelState] = None,
+                   start: int = 0) -> TurtleKernelResult:
+        """
+        在已包含所需指标的面板上执行海龟规则
+
+        Args:
+            panel: 已包含所需指标的面板数据
+            state: 第 start 根K线之前的内核状态，为空时从空仓开始
+            start: 开始推进的K线位置，之前的K线只用于计算通道和N
+
+        Returns:
+            TurtleKernelResult: 从第 start 根K线起的逐K线动作与持仓状态
+        """
+        r = self.rules
+        fields = panel.fields
+        atr = fields[self._channel(f"ATR_{r['atr_window']}")]
+        entry_high = self._previous(panel, self._channel(f"HIGH_{r['entry_window']}"))
+        allowed = self._entry_filter(panel)
+        if allowed is not None:
+            # 不满足过滤条件的K线视为入场通道不可用
+            entry_high = np.where(allowed, entry_high, np.nan)
+        failsafe = (self._previous(panel, self._channel(f"HIGH_{r['failsafe_window']}"))
+                    if r['skip_after_winner'] else None)
+        exit_low = self._previous(panel, self._channel(f"LOW_{r['exit_window']}"))
+        return turtle_kernel(
+            close=fields['Close'][start:],
+            atr=atr[start:],
+            entry_high=entry_high[start:],
+            exit_low=exit_low[start:],
+            unit_size=self._position_size(atr[start:]),
+            failsafe_high=failsafe[start:] if failsafe is not None else None,
+            max_units=r['max_units'],
+            pyramid_n=r['pyramid_n'],
+            stop_n=r['stop_n'],
+            skip_after_winner=r['skip_after_winner'],
+            state=state,
+        )
+
+    def generate_signals(self, panel: MarketPanel) -> np.ndarray:
+        return self.run_kernel(panel).signals()
+
+    def target_positions(self, panel: MarketPanel) -> np.ndarray:
+        return self.run_kernel(panel).units / self.rules['max_units']
+
+    def stream_targets(self, df: pd.DataFrame, start: int = 0,
+                       state: Optional[TurtleKernelState] = None) -> Tuple[np.ndarray, TurtleKernelState]:
+        """单位数、止损、最近入场价和过滤规则的假想交易都通过内核状态跨块延续"""
+        result = self.run_kernel(self.prepare(self._single_panel(df)), state, start)
+        return result.units[:, 0] / self.rules['max_units'], result.state
+
+    def signal_frame(self, panel: MarketPanel) -> pd.DataFrame:
+        """
+        列式的交易信号表，加仓也作为一条买入信号
+
+        Args:
+            panel: 已包含所需指标的面板数据
+
+        Returns:
+            pd.DataFrame: 按日期、股票排序，包含 code/date/action/signal_type/price/volume/units/stop/ATR 列
+        """
+        return self._kernel_frame(panel, self.run_kernel(panel))
+
+    def stream_signal_frame(self, panel: MarketPanel, starts: np.ndarray,
+                            states: Sequence[Optional[TurtleKernelState]]
+                            ) -> Tuple[pd.DataFrame, List[TurtleKernelState]]:
+        """
+        从每只股票各自的起始K线推进内核，状态由调用方逐只保存，供实时监控增量计算
+
+        Args:
+            panel: 已包含所需指标的面板数据，起始K线之前的部分只用于预热指标
+            starts: [股票数] 的起始K线位置
+            states: 每只股票在起始K线之前的内核状态，为空表示空仓
+
+        Returns:
+            Tuple[pd.DataFrame, List[TurtleKernelState]]: 起始K线之后的信号表（列同 signal_frame）
+                和每只股票推进后的状态
+        """
+        start = int(np.min(starts))
+        # 起始K线之前的收盘价置为 NaN，内核在这些K线上不产生动作、状态保持不变
+        close = panel.fields['Close'].copy()
+        close[np.arange(len(close))[:, None] < np.asarray(starts)[None, :]] = np.nan
+        panel = replace(panel, fields={**panel.fields, 'Close': close})
+        initial = TurtleKernelState.stack(states)
+        result = self.run_kernel(panel, initial, start)
+        frame = self._kernel_frame(panel, result, start, initial)
+        return frame, [result.state.take(j) for j in range(len(panel.codes))]
+
+    def _kernel_frame(self, panel: MarketPanel, result: TurtleKernelResult, start: int = 0,
+                      initial: Optional[TurtleKernelState] = None) -> pd.DataFrame:
+        """将从第 start 根K线起的内核结果转换为信号表，initial 为推进前的状态"""
+        r = self.rules
+        initial = initial or TurtleKernelState.flat(len(panel.codes))
+        rows, cols = np.nonzero(result.action)
+        action = result.action[rows, cols]
+        is_buy = action > 0
+        bars = rows + start
+        # 平仓数量取上一根K线收盘后的持仓，第一根K线取推进前的状态
+        first = rows == 0
+        prev = np.maximum(rows - 1, 0)
+        held = np.where(first, initial.shares[cols], result.shares[prev, cols])
+        prev_stop = np.where(first, initial.stop[cols], result.stop[prev, cols])
+        return pd.DataFrame({
+            'code': np.asarray(panel.codes, dtype=object)[cols],
+            'date': panel.index[bars],
+            'action': np.where(is_buy, 'BUY', 'SELL'),
+            'signal_type': [_ACTION_TYPES[a] for a in action.tolist()],
+            'price': panel.fields['Close'][bars, cols],
+            'volume': np.where(is_buy, result.unit_size[rows, cols], held),
+            'units': result.units[rows, cols],
+            'stop': np.where(is_buy, result.stop[rows, cols], prev_stop),
+            'ATR': panel.fields[self._channel(f"ATR_{r['atr_window']}")][bars, cols],
+        })
+
+    def analyze(self, stock_data: StockData) -> List[TradeSignal]:
+        """
+        分析股票数据并生成交易信号（含加仓信号）
+
+        Args:
+            stock_data: 包含OHLCV数据的股票数据对象
+
+        Returns:
+            List[TradeSignal]: 交易信号列表
+        """
+        try:
+            frame = self.signal_frame(self.prepare(self._single_panel(stock_data.data)))
+            return [
+                TradeSignal(
+                    code=stock_data.code,
+                    date=row.date.date(),
+                    action=row.action,
+                    price=row.price,
+                    volume=row.volume,
+                    reason=self._turtle_reason(row)
+                )
+                for row in frame.itertuples(index=False)
+            ]
+
+        except Exception as e:
+            self.logger.error(f"{self.name} 策略分析过程出错: {str(e)}")
+            raise
+
+    def _turtle_reason(self, row) -> str:
+        r = self.rules
+        if row.signal_type == 'entry':
+            return f"价格突破{r['entry_window']}日高点, ATR为 {row.ATR:.2f}, 止损价 {row.stop:.2f}"
+        if row.signal_type == 'add':
+            return (f"价格较上次入场上涨{r['pyramid_n']}N, 加仓至第{row.units}个单位, "
+                    f"止损上移至 {row.stop:.2f}")
+        if row.signal_type == 'stop':
+            return f"价格跌破止损价 {row.stop:.2f}（入场价下方{r['stop_n']}N）"
+        return f"价格跌破{r['exit_window']}日低点, ATR为 {row.ATR:.2f}"
+
+
+@register_strategy
+class TurtleSystem1Strategy(TurtleSystemStrategy):
+    """海龟系统一：20日突破入场，10日反向突破离场，上次突破盈利时跳过（55日突破除外）"""
+    name = 'turtle_s1'
+    description = '海龟系统一'
+    default_params = {**TurtleSystemStrategy.default_params, 'skip_after_winner': True}
+
+
+@register_strategy
+class TurtleSystem2Strategy(TurtleSystemStrategy):
+    """海龟系统二：55日突破入场，20日反向突破离场"""
+    name = 'turtle_s2'
+    description = '海龟系统二'
+    default_params = {**TurtleSystemStrategy.default_params, 'entry_window': 55, 'exit_window': 20}
+
+
+@register_strategy
+class MultiTimeframeTurtleStrategy(TurtleSystemStrategy):
+    """
+    多周期海龟策略：高周期趋势过滤 + 中周期通道突破 + 基础周期执行
+
+    trend_timeframe 上一周期的收盘价高于其 trend_window 均线时才允许入场；
+    入场/离场通道和N取自 channel_timeframe（此前已收盘的周期），
+    入场、加仓、止损和离场都在基础周期K线收盘时判断。
+    例如以30分钟线为基础周期时，默认参数即 周线趋势 + 日线20日突破 + 30分钟线入场时机。
+    """
+    name = 'turtle_mtf'
+    description = '多周期海龟'
+    default_params = {**TurtleSystemStrategy.default_params, 'channel_timeframe': 'D',
+                      'trend_timeframe': 'W', 'trend_window': 10}
+
+    @property
+    def indicators(self) -> Tuple[str, ...]:
+        trend = self.params['trend_timeframe']
+        return super().indicators + (f"{trend}{TIMEFRAME_SEP}Close",
+                                     f"{trend}{TIMEFRAME_SEP}SMA_{self.params['trend_window']}")
+
+    def _entry_filter(self, panel: MarketPanel) -> Optional[np.ndarray]:
+        trend = self.params['trend_timeframe']
+        with np.errstate(invalid='ignore'):
+            return (panel.fields[f"{trend}{TIMEFRAME_SEP}Close"]
+                    > panel.fields[f"{trend}{TIMEFRAME_SEP}SMA_{self.params['trend_window']}"])
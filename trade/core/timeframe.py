@@ -0,0 +1,175 @@
+"""
+多周期数据对齐
+
+高周期K线只有在收盘后才可用：面板上的高周期K线以其可用时间作为索引，即该周期结束后
+的第一根基础K线时间，按时间对齐（as-of）时每根基础K线只能取到所在周期之前已经收盘的
+高周期K线，不会引入未来数据（如日线上的周线指标只反映上一周及更早的数据）。
+对齐通过一次 searchsorted 完成，对全部股票的所有字段向量化处理。
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..models.entities import MarketPanel
+
+# 周期前缀与字段名之间的分隔符，如 'W:SMA_10'
+TIMEFRAME_SEP = ':'
+
+# 估算预热长度时每个周期包含的交易日数
+_PERIOD_DAYS = {'D': 1, 'B': 1, 'W': 5, 'M': 21, 'ME': 21, 'Q': 63, 'QE': 63, 'Y': 252, 'YE': 252}
+
+
+def split_timeframe(name: str):
+    """
+    拆分带周期前缀的字段名
+
+    Returns:
+        tuple: (周期, 字段名)，无前缀时周期为空字符串
+    """
+    if TIMEFRAME_SEP in name:
+        rule, base = name.split(TIMEFRAME_SEP, 1)
+        return rule, base
+    return '', name
+
+
+def timeframe_days(rule: str) -> int:
+    """一个周期大致包含的交易日数，日内周期按1计"""
+    unit = rule.upper().split('-')[0].lstrip('0123456789')
+    return _PERIOD_DAYS.get(unit or 'D', 1)
+
+
+def bars_per_period(rule: str, index: pd.DatetimeIndex) -> int:
+    """
+    一个高周期大致包含的基础K线数，用于估算预热长度
+
+    日内周期按周期时长除以基础K线间隔（取中位数）计算；日及以上周期按
+    交易日数乘以单个交易日内最多的基础K线数计算，日线基础周期即 timeframe_days。
+
+    Args:
+        rule: 周期规则，如 '60min'、'D'、'W'
+        index: 基础周期的K线时间
+
+    Returns:
+        int: 每个周期的基础K线数，至少为1
+    """
+    index = pd.DatetimeIndex(index)
+    unit = rule.upper().split('-')[0].lstrip('0123456789')
+    if unit not in _PERIOD_DAYS:
+        if len(index) < 2:
+            return 1
+        step = pd.Timedelta(np.median(np.diff(index.asi8)), 'ns')
+        return max(1, int(np.ceil(pd.Timedelta(pd.tseries.frequencies.to_offset(rule)) / step)))
+    per_day = int(pd.Series(1, index=index).groupby(index.normalize()).size().max()) if len(index) else 1
+    return timeframe_days(rule) * per_day
+
+
+def resample_panel(panel: MarketPanel, rule: str) -> MarketPanel:
+    """
+    将面板的OHLCV聚合为更高周期
+
+    Args:
+        panel: 基础周期面板
+        rule: pandas 周期规则，如 '60min'、'D'、'W'、'ME'
+
+    Returns:
+        MarketPanel: 高周期面板，索引为每个周期结束后第一根基础K线的时间（即可用时间），
+            最后一个周期在数据结束后才可用
+    """
+    positions = pd.Series(np.arange(len(panel.index)), index=panel.index)
+    bins = positions.resample(rule).agg(['first', 'last']).dropna()
+    starts = bins['first'].to_numpy(dtype=np.int64)
+    ends = bins['last'].to_numpy(dtype=np.int64)
+
+    fields = panel.fields
+    # 停牌等缺失K线不参与聚合，整个周期缺失时结果为 NaN
+    close = pd.DataFrame(fields['Close']).ffill().to_numpy()
+    with np.errstate(invalid='ignore'):
+        high = np.fmax.reduceat(fields['High'], starts, axis=0)
+        low = np.fmin.reduceat(fields['Low'], starts, axis=0)
+    volume = np.add.reduceat(np.nan_to_num(fields['Volume']), starts, axis=0)
+    traded = np.isfinite(high)
+    opens = pd.DataFrame(fields['Open']).bfill().to_numpy()[starts]
+
+    resampled = {
+        'Open': np.where(traded, opens, np.nan),
+        'High': high,
+        'Low': low,
+        'Close': np.where(traded, close[ends], np.nan),
+        'Volume': np.where(traded, volume, np.nan),
+    }
+    index = panel.index
+    available = index[1:].append(pd.DatetimeIndex([index[-1] + pd.Timedelta(1, 'ns')]))
+    return MarketPanel(codes=panel.codes, index=available[ends], fields=resampled)
+
+
+def align_asof(values: np.ndarray, source_index: pd.Index, target_index: pd.Index,
+               lag: Optional[pd.Timedelta] = None) -> np.ndarray:
+    """
+    将高周期数组按时间对齐到目标索引
+
+    Args:
+        values: 高周期数组，第0轴与 source_index 对应
+        source_index: 高周期K线的可用时间
+        target_index: 目标（基础周期）索引
+        lag: 额外的可用延迟，如外部日线以当日0点为索引时传入1天
+
+    Returns:
+        np.ndarray: 第0轴与 target_index 对应的数组，目标时间之前没有可用K线时为 NaN
+    """
+    source = np.asarray(source_index, dtype='datetime64[ns]')
+    if lag is not None:
+        source = source + np.timedelta64(pd.Timedelta(lag).value, 'ns')
+    target = np.asarray(target_index, dtype='datetime64[ns]')
+    positions = np.searchsorted(source, target, side='right') - 1
+    aligned = values[np.maximum(positions, 0)].astype(float)
+    aligned[positions < 0] = np.nan
+    return aligned
+
+
+def attach_timeframe(panel: MarketPanel, rule: str, source: MarketPanel,
+                     lag: Optional[pd.Timedelta] = None) -> MarketPanel:
+    """
+    挂载外部获取的高周期面板（如单独下载的周线），替代由基础周期聚合
+
+    Args:
+        panel: 基础周期面板
+        rule: 周期前缀
+        source: 高周期面板，股票顺序须与基础面板一致
+        lag: 高周期K线索引到可用时间的延迟，如以当日0点为索引的日线传入1天、
+            以周一为索引的周线传入7天
+
+    Returns:
+        MarketPanel: 挂载了高周期面板的新面板
+    """
+    if list(source.codes) != list(panel.codes):
+        raise ValueError(f"{rule} 周期面板的股票与基础面板不一致")
+    index = source.index if lag is None else source.index + pd.Timedelta(lag)
+    timeframes = {**panel.timeframes,
+                  rule: MarketPanel(codes=source.codes, index=index, fields=dict(source.fields))}
+    return MarketPanel(codes=panel.codes, index=panel.index, fields=panel.fields,
+                       timeframes=timeframes)
+
+
+def timeframe_fields(panel: MarketPanel, rule: str, names: Iterable[str],
+                     compute) -> Tuple[Dict[str, np.ndarray], MarketPanel]:
+    """
+    在高周期上计算字段并对齐到基础面板
+
+    Args:
+        panel: 基础周期面板，未挂载该周期时由基础周期聚合
+        rule: 周期前缀
+        names: 不含前缀的字段名（OHLCV 或指标名）
+        compute: 在高周期面板上计算指标的函数，签名为 (panel, names) -> MarketPanel
+
+    Returns:
+        Tuple[Dict[str, np.ndarray], MarketPanel]: 带周期前缀的字段名到对齐后数组的映射，
+            以及补齐了指标的高周期面板（供后续计算复用）
+    """
+    source = panel.timeframes.get(rule)
+    if source is None:
+        source = resample_panel(panel, rule)
+    source = compute(source, names)
+    aligned = {f"{rule}{TIMEFRAME_SEP}{name}": align_asof(source.fields[name], source.index, panel.index)
+               for name in names}
+    return aligned, source
@@ -0,0 +1,123 @@
+"""
+预测模型的训练回调
+
+早停、学习率衰减和最优权重检查点让训练在验证损失不再下降时提前结束，
+每轮的损失、学习率和耗时写入日志并追加到训练指标文件（JSONL），便于汇总分析。
+"""
+import json
+import time
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from ..config.settings import Settings
+from ..utils.logger import Logger
+
+
+@lru_cache(maxsize=None)
+def _epoch_metrics_class():
+    """EpochMetrics 需继承 Keras 的 Callback，在首次使用时才定义"""
+    from .lstm_predictor import _load_tensorflow
+
+    tf = _load_tensorflow()
+
+    class EpochMetrics(tf.keras.callbacks.Callback):
+        """每轮训练结束时记录损失、学习率和耗时"""
+        def __init__(self, code: str, path: Optional[Path] = None):
+            super().__init__()
+            self.logger = Logger()
+            self.code = code
+            self.path = Path(path) if path else None
+            self.best: Optional[float] = None
+            self._file = None
+            self._started = 0.0
+            self._epoch_started = 0.0
+
+        def on_train_begin(self, logs=None):
+            self._started = time.perf_counter()
+            if self.path is not None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self._epoch_started = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            logs = {key: float(value) for key, value in (logs or {}).items()}
+            if 'learning_rate' not in logs and 'lr' not in logs:
+                try:
+                    logs['learning_rate'] = float(np.asarray(self.model.optimizer.learning_rate))
+                except Exception:
+                    pass
+            record = {
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'code': self.code,
+                'epoch': epoch + 1,
+                'seconds': round(time.perf_counter() - self._epoch_started, 4),
+                **logs,
+            }
+            monitored = logs.get('val_loss', logs.get('loss'))
+            if monitored is not None and (self.best is None or monitored < self.best):
+                self.best = monitored
+            self.logger.debug(f"{self.code} 第 {epoch + 1} 轮: "
+                              + ", ".join(f"{k}={v:.6g}" for k, v in logs.items()))
+            if self._file is not None:
+                self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+                self._file.flush()
+
+        def on_train_end(self, logs=None):
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            epochs = len(self.model.history.epoch) if getattr(self.model, 'history', None) else 0
+            best = f"{self.best:.6g}" if self.best is not None else "-"
+            self.logger.info(f"{self.code} 训练结束: {epochs} 轮，最优损失 {best}，"
+                             f"耗时 {time.perf_counter() - self._started:.1f} 秒")
+
+    return EpochMetrics
+
+
+def training_callbacks(code: str, validation: bool = True, checkpoint: Optional[Path] = None,
+                       metrics_file: Optional[Path] = None) -> List:
+    """
+    构建训练回调
+
+    Args:
+        code: 股票代码（或模型名），用于日志和训练指标记录
+        validation: 训练是否有验证集；没有验证集时（如微调）只记录指标
+        checkpoint: 最优权重检查点文件，为空时不保存检查点
+        metrics_file: 训练指标文件，默认 Settings.DATA.training_metrics_file
+
+    Returns:
+        List: Keras 回调列表
+    """
+    from .lstm_predictor import _load_tensorflow
+
+    _load_tensorflow()
+    from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint, ReduceLROnPlateau
+
+    config = Settings.LSTM
+    callbacks = [_epoch_metrics_class()(code, metrics_file or Settings.DATA.training_metrics_file)]
+    if validation:
+        callbacks += [
+            EarlyStopping(monitor='val_loss', patience=config.early_stopping_patience,
+                          restore_best_weights=True),
+            ReduceLROnPlateau(monitor='val_loss', factor=config.lr_factor,
+                              patience=config.lr_patience, min_lr=config.min_lr),
+        ]
+        if checkpoint is not None:
+            Path(checkpoint).parent.mkdir(parents=True, exist_ok=True)
+            callbacks.append(ModelCheckpoint(str(checkpoint), monitor='val_loss', save_best_only=True,
+                                             save_weights_only=True))
+    return callbacks
+
+
+def restore_checkpoint(model, checkpoint: Path) -> None:
+    """训练结束后载入验证损失最优的权重并删除检查点"""
+    checkpoint = Path(checkpoint)
+    if checkpoint.exists():
+        model.load_weights(str(checkpoint))
+        checkpoint.unlink()
@@ -0,0 +1,192 @@
+"""
+LSTM超参数搜索
+
+每组参数在独立的工作进程中评估，每个进程持有自己的 TensorFlow 运行时并限制线程数，
+多核 CPU 上同时评估多组参数而不会因线程过度争用互相拖慢。评估采用扩展窗口的时间序列
+交叉验证：每折只用验证集之前的数据训练，训练数据末尾一段用于早停，得分为验证集上的
+价格 RMSE。
+"""
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, fields, replace
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..config.settings import Settings
+from ..models.entities import StockData
+from ..utils.logger import Logger
+from .model_registry import ModelRegistry
+
+
+def param_grid(space: Dict[str, list]) -> List[dict]:
+    """
+    搜索空间的全部参数组合
+
+    Args:
+        space: LSTMConfig 字段名到候选值的映射
+
+    Returns:
+        List[dict]: 参数组合列表
+    """
+    valid = {f.name for f in fields(Settings.LSTM)}
+    unknown = set(space) - valid
+    if unknown:
+        raise ValueError(f"未知的LSTM参数: {', '.join(sorted(unknown))}")
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def _init_worker(threads: int) -> None:
+    """工作进程初始化：在 TensorFlow 运行时启动前限制线程数，只使用CPU"""
+    os.environ['CUDA_VISIBLE_DEVICES'] = '-1'
+    for name in ('OMP_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS'):
+        os.environ[name] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def evaluate_params(params: dict, close: np.ndarray, n_splits: int, patience: int,
+                    base: Optional[dict] = None) -> dict:
+    """
+    时间序列交叉验证评估一组参数，在工作进程中执行
+
+    Args:
+        params: LSTMConfig 参数
+        close: 收盘价序列
+        n_splits: 交叉验证折数
+        patience: 早停轮数
+        base: 未搜索参数的取值，默认为工作进程中的 Settings.LSTM
+
+    Returns:
+        dict: 参数及平均验证 RMSE、各折 RMSE、实际训练轮数和耗时
+    """
+    import tensorflow as tf
+    from sklearn.model_selection import TimeSeriesSplit
+
+    from .lstm_predictor import LSTMPredictor
+    from .training import training_callbacks
+
+    start = time.perf_counter()
+    # 工作进程独占 Settings，按本组参数构建与 LSTMPredictor 相同结构的模型
+    Settings.LSTM = config = replace(Settings.LSTM, **{**(base or {}), **params,
+                                                       'early_stopping_patience': patience})
+    time_step = config.time_step
+    windows = np.lib.stride_tricks.sliding_window_view(close[:-1], time_step)
+    targets = close[time_step:]
+    if len(windows) <= n_splits:
+        raise ValueError(f"K线数不足以进行 {n_splits} 折交叉验证")
+
+    fold_rmse, fold_epochs = [], []
+    for train_idx, val_idx in TimeSeriesSplit(n_splits=n_splits).split(windows):
+        # 归一化参数只取自训练折内的价格，避免验证数据泄漏
+        seen = close[:train_idx[-1] + time_step + 1]
+        low = seen.min()
+        span = (seen.max() - low) or 1.0
+        x_train = ((windows[train_idx] - low) / span)[:, :, None]
+        x_val = ((windows[val_idx] - low) / span)[:, :, None]
+
+        tf.keras.backend.clear_session()
+        model = LSTMPredictor(registry=ModelRegistry())._build_model()
+        history = model.fit(
+            x_train, (targets[train_idx] - low) / span,
+            batch_size=config.batch_size,
+            epochs=config.epochs,
+            validation_split=config.validation_split,
+            callbacks=training_callbacks(f"tune {params}"),
+            verbose=0
+        )
+        predicted = model.predict(x_val, batch_size=config.batch_size, verbose=0)[:, 0] * span + low
+        fold_rmse.append(float(np.sqrt(np.mean((predicted - targets[val_idx]) ** 2))))
+        fold_epochs.append(len(history.history['loss']))
+
+    return {
+        **params,
+        'rmse': float(np.mean(fold_rmse)),
+        'rmse_std': float(np.std(fold_rmse)),
+        'fold_rmse': fold_rmse,
+        'epochs_run': float(np.mean(fold_epochs)),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+class HyperparameterTuner:
+    """
+    LSTM超参数搜索
+
+    在进程池中并行评估搜索空间中的每组参数，结果按验证 RMSE 排序并记录到模型库。
+    """
+    def __init__(self, space: Optional[Dict[str, list]] = None, workers: Optional[int] = None,
+                 registry: Optional[ModelRegistry] = None):
+        """
+        Args:
+            space: 搜索空间，默认 Settings.TUNING.space
+            workers: 工作进程数，默认取配置，配置为 0 时为 CPU 核数 / 每个进程的线程数
+            registry: 记录搜索结果的模型库
+        """
+        self.logger = Logger()
+        self.config = Settings.TUNING
+        self.space = space or self.config.space
+        threads = max(self.config.threads_per_worker, 1)
+        self.workers = workers or self.config.workers or max((os.cpu_count() or 1) // threads, 1)
+        self.registry = registry or ModelRegistry()
+
+    def tune(self, stock_data: StockData) -> pd.DataFrame:
+        """
+        搜索一只股票的最优参数
+
+        Args:
+            stock_data: 股票数据
+
+        Returns:
+            pd.DataFrame: 每行一组参数及其得分，按平均验证 RMSE 升序排列；失败的组合 rmse 为 NaN
+        """
+        try:
+            grid = param_grid(self.space)
+            close = stock_data.data['Close'].to_numpy(dtype=float)
+            close = close[np.isfinite(close)]
+            workers = min(self.workers, len(grid))
+            self.logger.info(f"开始超参数搜索: {stock_data.code}，{len(grid)} 组参数，{workers} 个进程")
+
+            results = []
+            # TensorFlow 不支持 fork 后继续使用，工作进程以 spawn 方式启动
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_worker,
+                                     initargs=(self.config.threads_per_worker,)) as pool:
+                # 工作进程中的 Settings 为默认值，未搜索的参数随任务传入
+                base = asdict(Settings.LSTM)
+                futures = {pool.submit(evaluate_params, params, close, self.config.n_splits,
+                                       self.config.patience, base): params for params in grid}
+                for done, future in enumerate(as_completed(futures), 1):
+                    params = futures[future]
+                    try:
+                        result = future.result()
+                        self.logger.info(f"[{done}/{len(grid)}] {params}: RMSE {result['rmse']:.4f}")
+                    except Exception as e:
+                        self.logger.error(f"评估参数 {params} 出错: {str(e)}")
+                        result = {**params, 'rmse': np.nan, 'error': str(e)}
+                    results.append(result)
+
+            frame = pd.DataFrame(results).sort_values('rmse', na_position='last').reset_index(drop=True)
+            self.registry.record_tuning(stock_data.code, {
+                'tuned_at': datetime.now().isoformat(timespec='seconds'),
+                'bars': len(close),
+                'last_bar': str(stock_data.data.index[-1]),
+                'tuning': asdict(self.config),
+                'base_config': asdict(Settings.LSTM),
+                'results': frame.replace({np.nan: None}).to_dict('records'),
+            })
+            return frame
+
+        except Exception as e:
+            self.logger.error(f"超参数搜索出错: {str(e)}")
+            raise
@@ -1,18 +1,26 @@
 import pandas as pd
 import numpy as np
-from typing import List, Optional
-from datetime import datetime
+from typing import List
+from dataclasses import asdict
 
-from ..models.entities import StockData, TradeSignal
+from ..models.entities import MarketPanel, StockData, TradeSignal
 from ..utils.data_processor import DataProcessor
 from ..utils.logger import Logger
 from ..config.settings import Settings
+from .risk import atr_unit_size
+from .strategies.base import register_strategy
+from .strategies.turtle_system import TurtleSystemStrategy
 
-class TurtleStrategy:
+@register_strategy
+class TurtleStrategy(TurtleSystemStrategy):
     """
     海龟交易策略实现类
-    基于经典的海龟交易法则，包含突破入场、止损和仓位管理等核心功能
+    基于经典的海龟交易法则，包含突破入场、加仓、N止损和仓位管理等核心功能，
+    规则参数取自 Settings.TURTLE，可在系统一与系统二之间切换
     """
+    name = 'turtle'
+    description = '海龟突破'
+
     def __init__(self):
         """
         初始化海龟策略所需的组件
@@ -27,143 +35,103 @@ class TurtleStrategy:
         self.cash = 1000000  # 初始资金，可以从配置中读取
         self.positions = []  # 记录持仓历史
         self.portfolio_values = []  # 记录组合价值历史
-        
+
+    @property
+    def params(self) -> dict:
+        """策略参数，用于回测结果缓存键和复现清单"""
+        return asdict(self.config)
+
+    @property
+    def rules(self) -> dict:
+        """按配置选择系统一（短期突破）或系统二（长期突破）的规则参数"""
+        config = self.config
+        system1 = config.system == 1
+        return {
+            'entry_window': config.short_window if system1 else config.long_window,
+            'exit_window': config.short_exit_window if system1 else config.long_exit_window,
+            'atr_window': config.atr_window,
+            'stop_n': config.stop_n,
+            'max_units': config.max_units,
+            'pyramid_n': config.pyramid_n,
+            # 过滤规则只适用于系统一，以长期突破作为保底
+            'skip_after_winner': system1 and config.skip_after_winner,
+            'failsafe_window': config.long_window,
+        }
+
+    @property
+    def lookback(self) -> int:
+        # 与 prepare_turtle_data 一致，长周期通道也需要完整预热
+        config = self.config
+        return max(config.short_window, config.long_window, config.atr_window,
+                   config.short_exit_window, config.long_exit_window) + 1
+
     def analyze(self, stock_data: StockData) -> List[TradeSignal]:
         """
         分析股票数据并生成交易信号
-        
+
         Args:
             stock_data: 包含OHLCV数据的股票数据对象
-            
+
         Returns:
-            List[TradeSignal]: 交易信号列表
-            
+            List[TradeSignal]: 交易信号列表，入场、加仓为买入信号，离场、止损为卖出信号
+
         Raises:
             Exception: 当分析过程出现错误时抛出异常
         """
         try:
-            # 使用数据处理器准备海龟策略所需的技术指标数据
-            df = self.data_processor.prepare_turtle_data(stock_data)
-            
-            # 存储生成的交易信号
-            signals = []
-            
-            # 遍历每个交易日，检查交易信号
-            for i in range(1, len(df)):
-                current_row = df.iloc[i]
-                prev_row = df.iloc[i-1]
-                
-                # 分别检查入场和出场信号
-                entry_signal = self._check_entry_signal(current_row, prev_row)
-                exit_signal = self._check_exit_signal(current_row, prev_row)
-                
-                # 如果存在任何信号，创建交易信号对象
-                if entry_signal or exit_signal:
-                    signal = self._create_trade_signal(
-                        stock_data.code,
-                        df.index[i],
-                        current_row,
-                        "BUY" if entry_signal else "SELL"
-                    )
-                    signals.append(signal)
-            
-            return signals
-            
+            return super().analyze(stock_data)
+
         except Exception as e:
             self.logger.error(f"海龟策略分析过程出错: {str(e)}")
             raise
-    
-    def _check_entry_signal(self, current: pd.Series, prev: pd.Series) -> bool:
-        """
-        检查入场信号
-        
-        Args:
-            current: 当前交易日的数据
-            prev: 前一个交易日的数据
-            
-        Returns:
-            bool: 如果出现入场信号返回True，否则返回False
-        """
-        # 当收盘价突破20日高点时，产生做多信号
-        if current['Close'] > prev['High_20']:
-            return True
-        return False
-    
-    def _check_exit_signal(self, current: pd.Series, prev: pd.Series) -> bool:
+
+    def generate_signal_frame(self, stock_data: StockData) -> pd.DataFrame:
         """
-        检查出场信号
-        
+        生成列式的交易信号表，不构造 TradeSignal 对象
+
         Args:
-            current: 当前交易日的数据
-            prev: 前一个交易日的数据
-            
+            stock_data: 包含OHLCV数据的股票数据对象
+
         Returns:
-            bool: 如果出现出场信号返回True，否则返回False
+            pd.DataFrame: 每行一个信号，列同 analyze_universe
         """
-        # 当收盘价跌破20日低点时，产生平仓信号
-        if current['Close'] < prev['Low_20']:
-            return True
-        return False
-    
-    def _create_trade_signal(self, code: str, date: datetime, 
-                           row: pd.Series, action: str) -> TradeSignal:
+        panel = self.data_processor.build_panel([stock_data])
+        return self.analyze_universe(panel)
+
+    def analyze_universe(self, panel: MarketPanel) -> pd.DataFrame:
         """
-        创建交易信号对象
-        
+        对整个股票池一次性生成交易信号，海龟规则内核对全部股票向量化推进
+
         Args:
-            code: 股票代码
-            date: 交易日期
-            row: 当前交易日的数据
-            action: 交易动作（'BUY'或'SELL'）
-            
+            panel: DataProcessor.build_panel 生成的面板数据
+
         Returns:
-            TradeSignal: 包含完整交易信息的信号对象
+            pd.DataFrame: 按日期、股票排序的列式信号表，包含
+                code/date/action/signal_type/price/volume/units/stop/ATR 列
         """
-        # 基于ATR计算合适的仓位大小
-        unit_size = self._calculate_position_size(row['ATR'])
-        
-        return TradeSignal(
-            code=code,
-            date=date.date(),
-            action=action,
-            price=row['Close'],
-            volume=unit_size,
-            reason=self._generate_signal_reason(action, row)
-        )
-    
-    def _calculate_position_size(self, atr: float) -> float:
+        try:
+            return self.signal_frame(self.prepare(panel))
+
+        except Exception as e:
+            self.logger.error(f"海龟策略批量分析过程出错: {str(e)}")
+            raise
+
+    def _calculate_position_size(self, atr):
         """
-        计算交易仓位大小
-        
+        计算交易仓位大小（一个单位）
+
         Args:
-            atr: 平均真实波幅值
-            
+            atr: 平均真实波幅值，可以是标量或数组
+
         Returns:
-            float: 建议的仓位大小
-            
+            建议的仓位大小，与输入形状一致
+
         说明:
             基于账户风险和ATR计算适当的仓位大小，
-            确保单次交易的风险不超过账户总值的固定比例
-        """
-        dollar_volatility = atr
-        position_size = (self.config.total_risk_capital *
-                        self.config.risk_percentage) / dollar_volatility
-        return position_size
-    
-    def _generate_signal_reason(self, action: str, row: pd.Series) -> str:
+            确保单个单位价格波动一个N时的损益不超过账户总值的固定比例
         """
-        生成交易信号的具体原因描述
-        
-        Args:
-            action: 交易动作
-            row: 当前交易日的数据
-            
-        Returns:
-            str: 描述交易信号产生原因的字符串
-        """
-        if action == "BUY":
-            return (f"价格突破20日高点 {row['High_20']:.2f}, "
-                   f"ATR为 {row['ATR']:.2f}")
-        else:
-            return (f"价格跌破20日低点 {row['Low_20']:.2f}, "
-                   f"ATR为 {row['ATR']:.2f}") 
\ No newline at end of file
+        return atr_unit_size(atr, self.config.total_risk_capital, self.config.risk_percentage,
+                             self.config.dollar_per_point)
+
+    def _position_size(self, atr: np.ndarray) -> np.ndarray:
+        return self._calculate_position_size(atr)
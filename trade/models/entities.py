@@ -1,6 +1,7 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import List, Optional, Dict
+import numpy as np
 import pandas as pd
 
 @dataclass
@@ -10,6 +11,19 @@ class StockData:
     data: pd.DataFrame
     last_update: datetime
 
+@dataclass
+class MarketPanel:
+    """
+    多只股票按时间对齐的宽表数据，每个字段形状为 [K线数, 股票数]，缺失K线为 NaN
+
+    timeframes 保存更高周期的面板（如 'W'、'D'），其索引为每根K线收盘可用的时间，
+    字段名带周期前缀（如 'W:SMA_10'）的指标由其计算后按时间对齐到本面板
+    """
+    codes: List[str]
+    index: pd.DatetimeIndex
+    fields: Dict[str, np.ndarray]
+    timeframes: Dict[str, 'MarketPanel'] = field(default_factory=dict)
+
 @dataclass
 class PredictionResult:
     code: str
@@ -17,6 +31,9 @@ class PredictionResult:
     predicted_price: float
     confidence: float
     signals: List[str]
+    # 预测区间（覆盖率见 Settings.INTERVAL.coverage），没有区间估计时为 None
+    lower_price: Optional[float] = None
+    upper_price: Optional[float] = None
 
 @dataclass
 class TradeSignal:
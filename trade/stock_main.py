@@ -5,7 +5,19 @@ from typing import List
 import sys
 from pathlib import Path
 from trade.core.data_fetcher import DataFetcher
+from trade.core.screener import Screener
+from trade.core.correlation import CorrelationService
+from trade.core.global_predictor import GlobalLSTMPredictor
+from trade.core.tuning import HyperparameterTuner
+from trade.core.inference import QUANTIZATIONS, export_predictor
+from trade.core.lstm_predictor import LSTMPredictor
+from trade.utils.result_store import ResultStore
+from trade.core.monitor import SignalMonitor, available_sinks, create_sink, load_watchlist
+from trade.core.strategies import available_strategies, create_strategy
+from trade.core.forecasters import available_forecasters, create_forecaster
+from trade.core.evaluation import ForecastEvaluator, summarize_errors
 import click.core
+import asyncio
 from datetime import datetime
 import os
 import numpy as np
@@ -28,12 +40,26 @@ def cli():
 @click.option('--interval', default='1d', help='数据间隔: 1m/2m/5m/15m/30m/60m/90m/1h/1d/5d/1wk/1mo/3mo')
 @click.option('--predict-days', default=5, help='预测天数')
 @click.option('--analysis-type',
-              type=click.Choice(['all', 'predict', 'turtle', 'sentiment', 'ai', 'financial']),
+              type=click.Choice(['all', 'predict', 'turtle', 'backtest', 'sentiment', 'ai', 'financial']),
               default='all',
-              help='分析类型:全部/预测/海龟/情绪/AI/财报')
+              help='分析类型:全部/预测/海龟/回测/情绪/AI/财报')
 @click.option('--report-url', help='财报PDF的URL（仅在分析类型为financial时需要）')
+@click.option('--strategy', 'strategy_name',
+              type=click.Choice(available_strategies()),
+              default='turtle',
+              help='策略分析和回测使用的交易策略')
+@click.option('--save', is_flag=True, help='将预测、信号、情绪和AI分析结果写入结果库')
+@click.option('--retrain', is_flag=True, help='忽略模型库中已训练的模型，重新训练预测模型')
+@click.option('--mc-samples', default=Settings.INTERVAL.mc_samples,
+              help='LSTM模型预测区间的 MC Dropout 样本数，0 表示使用评估得到的共形区间')
+@click.option('--model', 'model_name',
+              type=click.Choice(['lstm', 'global', 'tflite'] + available_forecasters()), default='lstm',
+              help='预测模型: lstm（每只股票一个模型）/global（跨股票共享模型，需先运行 train-global）/'
+                   'tflite（导出的轻量模型，需先运行 export-model）/'
+                   + '/'.join(available_forecasters()) + '（基准模型）')
 def analyze(stock_codes: List[str], period: str, interval: str, predict_days: int, 
-           analysis_type: str, report_url: str):
+           analysis_type: str, report_url: str, strategy_name: str, save: bool, retrain: bool,
+           mc_samples: int, model_name: str):
     """分析股票数据
     示例:
     python main.py analyze AAPL GOOGL --period 6mo --interval 1d
@@ -47,11 +73,15 @@ def analyze(stock_codes: List[str], period: str, interval: str, predict_days: in
         click.echo(f"- 间隔: {interval}")
         click.echo(f"- 预测天数: {predict_days}")
         click.echo(f"- 分析类型: {analysis_type}")
+        click.echo(f"- 交易策略: {strategy_name}")
         click.echo("="*50)
         # 初始化必要的目录
         click.echo("\n[1/2] 初始化系统...")
         Settings.init_directories()
+        Settings.INTERVAL.mc_samples = mc_samples
         cli = CLI()
+        strategy = (cli.turtle_strategy if strategy_name == 'turtle'
+                    else create_strategy(strategy_name))
         # 获取股票数据
         click.echo("\n[2/2] 获取股票数据...")
         results = cli.data_fetcher.fetch_multiple_stocks(
@@ -62,6 +92,16 @@ def analyze(stock_codes: List[str], period: str, interval: str, predict_days: in
         if not results:
             click.echo("\n❌ 错误: 未能获取到任何股票数据")
             sys.exit(1)
+        # 共享模型和基准模型一次预测全部股票
+        batch_predictions = {}
+        if model_name not in ('lstm', 'tflite') and analysis_type in ['all', 'predict']:
+            predictor = (cli.global_predictor if model_name == 'global'
+                         else create_forecaster(model_name))
+            click.echo(f"\n🔮 使用 {model_name} 模型批量预测...")
+            for prediction in predictor.predict_batch(results, days_ahead=predict_days):
+                batch_predictions.setdefault(prediction.code, []).append(prediction)
+        # 要写入结果库的结果在整个运行内累积，结束后每张表只写一次
+        saved_predictions, saved_signals, saved_sentiments, saved_reports = [], [], [], []
         # 执行分析
         total_stocks = len(results)
         for idx, stock_data in enumerate(results, 1):
@@ -70,18 +110,29 @@ def analyze(stock_codes: List[str], period: str, interval: str, predict_days: in
             click.echo(f"分析股票 {stock_code} ({idx}/{total_stocks})")
             click.echo(f"{'='*50}")
             
-            predictions = signals = sentiment = report = financial_analysis = None
+            predictions = signals = sentiment = report = financial_analysis = backtest = None
             
             if analysis_type in ['all', 'predict']:
                 click.echo("\n🔮 执行预测分析...")
-                cli.lstm_predictor.train(stock_data)
-                predictions = cli.lstm_predictor.predict(stock_data, days_ahead=predict_days)
+                if model_name == 'tflite':
+                    predictions = cli.tflite_predictor.predict(stock_data, days_ahead=predict_days)
+                elif model_name == 'lstm':
+                    cli.lstm_predictor.ensure_trained(stock_data, retrain=retrain)
+                    predictions = cli.lstm_predictor.predict(stock_data, days_ahead=predict_days)
+                else:
+                    predictions = batch_predictions.get(stock_code, [])
                 click.echo("✅ 预测分析完成")
 
             if analysis_type in ['all', 'turtle']:
-                click.echo("\n🐢 执行海龟策略分析...")
-                signals = cli.turtle_strategy.analyze(stock_data)
-                click.echo("✅ 海龟策略分析完成")
+                click.echo(f"\n🐢 执行{strategy.description}策略分析...")
+                signals = strategy.analyze(stock_data)
+                click.echo(f"✅ {strategy.description}策略分析完成")
+
+            if analysis_type in ['all', 'backtest']:
+                click.echo(f"\n📈 执行{strategy.description}策略回测...")
+                backtest = cli.backtest_cache.run(stock_data, strategy,
+                                                  engine=cli.backtest_engine)
+                click.echo("✅ 回测完成")
 
             if analysis_type in ['all', 'sentiment']:
                 click.echo("\n😊 执行情绪分析...")
@@ -108,18 +159,29 @@ def analyze(stock_codes: List[str], period: str, interval: str, predict_days: in
                 signals, 
                 sentiment, 
                 report,
-                financial_analysis
+                financial_analysis,
+                backtest
             )
 
-            # 如果是 'all' 类型，直接保存已经计算的结果
-            #if analysis_type == 'all':
-                # click.echo("\n📊 保存分析结果...")
-                # cli.excel_writer.write_predictions(predictions)
-                # cli.excel_writer.write_trade_signals(signals)
-                # cli.excel_writer.write_sentiment_analysis([sentiment])
-                # cli.excel_writer.write_ai_reports([report])
-                # click.echo("✅ 结果保存完成")
+            if save:
+                saved_predictions.extend(predictions or [])
+                saved_signals.extend(signals or [])
+                if sentiment:
+                    saved_sentiments.append(sentiment)
+                if report:
+                    saved_reports.append(report)
 
+        # 本次运行的结果写入同一批次，之后可用 results 命令查询或导出Excel
+        if save:
+            store = cli.result_store
+            rows = (store.write_predictions(saved_predictions)
+                    + store.write_trade_signals(saved_signals)
+                    + store.write_sentiment_analysis(saved_sentiments)
+                    + store.write_ai_reports(saved_reports))
+            click.echo(f"\n📊 分析结果已写入结果库，批次: {store.run_id}")
+            # 没有任何结果时不导出空报表
+            if Settings.OUTPUT.excel_reports and rows:
+                click.echo(f"✅ Excel报表: {cli.result_store.export_excel()}")
         click.echo("\n🎉 所有分析任务已完成!")
         click.echo(f"完成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         click.echo("="*50)
@@ -131,7 +193,8 @@ def analyze(stock_codes: List[str], period: str, interval: str, predict_days: in
         click.echo(f"\n❌ 发生错误: {str(e)}")
         sys.exit(1)
 
-def display_analysis_summary(stock_code: str, predictions, signals, sentiment, report, financial_analysis=None):
+def display_analysis_summary(stock_code: str, predictions, signals, sentiment, report, financial_analysis=None,
+                             backtest=None):
     """展示分析结果汇总"""
     click.echo("\n" + "="*50)
     click.echo(f"📊 {stock_code} 分析结果汇总")
@@ -149,6 +212,9 @@ def display_analysis_summary(stock_code: str, predictions, signals, sentiment, r
                 click.echo(f"- 未来5天预测趋势: {trend}")
                 click.echo(f"- 预测价格区间: {min(prices):.2f} - {max(prices):.2f}")
                 click.echo(f"- 置信度: {latest_pred.confidence:.2%}")
+                if latest_pred.lower_price is not None:
+                    click.echo(f"- 第{len(predictions)}天 {Settings.INTERVAL.coverage:.0%} 预测区间: "
+                               f"{latest_pred.lower_price:.2f} - {latest_pred.upper_price:.2f}")
             else:
                 click.echo("- 无有效预测数据")
         except Exception as e:
@@ -179,6 +245,15 @@ def display_analysis_summary(stock_code: str, predictions, signals, sentiment, r
         except Exception as e:
             click.echo(f"- 信号处理出错: {str(e)}")
     
+    if backtest:
+        click.echo("\n📈 回测结果:")
+        click.echo(f"- 总收益率: {backtest['total_return']:.2%}")
+        click.echo(f"- 年化收益率: {backtest['annual_return']:.2%}")
+        click.echo(f"- 夏普比率: {backtest['sharpe_ratio']:.2f}")
+        click.echo(f"- 最大回撤: {backtest['max_drawdown']:.2%}")
+        click.echo(f"- 交易次数: {backtest['total_trades']} (胜率 {backtest['win_rate']:.2%})")
+        click.echo(f"- 期末价值: {backtest['final_value']:.2f}")
+
     if sentiment is not None:
         click.echo("\n😊 情绪分析结果:")
         sentiment_score = sentiment.sentiment_score if hasattr(sentiment, 'sentiment_score') else 0
@@ -227,6 +302,283 @@ def display_analysis_summary(stock_code: str, predictions, signals, sentiment, r
     
     click.echo("\n" + "="*50)
 
+@cli.command(name='screen')
+@click.argument('filters', nargs=-1, required=True)
+@click.option('--rank-by', help='排序表达式，如 "rank(ROC_20)"')
+@click.option('--ascending', is_flag=True, help='按排序表达式升序排列')
+@click.option('--top', default=Settings.SCREENER.top, help='返回的股票数')
+@click.option('--period', default='max', help='本地K线库的数据周期')
+@click.option('--interval', default='1d', help='本地K线库的数据间隔')
+@click.option('--refresh', is_flag=True, help='先从本地K线库重建选股快照')
+def screen(filters: List[str], rank_by: str, ascending: bool, top: int,
+           period: str, interval: str, refresh: bool):
+    """全市场选股
+    示例:
+    python main.py screen "Close > prev(HIGH_20)" "Volume > 2 * prev(VOLMA_20)" --rank-by "ROC_20"
+    """
+    try:
+        screener = Screener(period=period, interval=interval)
+        if refresh:
+            click.echo("\n🔄 重建选股快照...")
+            panel = screener.refresh()
+            click.echo(f"✅ 快照包含 {len(panel.codes)} 只股票，最新日期 {panel.index[-1]}")
+
+        start = datetime.now()
+        result = screener.screen(list(filters), rank_by=rank_by, ascending=ascending, top=top)
+        elapsed = (datetime.now() - start).total_seconds()
+
+        click.echo(f"\n🔍 筛选条件: {' 且 '.join(filters)}")
+        if result.empty:
+            click.echo("没有满足条件的股票")
+        else:
+            click.echo(result.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+        click.echo(f"\n共 {len(result)} 只股票，耗时 {elapsed:.3f} 秒")
+
+    except Exception as e:
+        click.echo(f"\n❌ 选股失败: {str(e)}")
+        sys.exit(1)
+
+@cli.command(name='results')
+@click.argument('table', type=click.Choice(['predictions', 'trade_signals', 'sentiment_analysis', 'ai_reports']))
+@click.option('--run-id', help='批次号，默认为最近一个批次')
+@click.option('--code', 'codes', multiple=True, help='股票代码，可重复指定')
+@click.option('--start', help='起始日期')
+@click.option('--end', help='结束日期')
+@click.option('--excel', is_flag=True, help='将查询的批次导出为Excel报表')
+def results(table: str, run_id: str, codes: List[str], start: str, end: str, excel: bool):
+    """查询结果库
+    示例:
+    python main.py results trade_signals --code AAPL --start 2024-01-01
+    """
+    try:
+        store = ResultStore()
+        runs = store.runs(table)
+        if not runs:
+            click.echo(f"结果库中没有 {table} 数据")
+            return
+        run_id = run_id or runs[-1]
+        frame = store.read(table, run_id=run_id, codes=codes or None, start=start, end=end)
+        click.echo(f"\n📊 {table} 批次 {run_id}: {len(frame)} 条")
+        if not frame.empty:
+            click.echo(frame.drop(columns=['run_id', 'written_at']).to_string(index=False))
+        if excel:
+            click.echo(f"\n✅ Excel报表: {store.export_excel([table], run_id=run_id)}")
+
+    except Exception as e:
+        click.echo(f"\n❌ 查询结果失败: {str(e)}")
+        sys.exit(1)
+
+@cli.command(name='correlation')
+@click.argument('stock_codes', nargs=-1)
+@click.option('--top', default=10, help='每只股票显示的相关股票数')
+@click.option('--threshold', default=Settings.CORRELATION.group_threshold, help='相关组的相关系数阈值')
+@click.option('--period', default='max', help='选股快照的数据周期')
+@click.option('--interval', default='1d', help='选股快照的数据间隔')
+def correlation(stock_codes: List[str], top: int, threshold: float, period: str, interval: str):
+    """全市场相关性
+    用选股快照中的新K线增量更新滚动相关矩阵，显示指定股票的高相关股票；未指定股票时显示相关组
+    示例:
+    python main.py correlation 600519.SS --top 5
+    """
+    try:
+        service = CorrelationService().load()
+        start = datetime.now()
+        bars = service.update_panel(Screener(period=period, interval=interval).load())
+        service.save()
+        elapsed = (datetime.now() - start).total_seconds()
+        click.echo(f"\n🔄 新增 {bars} 根K线，{len(service)} 只股票，耗时 {elapsed:.3f} 秒")
+
+        for code in stock_codes:
+            click.echo(f"\n📈 与 {code} 相关性最高的股票:")
+            click.echo(service.most_correlated(code, top).to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+        if not stock_codes:
+            groups = service.correlated_groups(threshold)
+            members = {}
+            for code, group in groups.items():
+                members.setdefault(group, []).append(code)
+            click.echo(f"\n🔗 相关系数不低于 {threshold} 的相关组: {len(members)} 个")
+            for group, codes in sorted(members.items(), key=lambda item: -len(item[1])):
+                click.echo(f"- {group}: {', '.join(codes)}")
+
+    except Exception as e:
+        click.echo(f"\n❌ 相关性计算失败: {str(e)}")
+        sys.exit(1)
+
+@cli.command(name='forecast')
+@click.option('--model', 'model_name', type=click.Choice(available_forecasters()), default='ar',
+              help='基准预测模型')
+@click.option('--days', default=5, help='预测天数')
+@click.option('--top', default=20, help='显示预测涨幅最大的股票数')
+@click.option('--period', default='max', help='选股快照的数据周期')
+@click.option('--interval', default='1d', help='选股快照的数据间隔')
+def forecast(model_name: str, days: int, top: int, period: str, interval: str):
+    """全市场基准预测
+    在选股快照上一次拟合并预测全部股票，显示预测期末涨幅最大的股票
+    示例:
+    python main.py forecast --model holt --days 5 --top 20
+    """
+    try:
+        panel = Screener(period=period, interval=interval).load()
+        forecaster = create_forecaster(model_name)
+        start = datetime.now()
+        frame = forecaster.forecast_panel(panel, days_ahead=days)
+        elapsed = (datetime.now() - start).total_seconds()
+
+        final = frame[frame['horizon'] == days].copy()
+        final['change'] = final['predicted_price'] / final['last_close'] - 1
+        final = final.sort_values('change', ascending=False).head(top)
+        click.echo(f"\n🔮 {forecaster.description} {days} 天预测涨幅前 {len(final)} 的股票:")
+        click.echo(final.drop(columns=['horizon']).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+        click.echo(f"\n共预测 {frame['code'].nunique()} 只股票，耗时 {elapsed:.3f} 秒")
+
+    except Exception as e:
+        click.echo(f"\n❌ 基准预测失败: {str(e)}")
+        sys.exit(1)
+
+@cli.command(name='evaluate')
+@click.argument('stock_codes', nargs=-1)
+@click.option('--model', 'model_name', type=click.Choice(['lstm'] + available_forecasters()), default='ar',
+              help='评估的预测模型')
+@click.option('--days', default=5, help='预测天数')
+@click.option('--cutoffs', default=Settings.EVALUATION.cutoffs, help='历史截止日数量')
+@click.option('--step', default=Settings.EVALUATION.step, help='截止日间隔（K线数）')
+@click.option('--workers', default=Settings.EVALUATION.workers,
+              help='工作进程数，1 表示在当前进程内计算，0 表示按计算量自动决定')
+@click.option('--period', default='2y', help='数据周期，未指定股票时为选股快照的数据周期')
+@click.option('--interval', default='1d', help='数据间隔')
+def evaluate(stock_codes: List[str], model_name: str, days: int, cutoffs: int, step: int,
+             workers: int, period: str, interval: str):
+    """评估预测效果
+    在历史截止日回放预测，按预测天数统计 MAE/MAPE/方向准确率，并记录为该模型预测结果的置信度；
+    未指定股票时在选股快照的全部股票上评估基准模型
+    示例:
+    python main.py evaluate AAPL MSFT --model lstm --period 2y
+    python main.py evaluate --model holt --cutoffs 40
+    """
+    try:
+        evaluator = ForecastEvaluator(model_name, days_ahead=days, cutoffs=cutoffs, step=step,
+                                      workers=workers)
+        start = datetime.now()
+        if stock_codes:
+            stock_datas = DataFetcher().fetch_multiple_stocks(stock_codes, period=period, interval=interval)
+            errors = evaluator.evaluate(stock_datas)
+        else:
+            errors = evaluator.evaluate_panel(Screener(period=period, interval=interval).load())
+        elapsed = (datetime.now() - start).total_seconds()
+        evaluator.record(errors)
+
+        click.echo(f"\n📏 {model_name} 预测效果（{errors['cutoff'].nunique()} 个截止日，"
+                   f"{errors['code'].nunique()} 只股票）:")
+        click.echo(summarize_errors(errors).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+        if stock_codes:
+            click.echo("\n按股票:")
+            click.echo(summarize_errors(errors, ('code',)).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+        click.echo(f"\n共 {len(errors)} 条预测，耗时 {elapsed:.1f} 秒")
+
+    except Exception as e:
+        click.echo(f"\n❌ 评估失败: {str(e)}")
+        sys.exit(1)
+
+@cli.command(name='train-global')
+@click.argument('stock_codes', nargs=-1)
+@click.option('--period', default='max', help='本地K线库的数据周期')
+@click.option('--interval', default='1d', help='本地K线库的数据间隔')
+def train_global(stock_codes: List[str], period: str, interval: str):
+    """训练跨股票共享的预测模型
+    从本地K线库流式读取训练数据，未指定股票时使用K线库中的全部股票
+    示例:
+    python main.py train-global --period max --interval 1d
+    """
+    try:
+        start = datetime.now()
+        metadata = GlobalLSTMPredictor(period=period, interval=interval).train(stock_codes or None)
+        elapsed = (datetime.now() - start).total_seconds()
+        click.echo(f"\n✅ 共享模型训练完成: {len(metadata['vocabulary'])} 只股票，"
+                   f"损失 {metadata['loss']:.6f}，耗时 {elapsed:.1f} 秒")
+
+    except Exception as e:
+        click.echo(f"\n❌ 训练共享模型失败: {str(e)}")
+        sys.exit(1)
+
+@cli.command(name='tune')
+@click.argument('stock_code')
+@click.option('--period', default='5y', help='数据周期')
+@click.option('--interval', default='1d', help='数据间隔')
+@click.option('--workers', default=Settings.TUNING.workers, help='工作进程数，0 表示按CPU核数自动设置')
+@click.option('--top', default=10, help='显示的参数组数')
+def tune(stock_code: str, period: str, interval: str, workers: int, top: int):
+    """LSTM超参数搜索
+    按 Settings.TUNING 的搜索空间并行评估，结果记录到模型库
+    示例:
+    python main.py tune AAPL --period 5y --workers 8
+    """
+    try:
+        stock_data = DataFetcher().fetch_stock_data(stock_code, period=period, interval=interval)
+        tuner = HyperparameterTuner(workers=workers or None)
+        start = datetime.now()
+        result = tuner.tune(stock_data)
+        elapsed = (datetime.now() - start).total_seconds()
+        click.echo(f"\n🔧 {stock_code} 超参数搜索结果（按验证RMSE排序）:")
+        columns = [c for c in result.columns if c not in ('fold_rmse', 'error')]
+        click.echo(result[columns].head(top).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+        click.echo(f"\n共 {len(result)} 组参数，{tuner.workers} 个进程，耗时 {elapsed:.1f} 秒")
+
+    except Exception as e:
+        click.echo(f"\n❌ 超参数搜索失败: {str(e)}")
+        sys.exit(1)
+
+@cli.command(name='export-model')
+@click.argument('stock_codes', nargs=-1, required=True)
+@click.option('--period', default='3mo', help='数据周期（模型库中没有模型时用于训练）')
+@click.option('--interval', default='1d', help='数据间隔')
+@click.option('--quantize', type=click.Choice(QUANTIZATIONS), default='none',
+              help='量化方式: none/float16/dynamic/int8')
+def export_model(stock_codes: List[str], period: str, interval: str, quantize: str):
+    """导出TFLite推理模型
+    示例:
+    python main.py export-model AAPL MSFT --quantize dynamic
+    """
+    try:
+        fetcher = DataFetcher()
+        predictor = LSTMPredictor()
+        for stock_data in fetcher.fetch_multiple_stocks(stock_codes, period=period, interval=interval):
+            path = export_predictor(stock_data, quantize=quantize, predictor=predictor)
+            click.echo(f"✅ {stock_data.code}: {path}")
+
+    except Exception as e:
+        click.echo(f"\n❌ 导出模型失败: {str(e)}")
+        sys.exit(1)
+
+@cli.command(name='monitor')
+@click.option('--watchlist', type=click.Path(exists=True, dir_okay=False),
+              help='自选股列表文件，默认 config/stock_list.txt')
+@click.option('--interval', default=Settings.MONITOR.interval, help='K线间隔')
+@click.option('--poll-seconds', default=Settings.MONITOR.poll_seconds, help='轮询间隔（秒）')
+@click.option('--strategy', 'strategy_names', multiple=True,
+              type=click.Choice(available_strategies()), help='监控的策略，可重复指定')
+@click.option('--sink', 'sink_names', multiple=True,
+              type=click.Choice(available_sinks()), help='信号输出方式，可重复指定')
+@click.option('--webhook-url', default=Settings.MONITOR.webhook_url, help='webhook 地址')
+@click.option('--cycles', type=int, help='运行的轮数，默认一直运行')
+def monitor(watchlist: str, interval: str, poll_seconds: int, strategy_names: List[str],
+            sink_names: List[str], webhook_url: str, cycles: int):
+    """自选股实时信号监控
+    示例:
+    python main.py monitor --strategy turtle --sink stdout --sink jsonl --poll-seconds 60
+    """
+    try:
+        Settings.MONITOR.poll_seconds = poll_seconds
+        strategies = [create_strategy(name) for name in strategy_names or Settings.MONITOR.strategies]
+        sinks = [create_sink(name, url=webhook_url) if name == 'webhook' else create_sink(name)
+                 for name in sink_names or Settings.MONITOR.sinks]
+        signal_monitor = SignalMonitor(stock_codes=load_watchlist(watchlist), strategies=strategies,
+                                       sinks=sinks, interval=interval)
+        asyncio.run(signal_monitor.run(cycles=cycles))
+
+    except Exception as e:
+        click.echo(f"\n❌ 监控失败: {str(e)}")
+        sys.exit(1)
+
 #雅虎财经 https://finance.yahoo.com/quote/159740.SZ/
 if __name__ == "__main__":
     # 使用 sys.argv 来模拟命令行参数
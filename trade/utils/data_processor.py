@@ -1,24 +1,54 @@
-from typing import Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
 
 from ..config.settings import Settings
-from ..models.entities import StockData
+from ..models.entities import MarketPanel, StockData
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def rolling_window(values: np.ndarray, window: int, func) -> np.ndarray:
+    """
+    沿第0轴的滚动窗口聚合，窗口内含 NaN 或不足 window 行时结果为 NaN，
+    与 pandas rolling(window) 的默认行为一致
+
+    Args:
+        values: 一维或 [K线数, 股票数] 的数组
+        window: 窗口长度
+        func: 聚合函数，如 np.max / np.min / np.mean
+
+    Returns:
+        np.ndarray: 与输入同形状的数组
+    """
+    result = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)
+        result[window - 1:] = func(windows, axis=-1)
+    return result
 
 
 class DataProcessor:
     def __init__(self):
-        self.scaler = MinMaxScaler(feature_range=(0, 1))
+        self._scaler = None
+
+    @property
+    def scaler(self):
+        """LSTM数据的归一化器，首次使用时才导入 scikit-learn"""
+        if self._scaler is None:
+            from sklearn.preprocessing import MinMaxScaler
+            self._scaler = MinMaxScaler(feature_range=(0, 1))
+        return self._scaler
 
     def prepare_lstm_data(self, stock_data: StockData,
-                         time_step: int = Settings.LSTM.time_step) -> Tuple[np.ndarray, np.ndarray]:
-        """准备LSTM模型的训练数据"""
+                         time_step: int = Settings.LSTM.time_step,
+                         fit: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """准备LSTM模型的训练数据，fit 为 False 时沿用已有的归一化参数"""
         # 获取收盘价数据
         data = stock_data.data['Close'].values.reshape(-1, 1)
         # 数据归一化
-        scaled_data = self.scaler.fit_transform(data)
+        scaled_data = self.scaler.fit_transform(data) if fit else self.scaler.transform(data)
         # 创建时间序列数据
         X, y = [], []
         for i in range(len(scaled_data) - time_step):
@@ -27,7 +57,59 @@ class DataProcessor:
         return np.array(X), np.array(y)
     def prepare_turtle_data(self, stock_data: StockData) -> pd.DataFrame:
         """准备海龟交易策略所需的数据"""
-        df = stock_data.data.copy()
+        return self._add_turtle_indicators(stock_data.data.copy())
+
+    def prepare_turtle_chunk(self, chunk: pd.DataFrame,
+                             warmup: Optional[pd.DataFrame] = None,
+                             lookback: Optional[int] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        分块准备海龟策略数据，滚动指标的状态通过预热数据跨块延续
+
+        Args:
+            chunk: 本块的OHLCV数据
+            warmup: 上一块末尾保留的原始数据，首块为空
+            lookback: 保留给下一块的预热行数，为空时按海龟策略的最长窗口计算
+
+        Returns:
+            Tuple[pd.DataFrame, pd.DataFrame]: 带指标的数据（含开头的预热行）和供下一块使用的预热数据
+        """
+        df = chunk if warmup is None or warmup.empty else pd.concat([warmup, chunk])
+        # 最长滚动窗口再多保留一行，用于计算TR所需的前收盘价和信号判断所需的前一行指标
+        if lookback is None:
+            lookback = max(Settings.TURTLE.short_window, Settings.TURTLE.long_window,
+                           Settings.TURTLE.atr_window) + 1
+        return self._add_turtle_indicators(df.copy()), df.iloc[-lookback:]
+
+    @staticmethod
+    def build_panel(stock_datas: List[StockData]) -> MarketPanel:
+        """
+        将多只股票的K线按时间对齐为宽表
+
+        Args:
+            stock_datas: 股票数据列表
+
+        Returns:
+            MarketPanel: 对齐后的面板数据，某只股票缺失的K线为 NaN
+        """
+        index = stock_datas[0].data.index
+        aligned = True
+        for sd in stock_datas[1:]:
+            if not sd.data.index.equals(index):
+                index = index.union(sd.data.index)
+                aligned = False
+
+        fields = {column: np.full((len(index), len(stock_datas)), np.nan)
+                  for column in OHLCV_COLUMNS}
+        for j, sd in enumerate(stock_datas):
+            rows = slice(None) if aligned else index.get_indexer(sd.data.index)
+            values = sd.data[OHLCV_COLUMNS].to_numpy(dtype=float)
+            for k, column in enumerate(OHLCV_COLUMNS):
+                fields[column][rows, j] = values[:, k]
+        return MarketPanel(codes=[sd.code for sd in stock_datas], index=index, fields=fields)
+
+    @staticmethod
+    def _add_turtle_indicators(df: pd.DataFrame) -> pd.DataFrame:
+        """计算海龟策略使用的TR/ATR和唐奇安通道"""
         # 计算真实波幅(TR)
         df['TR'] = np.maximum(
             df['High'] - df['Low'],
@@ -1,78 +1,158 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import os
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
 from ..models.entities import PredictionResult, TradeSignal, MarketSentiment, AIAnalysisReport
+from .result_store import ai_reports_frame, predictions_frame, sentiment_frame, signals_frame
+
+# 结果表列名到报表中文列名的映射，未列出的列保留原名
+_COLUMN_LABELS = {
+    'run_id': "批次",
+    'code': "股票代码",
+    'predicted_price': "预测价格",
+    'confidence': "置信度",
+    'lower_price': "预测区间下限",
+    'upper_price': "预测区间上限",
+    'signals': "信号",
+    'action': "交易动作",
+    'price': "交易价格",
+    'volume': "交易数量",
+    'reason': "交易原因",
+    'signal_type': "信号类型",
+    'units': "持仓单位",
+    'stop': "止损价",
+    'sentiment_score': "情绪得分",
+    'hot_degree': "热度",
+    'news_summary': "新闻摘要",
+    'keywords': "关键词",
+    'analysis': "分析报告",
+    'risk_level': "风险等级",
+    'opportunities': "机会",
+    'threats': "威胁",
+    'recommendation': "建议",
+}
+
+# 各报表日期列的中文名
+_DATE_LABELS = {
+    'predictions': "预测日期",
+    'trade_signals': "交易日期",
+    'sentiment_analysis': "分析日期",
+    'ai_reports': "分析日期",
+}
+
+# 报表中各结果表的工作表名
+_SHEET_NAMES = {
+    'predictions': "预测结果",
+    'trade_signals': "交易信号",
+    'sentiment_analysis': "情绪分析",
+    'ai_reports': "AI分析报告",
+}
+
+def _cells(column: pd.Series) -> list:
+    """一列数据转为 openpyxl 可写入的 Python 值，缺失值为空单元格"""
+    return column.astype(object).where(column.notna(), None).tolist()
+
+class ReportWorkbook:
+    """
+    一次运行的 Excel 报表
+
+    累积所有股票的各类结果，save() 时用 openpyxl 的只写模式一次写出一个工作簿，
+    每类结果一个工作表。累积的结果表在 save() 之前都保留在内存中，内存占用随行数线性增长；
+    只写模式省去的是 openpyxl 为整个工作表构造的单元格对象，写出时每次只有一张结果表
+    转换为 Python 值。
+    """
+    def __init__(self, output_dir: Path, name: Optional[str] = None):
+        """
+        Args:
+            output_dir: 报表目录
+            name: 文件名（不含扩展名），默认为 report_<时间戳>
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.name = name or f"report_{datetime.now():%Y%m%d_%H%M%S}"
+        self._frames: Dict[str, List[pd.DataFrame]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(frame) for frames in self._frames.values() for frame in frames)
+
+    def add(self, table: str, df: pd.DataFrame) -> 'ReportWorkbook':
+        """追加一张结果表，同名的结果写入同一个工作表，空表只写出表头"""
+        self._frames.setdefault(table, []).append(df)
+        return self
+
+    def add_predictions(self, predictions: List[PredictionResult]) -> 'ReportWorkbook':
+        return self.add('predictions', predictions_frame(predictions))
+
+    def add_trade_signals(self, signals: List[TradeSignal]) -> 'ReportWorkbook':
+        return self.add('trade_signals', signals_frame(signals))
+
+    def add_sentiment_analysis(self, sentiments: List[MarketSentiment]) -> 'ReportWorkbook':
+        return self.add('sentiment_analysis', sentiment_frame(sentiments))
+
+    def add_ai_reports(self, reports: List[AIAnalysisReport]) -> 'ReportWorkbook':
+        return self.add('ai_reports', ai_reports_frame(reports))
+
+    def save(self) -> Optional[Path]:
+        """
+        写出工作簿
+
+        Returns:
+            Optional[Path]: 报表文件路径，工作簿中没有任何结果表时不写文件并返回 None
+        """
+        from openpyxl import Workbook
+
+        if not self._frames:
+            return None
+        workbook = Workbook(write_only=True)
+        for table, frames in self._frames.items():
+            sheet = workbook.create_sheet(title=_SHEET_NAMES.get(table, table)[:31])
+            columns = list(dict.fromkeys(c for frame in frames for c in frame.columns))
+            labels = {**_COLUMN_LABELS, 'date': _DATE_LABELS.get(table, "日期")}
+            sheet.append([labels.get(c, c) for c in columns])
+            for frame in frames:
+                frame = frame.reindex(columns=columns)
+                for row in zip(*(_cells(frame[c]) for c in columns)):
+                    sheet.append(row)
+
+        output_path = self.output_dir / f"{self.name}.xlsx"
+        # 先写临时文件再重命名，避免留下不完整的报表
+        tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+        workbook.save(tmp_path)
+        os.replace(tmp_path, output_path)
+        return output_path
 
 class ExcelWriter:
     def __init__(self, output_dir: Path):
         self.output_dir = output_dir
         self.output_dir.mkdir(exist_ok=True)
-    
+
     def _get_output_path(self, prefix: str) -> Path:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         return self.output_dir / f"{prefix}_{timestamp}.xlsx"
-    
+
+    def write_frame(self, table: str, df: pd.DataFrame) -> Path:
+        """
+        把结果表写为 Excel 报表，列名转换为中文
+
+        Args:
+            table: 结果表名，同时作为文件名前缀
+            df: 结果表
+
+        Returns:
+            Path: 报表文件路径
+        """
+        name = self._get_output_path(table).stem
+        return ReportWorkbook(self.output_dir, name).add(table, df).save()
+
     def write_predictions(self, predictions: List[PredictionResult]):
-        df = pd.DataFrame([
-            {
-                "股票代码": p.code,
-                "预测日期": p.date,
-                "预测价格": p.predicted_price,
-                "置信度": p.confidence,
-                "信号": ", ".join(p.signals)
-            }
-            for p in predictions
-        ])
-        output_path = self._get_output_path("predictions")
-        df.to_excel(output_path, index=False)
-        return output_path
-    
+        return self.write_frame('predictions', predictions_frame(predictions))
+
     def write_trade_signals(self, signals: List[TradeSignal]):
-        df = pd.DataFrame([
-            {
-                "股票代码": s.code,
-                "交易日期": s.date,
-                "交易动作": s.action,
-                "交易价格": s.price,
-                "交易数量": s.volume,
-                "交易原因": s.reason
-            }
-            for s in signals
-        ])
-        output_path = self._get_output_path("trade_signals")
-        df.to_excel(output_path, index=False)
-        return output_path
-    
+        return self.write_frame('trade_signals', signals_frame(signals))
+
     def write_sentiment_analysis(self, sentiments: List[MarketSentiment]):
-        df = pd.DataFrame([
-            {
-                "股票代码": s.code,
-                "分析日期": s.date,
-                "情绪得分": s.sentiment_score,
-                "热度": s.hot_degree,
-                "新闻摘要": s.news_summary,
-                "关键词": ", ".join(s.keywords)
-            }
-            for s in sentiments
-        ])
-        output_path = self._get_output_path("sentiment_analysis")
-        df.to_excel(output_path, index=False)
-        return output_path
-    
+        return self.write_frame('sentiment_analysis', sentiment_frame(sentiments))
+
     def write_ai_reports(self, reports: List[AIAnalysisReport]):
-        df = pd.DataFrame([
-            {
-                "股票代码": r.code,
-                "分析日期": r.date,
-                "分析报告": r.analysis,
-                "风险等级": r.risk_level,
-                "机会": ", ".join(r.opportunities),
-                "威胁": ", ".join(r.threats),
-                "建议": r.recommendation
-            }
-            for r in reports
-        ])
-        output_path = self._get_output_path("ai_reports")
-        df.to_excel(output_path, index=False)
-        return output_path 
\ No newline at end of file
+        return self.write_frame('ai_reports', ai_reports_frame(reports))
@@ -0,0 +1,332 @@
+"""
+分析结果的列式存储
+
+每次运行分配一个批次号（run_id），结果按表追加写入：
+- parquet: <results_dir>/<表名>/run_id=<批次号>/part-*.parquet，每次写入一个文件，
+  行按 code、date 排序，读取时按批次目录裁剪、按股票和日期过滤
+- sqlite: 每张表一个 SQL 表，(run_id, code, date) 上建索引
+写入的是整列数组，上千只股票的结果一次写入只需毫秒级。
+"""
+import re
+import sqlite3
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..config.settings import Settings
+from ..models.entities import AIAnalysisReport, MarketSentiment, PredictionResult, TradeSignal
+from .logger import Logger
+
+BACKENDS = ('parquet', 'sqlite')
+
+_TABLE_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def predictions_frame(predictions: List[PredictionResult]) -> pd.DataFrame:
+    """预测结果转为列式表"""
+    return pd.DataFrame({
+        'code': [p.code for p in predictions],
+        'date': pd.to_datetime([p.date for p in predictions]),
+        'predicted_price': np.asarray([p.predicted_price for p in predictions], dtype=float),
+        'confidence': np.asarray([p.confidence for p in predictions], dtype=float),
+        'lower_price': np.asarray([np.nan if p.lower_price is None else p.lower_price
+                                   for p in predictions], dtype=float),
+        'upper_price': np.asarray([np.nan if p.upper_price is None else p.upper_price
+                                   for p in predictions], dtype=float),
+        'signals': [", ".join(p.signals) for p in predictions],
+    })
+
+
+def signals_frame(signals: List[TradeSignal]) -> pd.DataFrame:
+    """交易信号转为列式表"""
+    return pd.DataFrame({
+        'code': [s.code for s in signals],
+        'date': pd.to_datetime([s.date for s in signals]),
+        'action': [s.action for s in signals],
+        'price': np.asarray([s.price for s in signals], dtype=float),
+        'volume': np.asarray([s.volume for s in signals], dtype=float),
+        'reason': [s.reason for s in signals],
+    })
+
+
+def sentiment_frame(sentiments: List[MarketSentiment]) -> pd.DataFrame:
+    """情绪分析结果转为列式表"""
+    return pd.DataFrame({
+        'code': [s.code for s in sentiments],
+        'date': pd.to_datetime([s.date for s in sentiments]),
+        'sentiment_score': np.asarray([s.sentiment_score for s in sentiments], dtype=float),
+        'hot_degree': np.asarray([s.hot_degree for s in sentiments], dtype=float),
+        'news_summary': [s.news_summary for s in sentiments],
+        'keywords': [", ".join(s.keywords) for s in sentiments],
+    })
+
+
+def ai_reports_frame(reports: List[AIAnalysisReport]) -> pd.DataFrame:
+    """AI分析报告转为列式表"""
+    return pd.DataFrame({
+        'code': [r.code for r in reports],
+        'date': pd.to_datetime([r.date for r in reports]),
+        'analysis': [r.analysis for r in reports],
+        'risk_level': [r.risk_level for r in reports],
+        'opportunities': [", ".join(r.opportunities) for r in reports],
+        'threats': [", ".join(r.threats) for r in reports],
+        'recommendation': [r.recommendation for r in reports],
+    })
+
+
+def _arrow_table(frame: pd.DataFrame):
+    """转为 Arrow 表并统一列类型，保证同一张表在不同批次间的结构一致"""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    fields = []
+    for field in table.schema:
+        kind = field.type
+        if pa.types.is_integer(kind) or pa.types.is_boolean(kind):
+            kind = pa.int64()
+        elif pa.types.is_floating(kind):
+            kind = pa.float64()
+        elif pa.types.is_timestamp(kind) or pa.types.is_date(kind):
+            kind = pa.timestamp('us')
+        elif pa.types.is_large_string(kind) or pa.types.is_null(kind):
+            kind = pa.string()
+        fields.append(pa.field(field.name, kind))
+    return table.cast(pa.schema(fields))
+
+
+class ResultStore:
+    """
+    分析结果存储
+
+    write() 追加一张列式表，write_* 方法接受实体列表，与 ExcelWriter 的方法一一对应；
+    read() 按批次、股票和日期查询，export_excel() 把某一批次的全部结果导出为一个 Excel 报表。
+    """
+    def __init__(self, run_id: Optional[str] = None, backend: Optional[str] = None,
+                 root: Optional[Path] = None):
+        """
+        Args:
+            run_id: 批次号，默认按当前时间生成
+            backend: 存储后端 parquet/sqlite，默认取配置
+            root: Parquet 数据集根目录或 SQLite 数据库文件，默认取配置
+        """
+        self.logger = Logger()
+        self.config = Settings.OUTPUT
+        self.backend = backend or self.config.backend
+        if self.backend not in BACKENDS:
+            raise ValueError(f"未知的结果存储后端: {self.backend}，可选: {', '.join(BACKENDS)}")
+        default_root = self.config.results_dir if self.backend == 'parquet' else self.config.sqlite_file
+        self.root = Path(root or default_root)
+        self.run_id = run_id or f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:6]}"
+
+    def write(self, table: str, frame: pd.DataFrame) -> int:
+        """
+        追加一批结果
+
+        Args:
+            table: 表名，如 trade_signals、predictions
+            frame: 结果表，应包含 code 和 date 列
+
+        Returns:
+            int: 写入的行数
+        """
+        try:
+            self._check_table(table)
+            if frame.empty:
+                return 0
+            frame = frame.reset_index(drop=True)
+            sort_by = [c for c in ('code', 'date') if c in frame.columns]
+            if sort_by:
+                frame = frame.sort_values(sort_by, kind='stable', ignore_index=True)
+            frame.insert(len(frame.columns), 'written_at', pd.Timestamp.now())
+            if self.backend == 'parquet':
+                self._write_parquet(table, frame)
+            else:
+                self._write_sqlite(table, frame)
+            return len(frame)
+
+        except Exception as e:
+            self.logger.error(f"写入结果表 {table} 出错: {str(e)}")
+            raise
+
+    def write_predictions(self, predictions: List[PredictionResult]) -> int:
+        return self.write('predictions', predictions_frame(predictions))
+
+    def write_trade_signals(self, signals: List[TradeSignal]) -> int:
+        return self.write('trade_signals', signals_frame(signals))
+
+    def write_sentiment_analysis(self, sentiments: List[MarketSentiment]) -> int:
+        return self.write('sentiment_analysis', sentiment_frame(sentiments))
+
+    def write_ai_reports(self, reports: List[AIAnalysisReport]) -> int:
+        return self.write('ai_reports', ai_reports_frame(reports))
+
+    def read(self, table: str, run_id: Optional[str] = None, codes: Optional[Iterable[str]] = None,
+             start=None, end=None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        查询结果
+
+        Args:
+            table: 表名
+            run_id: 批次号，为空时查询全部批次
+            codes: 股票代码列表，为空时不过滤
+            start: 起始日期（含）
+            end: 结束日期（含）
+            columns: 返回的列，为空时返回全部列
+
+        Returns:
+            pd.DataFrame: 包含 run_id 列的查询结果
+        """
+        try:
+            self._check_table(table)
+            codes = list(codes) if codes is not None else None
+            if self.backend == 'parquet':
+                return self._read_parquet(table, run_id, codes, start, end, columns)
+            return self._read_sqlite(table, run_id, codes, start, end, columns)
+
+        except Exception as e:
+            self.logger.error(f"查询结果表 {table} 出错: {str(e)}")
+            raise
+
+    def runs(self, table: str) -> List[str]:
+        """表中已有的批次号，按时间顺序"""
+        self._check_table(table)
+        if self.backend == 'parquet':
+            return sorted(path.name.split('=', 1)[1] for path in (self.root / table).glob('run_id=*'))
+        if not self.root.exists():
+            return []
+        with sqlite3.connect(self.root) as conn:
+            if not self._sqlite_has_table(conn, table):
+                return []
+            return [row[0] for row in conn.execute(f'SELECT DISTINCT run_id FROM "{table}" ORDER BY run_id')]
+
+    def export_excel(self, tables: Optional[Iterable[str]] = None, run_id: Optional[str] = None,
+                     output_dir: Optional[Path] = None) -> Optional[Path]:
+        """
+        把一个批次的结果导出为一个 Excel 报表，每类结果一个工作表（中文列名）
+
+        Args:
+            tables: 导出的表名，默认为该批次写入过的全部表
+            run_id: 批次号，默认为当前批次
+            output_dir: 报表目录，默认为输出目录
+
+        Returns:
+            Optional[Path]: 报表文件路径，批次中没有任何结果时返回 None
+        """
+        from .excel_writer import ReportWorkbook
+
+        run_id = run_id or self.run_id
+        tables = list(tables) if tables is not None else [t for t in self.tables() if run_id in self.runs(t)]
+        workbook = ReportWorkbook(Path(output_dir or Settings.DATA.output_dir), f"report_{run_id}")
+        for table in tables:
+            workbook.add(table, self.read(table, run_id=run_id).drop(columns=['run_id', 'written_at']))
+        return workbook.save()
+
+    def tables(self) -> List[str]:
+        """已有的结果表"""
+        if self.backend == 'parquet':
+            return sorted(path.name for path in self.root.glob('*') if path.is_dir()) if self.root.exists() else []
+        if not self.root.exists():
+            return []
+        with sqlite3.connect(self.root) as conn:
+            return [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")]
+
+    def _check_table(self, table: str) -> None:
+        if not _TABLE_NAME.match(table):
+            raise ValueError(f"无效的结果表名: {table}")
+
+    def _write_parquet(self, table: str, frame: pd.DataFrame) -> None:
+        import pyarrow.parquet as pq
+
+        directory = self.root / table / f"run_id={self.run_id}"
+        directory.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再重命名，读取时不会看到写了一半的文件
+        name = f"part-{datetime.now():%H%M%S%f}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp_path = directory / f".{name}.tmp"
+        pq.write_table(_arrow_table(frame), tmp_path)
+        tmp_path.replace(directory / name)
+
+    def _read_parquet(self, table, run_id, codes, start, end, columns) -> pd.DataFrame:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+
+        base = self.root / table
+        pattern = f"run_id={run_id}/*.parquet" if run_id else "run_id=*/*.parquet"
+        files = sorted(str(path) for path in base.glob(pattern))
+        if not files:
+            return pd.DataFrame(columns=(columns or []) + ['run_id'])
+        # 不同批次可能增减了列，取全部文件结构的并集
+        schema = pa.unify_schemas([pq.read_schema(f) for f in files]
+                                  + [pa.schema([('run_id', pa.string())])])
+        dataset = ds.dataset(files, schema=schema, format='parquet',
+                             partitioning=ds.partitioning(pa.schema([('run_id', pa.string())]),
+                                                          flavor='hive'),
+                             partition_base_dir=str(base))
+        condition = None
+        for expression in self._filters(ds.field, codes, start, end):
+            condition = expression if condition is None else condition & expression
+        selected = None if columns is None else list(dict.fromkeys(columns + ['run_id']))
+        return dataset.to_table(columns=selected, filter=condition).to_pandas()
+
+    @staticmethod
+    def _filters(field, codes, start, end) -> list:
+        filters = []
+        if codes is not None:
+            filters.append(field('code').isin(codes))
+        if start is not None:
+            filters.append(field('date') >= pd.Timestamp(start).to_datetime64())
+        if end is not None:
+            filters.append(field('date') <= pd.Timestamp(end).to_datetime64())
+        return filters
+
+    def _write_sqlite(self, table: str, frame: pd.DataFrame) -> None:
+        self.root.parent.mkdir(parents=True, exist_ok=True)
+        frame.insert(0, 'run_id', self.run_id)
+        with sqlite3.connect(self.root) as conn:
+            # 与 parquet 一致，允许新批次增加列
+            existing = {row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')}
+            if existing:
+                for column in frame.columns:
+                    if column not in existing:
+                        conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{column}"')
+            frame.to_sql(table, conn, if_exists='append', index=False)
+            keys = ', '.join(c for c in ('run_id', 'code', 'date') if c in frame.columns)
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table}_key" ON "{table}" ({keys})')
+
+    def _read_sqlite(self, table, run_id, codes, start, end, columns) -> pd.DataFrame:
+        if not self.root.exists():
+            return pd.DataFrame(columns=columns or [])
+        clauses, params = [], []
+        if run_id:
+            clauses.append('run_id = ?')
+            params.append(run_id)
+        if codes is not None:
+            clauses.append(f"code IN ({', '.join('?' * len(codes))})")
+            params.extend(codes)
+        if start is not None:
+            clauses.append('date >= ?')
+            params.append(str(pd.Timestamp(start)))
+        if end is not None:
+            clauses.append('date <= ?')
+            params.append(str(pd.Timestamp(end)))
+        selected = '*' if columns is None else ', '.join(
+            f'"{c}"' for c in dict.fromkeys(['run_id'] + list(columns)))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        with sqlite3.connect(self.root) as conn:
+            if not self._sqlite_has_table(conn, table):
+                return pd.DataFrame(columns=columns or [])
+            frame = pd.read_sql_query(f'SELECT {selected} FROM "{table}"{where}', conn, params=params)
+        for column in ('date', 'written_at'):
+            if column in frame:
+                frame[column] = pd.to_datetime(frame[column])
+        return frame
+
+    @staticmethod
+    def _sqlite_has_table(conn: sqlite3.Connection, table: str) -> bool:
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                            (table,)).fetchone() is not None